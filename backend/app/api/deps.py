@@ -1,7 +1,7 @@
 from typing import Optional, Annotated
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 from app.core.config import settings
 from app.services.auth_service import AuthService
 from app.models.teacher import TeacherInDBBase
@@ -9,15 +9,15 @@ import uuid
 
 security = HTTPBearer()
 
-async def get_db() -> AsyncIOMotorClient:
+async def get_db() -> AsyncMongoClient:
     """Get database connection."""
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    client = AsyncMongoClient(settings.MONGODB_URL)
     try:
         yield client
     finally:
-        client.close()
+        await client.close()
 
-async def get_auth_service(db: Annotated[AsyncIOMotorClient, Depends(get_db)]) -> AuthService:
+async def get_auth_service(db: Annotated[AsyncMongoClient, Depends(get_db)]) -> AuthService:
     """Get auth service instance."""
     return AuthService(db)
 
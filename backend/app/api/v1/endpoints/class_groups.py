@@ -24,7 +24,7 @@ router = APIRouter(
 
 # === Helper for Authorization Check ===
 # --- RESTORED ASYNC HELPER ---
-async def _check_user_is_teacher_of_group( # Needs async to call crud.get_teacher_by_kinde_id
+async def _check_user_is_teacher_of_group( # Needs async to call crud.get_current_teacher
     class_group: ClassGroup,
     user_payload: Dict[str, Any],
     action: str = "access"
@@ -47,7 +47,7 @@ async def _check_user_is_teacher_of_group( # Needs async to call crud.get_teache
     requesting_teacher = None # Initialize
     try:
          logger.debug(f"Auth Check Step 2: Fetching teacher by Kinde ID: {requesting_user_kinde_id}")
-         requesting_teacher = await crud.get_teacher_by_kinde_id(kinde_id=requesting_user_kinde_id)
+         requesting_teacher = await crud.get_current_teacher(kinde_id=requesting_user_kinde_id)
     except Exception as e:
          logger.error(f"Auth Check Step 2 FAILED: Error fetching teacher by Kinde ID {requesting_user_kinde_id}: {e}", exc_info=True)
          raise HTTPException(status_code=500, detail="Error retrieving teacher profile.")
@@ -125,7 +125,7 @@ async def create_new_class_group(
     # --- Get Teacher's Internal UUID ---
     teacher_internal_id: Optional[uuid.UUID] = None
     try:
-        teacher_record = await crud.get_teacher_by_kinde_id(kinde_id=user_kinde_id_str)
+        teacher_record = await crud.get_current_teacher(kinde_id=user_kinde_id_str)
         if teacher_record:
             teacher_internal_id = teacher_record.id
         else:
@@ -226,6 +226,7 @@ async def read_class_group(
 async def read_class_groups(
     skip: int = Query(0, ge=0, description="Records to skip"),
     limit: int = Query(100, ge=1, le=500, description="Max records to return"),
+    after_id: Optional[uuid.UUID] = Query(None, description="Keyset cursor: return records after this ID (the last ID of the previous page); ignores skip"),
     current_user_payload: Dict[str, Any] = Depends(get_current_user_payload)
 ):
     user_kinde_id_str = current_user_payload.get("sub")
@@ -235,7 +236,7 @@ async def read_class_groups(
     teacher_internal_id: Optional[uuid.UUID] = None
     try:
        # Fetch teacher record to get internal ID
-       teacher_record = await crud.get_teacher_by_kinde_id(kinde_id=user_kinde_id_str)
+       teacher_record = await crud.get_current_teacher(kinde_id=user_kinde_id_str)
        if teacher_record:
            teacher_internal_id = teacher_record.id
        else:
@@ -259,7 +260,9 @@ async def read_class_groups(
     class_groups = await crud.get_all_class_groups(
         teacher_id=teacher_internal_id, # Filter by teacher's internal ID
         skip=skip,
-        limit=limit
+        limit=limit,
+        after_id=after_id,
+        validate=False # Rows come from our own write paths; response_model serialization still applies
     )
     return class_groups
 
@@ -210,11 +210,11 @@ async def trigger_assessment(
             )
 
     # --- Update Status to PROCESSING ---
-    await crud.update_document_status(document_id=document_id, teacher_id=auth_teacher_id, status=DocumentStatus.PROCESSING)
+    await crud.update_document_status_fast(document_id=document_id, teacher_id=auth_teacher_id, status=DocumentStatus.PROCESSING)
     result = await crud.get_result_by_document_id(document_id=document_id, teacher_id=auth_teacher_id) # Pass teacher_id
     if result:
         # --- Pass dictionary directly to crud.update_result ---
-        await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ASSESSING}, teacher_id=auth_teacher_id) # Added teacher_id if update_result supports it
+        await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ASSESSING}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id if update_result supports it
         logger.info(f"Existing result record found for doc {document_id}, updated status to ASSESSING.")
     else:
         # Handle case where result record didn't exist (should have been created on upload)
@@ -230,7 +230,7 @@ async def trigger_assessment(
         if not created_result:
             logger.error(f"Failed to create missing result record for document {document_id}. Assessment cannot proceed.")
             # If creation fails even here, revert doc status and raise error
-            await crud.update_document_status(document_id=document_id, teacher_id=auth_teacher_id, status=DocumentStatus.ERROR)
+            await crud.update_document_status_fast(document_id=document_id, teacher_id=auth_teacher_id, status=DocumentStatus.ERROR)
             raise HTTPException(status_code=500, detail="Internal error: Failed to create necessary result record.")
         else:
             logger.info(f"Successfully created missing result record {created_result.id} for doc {document_id} with status ASSESSING.")
@@ -260,9 +260,9 @@ async def trigger_assessment(
         if file_bytes is None:
             logger.error(f"Failed to download blob {document.storage_blob_path} for document {document_id}")
             # Update status to error and raise
-            await crud.update_document_status(document_id=document_id, teacher_id=auth_teacher_id, status=DocumentStatus.ERROR)
+            await crud.update_document_status_fast(document_id=document_id, teacher_id=auth_teacher_id, status=DocumentStatus.ERROR)
             if result: # Check if result exists before trying to update it
-                await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id)
+                await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False)
             raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to retrieve document content from storage for assessment.")
 
         # Call the synchronous extract_text_from_bytes in a separate thread
@@ -285,37 +285,37 @@ async def trigger_assessment(
 
     except FileNotFoundError:
         logger.error(f"File not found in blob storage for document {document_id} at path {document.storage_blob_path}", exc_info=True)
-        await crud.update_document_status(
+        await crud.update_document_status_fast(
             document_id=document.id, 
             teacher_id=auth_teacher_id, 
             status=DocumentStatus.ERROR,
             # Optionally pass character_count and word_count as None or 0 if known
         )
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id if update_result supports it
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id if update_result supports it
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error accessing document file for text extraction.")
     except ValueError as e: # Catch specific error from text_extraction if it raises one for unsupported types
         logger.error(f"Text extraction error for document {document.id}: {e}", exc_info=True)
-        await crud.update_document_status(
+        await crud.update_document_status_fast(
             document_id=document.id, 
             teacher_id=auth_teacher_id, 
             status=DocumentStatus.ERROR
         )
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id if update_result supports it
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id if update_result supports it
         raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
     except Exception as e:
         logger.error(f"Unexpected error during text extraction for document {document_id}: {e}", exc_info=True)
-        await crud.update_document_status(
+        await crud.update_document_status_fast(
             document_id=document.id, 
             teacher_id=auth_teacher_id, 
             status=DocumentStatus.ERROR
         )
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id if update_result supports it
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id if update_result supports it
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to extract text from document.")
 
     if extracted_text is None: # Should be caught by specific exceptions above, but as a safeguard
         logger.error(f"Text extraction resulted in None for document {document_id}")
-        await crud.update_document_status(document_id=document.id, teacher_id=auth_teacher_id, status=DocumentStatus.ERROR)
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id if update_result supports it
+        await crud.update_document_status_fast(document_id=document.id, teacher_id=auth_teacher_id, status=DocumentStatus.ERROR)
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id if update_result supports it
         raise HTTPException(status_code=500, detail="Text content could not be extracted.")
         
     # --- ML API Call ---
@@ -371,36 +371,36 @@ async def trigger_assessment(
     # ... (error handling for ML API call remains the same) ...
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error calling ML API for document {document_id}: {e.response.status_code} - {e.response.text}", exc_info=False)
-        await crud.update_document_status(
+        await crud.update_document_status_fast(
             document_id=document_id,
             teacher_id=auth_teacher_id,
             status=DocumentStatus.ERROR,
             character_count=character_count,
             word_count=word_count
         )
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Error communicating with AI detection service: {e.response.status_code}")
     except ValueError as e:
         logger.error(f"Error processing ML API response for document {document_id}: {e}", exc_info=True)
-        await crud.update_document_status(
+        await crud.update_document_status_fast(
             document_id=document_id,
             teacher_id=auth_teacher_id,
             status=DocumentStatus.ERROR,
             character_count=character_count,
             word_count=word_count
         )
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to process AI detection result: {e}")
     except Exception as e:
         logger.error(f"Unexpected error during ML API call or processing for document {document_id}: {e}", exc_info=True)
-        await crud.update_document_status(
+        await crud.update_document_status_fast(
             document_id=document_id,
             teacher_id=auth_teacher_id,
             status=DocumentStatus.ERROR,
             character_count=character_count,
             word_count=word_count
         )
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to get AI detection result: {e}")
 
 
@@ -442,12 +442,13 @@ async def trigger_assessment(
                     teacher_id=auth_teacher_id,
                     status=DocumentStatus.COMPLETED,
                     character_count=character_count, # Pass calculated counts
-                    word_count=word_count
+                    word_count=word_count,
+                    validate=False # Returned document is unused
                 )
             else:
                 logger.error(f"Failed to update result record for document {document_id} after ML processing.")
                 # If result update failed, set document status back to ERROR
-                await crud.update_document_status(
+                await crud.update_document_status_fast(
                     document_id=document_id,
                     teacher_id=auth_teacher_id,
                     status=DocumentStatus.ERROR,
@@ -460,7 +461,7 @@ async def trigger_assessment(
             # This case should ideally not be reached if result creation on upload is robust
             logger.error(f"Result record not found during final update stage for document {document_id}")
             # Update document status back to ERROR
-            await crud.update_document_status(
+            await crud.update_document_status_fast(
                 document_id=document_id,
                 teacher_id=auth_teacher_id,
                 status=DocumentStatus.ERROR,
@@ -471,14 +472,14 @@ async def trigger_assessment(
 
     except Exception as e:
         logger.error(f"Failed to update database after successful ML API call for document {document_id}: {e}", exc_info=True)
-        await crud.update_document_status(
+        await crud.update_document_status_fast(
             document_id=document_id,
             teacher_id=auth_teacher_id,
             status=DocumentStatus.ERROR,
             character_count=character_count, # Pass counts if calculated
             word_count=word_count
         )
-        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id) # Added teacher_id
+        if result: await crud.update_result(result_id=result.id, update_data={"status": ResultStatus.ERROR}, teacher_id=auth_teacher_id, return_document=False) # Added teacher_id
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save assessment result.")
 
 
@@ -630,7 +631,8 @@ async def read_documents(
         skip=skip,
         limit=limit,
         sort_by=sort_by,
-        sort_order=sort_order_int
+        sort_order=sort_order_int,
+        validate=False # Rows come from our own write paths; response_model serialization still applies
     )
     # <<< START EDIT: Add debug log before returning >>>
     # Log the content being returned, limiting length if needed for brevity
@@ -763,6 +765,20 @@ async def upload_batch(
     documents = []
     failed_files = []
 
+    # Loop invariants, resolved once per batch: every document in the batch shares the
+    # batch's upload timestamp and processing priority
+    now = datetime.now(timezone.utc)
+    # Convert priority enum to integer
+    priority_value = 0  # Default
+    if priority == BatchPriority.LOW:
+        priority_value = 0
+    elif priority == BatchPriority.NORMAL:
+        priority_value = 1
+    elif priority == BatchPriority.HIGH:
+        priority_value = 2
+    elif priority == BatchPriority.URGENT:
+        priority_value = 3
+
     # Process each file
     for file in files:
         try:
@@ -801,18 +817,6 @@ async def upload_batch(
                 continue
 
             # Create document record
-            now = datetime.now(timezone.utc)
-            # Convert priority enum to integer
-            priority_value = 0  # Default
-            if priority == BatchPriority.LOW:
-                priority_value = 0
-            elif priority == BatchPriority.NORMAL:
-                priority_value = 1
-            elif priority == BatchPriority.HIGH:
-                priority_value = 2
-            elif priority == BatchPriority.URGENT:
-                priority_value = 3
-
             document_data = DocumentCreate(
                 original_filename=original_filename,
                 storage_blob_path=blob_name,
@@ -868,6 +872,13 @@ async def upload_batch(
         error_message=f"Failed to process {len(failed_files)} files" if failed_files else None
     )
     updated_batch = await crud.update_batch(batch_id=batch.id, batch_in=batch_update)
+    # update_batch returns the batch even when nothing changed; None means not found / DB error
+    if updated_batch is None:
+        logger.error(f"Failed to update batch {batch.id} after queuing its documents.")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to update batch status."
+        )
 
     if not documents:
         raise HTTPException(
@@ -899,8 +910,8 @@ async def get_batch_status(
     """
     user_kinde_id = current_user_payload.get("sub")
     
-    # Get batch
-    batch = await crud.get_batch_by_id(batch_id=batch_id)
+    # Get batch (unvalidated: BatchWithDocuments below validates the fields once)
+    batch = await crud.get_batch_by_id(batch_id=batch_id, validate=False)
     if not batch:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2,7 +2,7 @@
 
 import uuid
 import logging # Import logging
-from typing import List, Dict, Any # Add Dict, Any
+from typing import List, Dict, Any, Optional # Add Dict, Any
 from fastapi import APIRouter, HTTPException, status, Query, Depends # Add Depends
 
 # Import Pydantic models for request/response validation
@@ -92,6 +92,7 @@ async def read_school(
 async def read_schools(
     skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of records to return"),
+    after_id: Optional[uuid.UUID] = Query(None, description="Keyset cursor: return records after this ID (the last ID of the previous page); ignores skip"),
     # === Add Authentication Dependency ===
     current_user_payload: Dict[str, Any] = Depends(get_current_user_payload)
 ):
@@ -104,7 +105,7 @@ async def read_schools(
     logger.info(f"User {user_kinde_id} attempting to read list of schools (skip={skip}, limit={limit}).")
     # TODO: Add authorization check - e.g., only show schools user is associated with?
 
-    schools = await crud.get_all_schools(skip=skip, limit=limit)
+    schools = await crud.get_all_schools(skip=skip, limit=limit, after_id=after_id, validate=False) # response_model still validates
     # No need to raise 404 if list is empty, an empty list is a valid response
     return schools
 
@@ -4,6 +4,7 @@ import uuid
 import logging # Import logging
 from typing import List, Optional, Dict, Any # Add Dict, Any
 from fastapi import APIRouter, HTTPException, status, Query, Depends # Add Depends
+from fastapi.responses import StreamingResponse
 
 # Use absolute imports from the 'app' package root
 from app.models.student import Student, StudentCreate, StudentUpdate
@@ -55,6 +56,34 @@ async def create_new_student(
     # Return the full Student model (which includes the id)
     return created_student
 
+# Declared before /{student_internal_id} so "export" is not parsed as a student ID
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Export students as NDJSON (Protected)",
+    description="Streams the authenticated teacher's students as newline-delimited JSON, one student per line. Requires authentication."
+)
+async def export_students(
+    year_group: Optional[str] = Query(None, description="Filter by year group"),
+    limit: int = Query(0, ge=0, description="Max records to return (0 = all)"),
+    current_user_payload: Dict[str, Any] = Depends(get_current_user_payload)
+):
+    """
+    Protected endpoint streaming a teacher's students. Each student is serialized as its
+    cursor batch arrives (crud.iter_all_students), so the full list is never held in memory.
+    A DB error mid-stream propagates and aborts the response, so the client sees an
+    incomplete transfer rather than a truncated 200 body.
+    """
+    user_kinde_id = current_user_payload.get("sub")
+    logger.info(f"User {user_kinde_id} exporting students (year_group={year_group}, limit={limit}).")
+
+    async def ndjson_lines():
+        async for student in crud.iter_all_students(teacher_id=user_kinde_id, year_group=year_group, limit=limit):
+            yield student.model_dump_json(by_alias=True) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @router.get(
     "/{student_internal_id}",
     response_model=Student,
@@ -103,6 +132,7 @@ async def read_students(
     year_group: Optional[str] = Query(None, description="Filter by year group"),
     skip: int = Query(0, ge=0, description="Records to skip"),
     limit: int = Query(100, ge=1, le=500, description="Max records to return"),
+    after_id: Optional[uuid.UUID] = Query(None, description="Keyset cursor: return records after this ID (the last ID of the previous page); ignores skip"),
     # === Add Authentication Dependency ===
     current_user_payload: Dict[str, Any] = Depends(get_current_user_payload)
 ):
@@ -124,7 +154,9 @@ async def read_students(
         last_name=last_name,
         year_group=year_group,
         skip=skip,
-        limit=limit
+        limit=limit,
+        after_id=after_id,
+        validate=False # Rows come from our own write paths; response_model serialization still applies
     )
     return students
 
@@ -448,6 +448,7 @@ async def create_new_teacher(
 async def read_teachers(
     skip: int = Query(0, ge=0, description="Records to skip"),
     limit: int = Query(100, ge=1, le=500, description="Max records to return"),
+    after_id: Optional[str] = Query(None, description="Keyset cursor: return teachers after this Kinde ID (the last ID of the previous page); ignores skip"),
     current_user_payload: Dict[str, Any] = Depends(get_current_user_payload)
 ):
     user_kinde_id = current_user_payload.get("sub")
@@ -464,7 +465,7 @@ async def read_teachers(
         )
     
     logger.info(f"Admin user {user_kinde_id} granted access to list teachers.")
-    teachers = await crud.get_all_teachers(skip=skip, limit=limit)
+    teachers = await crud.get_all_teachers(skip=skip, limit=limit, after_id=after_id)
     return teachers
 
 
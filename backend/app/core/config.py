@@ -28,6 +28,11 @@ class Settings(BaseSettings):
     # Database Settings
     MONGODB_URL: Optional[str] = None
     DB_NAME: str = "aidetector_dev"
+    # MongoDB client connection pool (per process). Sized for concurrent FastAPI handlers plus the batch processor.
+    MONGO_MAX_POOL_SIZE: int = 200
+    MONGO_MIN_POOL_SIZE: int = 20
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000 # Fail fast instead of queueing behind a saturated pool
+    MONGO_MAX_IDLE_TIME_MS: int = 120000 # Below Cosmos DB's idle connection timeout
 
     # Kinde Backend Settings
     KINDE_DOMAIN: Optional[str] = None
@@ -73,7 +78,6 @@ logging.basicConfig(
 logging.getLogger('uvicorn').setLevel(logging.WARNING)
 logging.getLogger('uvicorn.access').setLevel(logging.WARNING)
 logging.getLogger('fastapi').setLevel(logging.INFO if settings.DEBUG else logging.WARNING)
-logging.getLogger('motor').setLevel(logging.WARNING)
 logging.getLogger('azure').setLevel(logging.WARNING)
 logging.getLogger('pymongo').setLevel(logging.WARNING)
 
@@ -121,6 +125,10 @@ VERSION = settings.VERSION
 API_V1_PREFIX = settings.API_V1_PREFIX
 MONGODB_URL = settings.MONGODB_URL
 DB_NAME = settings.DB_NAME
+MONGO_MAX_POOL_SIZE = settings.MONGO_MAX_POOL_SIZE
+MONGO_MIN_POOL_SIZE = settings.MONGO_MIN_POOL_SIZE
+MONGO_WAIT_QUEUE_TIMEOUT_MS = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+MONGO_MAX_IDLE_TIME_MS = settings.MONGO_MAX_IDLE_TIME_MS
 KINDE_DOMAIN = settings.KINDE_DOMAIN
 KINDE_AUDIENCE = settings.KINDE_AUDIENCE
 AZURE_BLOB_CONNECTION_STRING = settings.AZURE_BLOB_CONNECTION_STRING
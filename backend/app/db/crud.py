@@ -1,19 +1,26 @@
 # app/db/crud.py
 
 # --- Core Imports ---
-from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
-from pymongo import ReturnDocument
-from pymongo.errors import DuplicateKeyError
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.write_concern import WriteConcern
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from pymongo.topology_description import TOPOLOGY_TYPE
 from pymongo.collation import Collation, CollationStrength # Add for case-insensitive aggregation if needed
+from bson.binary import Binary, UuidRepresentation
 import uuid
-from typing import List, Optional, Dict, Any, TypeVar, Type, Tuple
+from typing import List, Optional, Dict, Any, TypeVar, Type, Tuple, AsyncIterator, Union, Mapping
 from datetime import datetime, timezone, timedelta, date as date_type # Avoid naming conflict with datetime module
 import logging
-import re
 from contextlib import asynccontextmanager
-from functools import wraps
+from contextvars import ContextVar
+from functools import lru_cache, wraps
 import asyncio
-from pydantic import ValidationError
+import copy
+import time
+from types import MappingProxyType
+from pydantic import BaseModel, ValidationError
 # FIX: Import ResourceNotFoundError from azure.core.exceptions
 from azure.core.exceptions import ResourceNotFoundError 
 import os
@@ -51,8 +58,25 @@ STUDENT_COLLECTION = "students"
 # ASSIGNMENT_COLLECTION = "assignments" # COMMENTED OUT
 DOCUMENT_COLLECTION = "documents"
 RESULT_COLLECTION = "results"
+BATCH_COLLECTION = "batches"
 
 # --- Transaction and Helper Functions ---
+# Whether the cached db (_collection_cache_db) is a standalone server, resolved by
+# init_collections; None until known. The client reports an Unknown topology until its first
+# server selection, so a lazy per-call check could still start transactions on a standalone.
+_standalone_topology: Optional[bool] = None
+
+def _topology_standalone(db: AsyncDatabase) -> Optional[bool]:
+    topology_type = db.client.topology_description.topology_type
+    if topology_type == TOPOLOGY_TYPE.Unknown: return None
+    return topology_type == TOPOLOGY_TYPE.Single
+
+def _is_standalone(db: AsyncDatabase) -> bool:
+    global _standalone_topology
+    if db is not _collection_cache_db: return bool(_topology_standalone(db))
+    if _standalone_topology is None: _standalone_topology = _topology_standalone(db)
+    return bool(_standalone_topology)
+
 @asynccontextmanager
 async def transaction():
     db = get_database()
@@ -61,11 +85,17 @@ async def transaction():
         logger.warning("Database client not available or does not support sessions. Proceeding without transaction.")
         yield None
         return # Exit context manager
+    if _is_standalone(db):
+        # A standalone server cannot run transactions: skip start_session (and its failing
+        # start_transaction) instead of paying for it and erroring out on every call
+        logger.debug("Standalone MongoDB topology; proceeding without transaction.")
+        yield None
+        return
     if hasattr(db.client, 'start_session'):
         session = None # Initialize session to None
         try:
-            async with await db.client.start_session() as session:
-                async with session.start_transaction():
+            async with db.client.start_session() as session:
+                async with await session.start_transaction():
                     logger.debug("MongoDB transaction started.")
                     try:
                         yield session
@@ -91,14 +121,24 @@ async def transaction():
         yield None
 
 
+# Session of the transaction the current task is running in (set by with_transaction), so a
+# decorated call nested inside it joins that transaction even when the caller did not thread
+# session= through by hand
+_current_session: ContextVar[Optional[Any]] = ContextVar("current_session", default=None)
+
+# Only multi-document writes are decorated: a single-document write is already atomic, and a
+# transaction around it only adds start/commit round-trips
 def with_transaction(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        # Check if a session is already provided (nested transaction)
+        # Check if a session is already provided (nested transaction), explicitly or ambiently
         session = kwargs.get('session')
+        if session is None:
+            session = _current_session.get()
+            if session is not None: kwargs['session'] = session
         if session is not None:
             # If called within an existing transaction, just execute the function
-            logger.debug(f"Function {func.__name__} called within existing session.")
+            logger.debug("Function %s called within existing session.", func.__name__)
             return await func(*args, **kwargs)
         else:
             # If no session provided, start a new one (or proceed without if not supported)
@@ -106,9 +146,13 @@ def with_transaction(func):
                 async with transaction() as new_session:
                     # Pass the new session (or None if transactions not supported) to the function
                     kwargs['session'] = new_session
-                    logger.debug(f"Function {func.__name__} starting with new/no session.")
-                    result = await func(*args, **kwargs)
-                    logger.debug(f"Function {func.__name__} completed within new/no session.")
+                    logger.debug("Function %s starting with new/no session.", func.__name__)
+                    token = _current_session.set(new_session)
+                    try:
+                        result = await func(*args, **kwargs)
+                    finally:
+                        _current_session.reset(token)
+                    logger.debug("Function %s completed within new/no session.", func.__name__)
                     return result
             except Exception as e:
                 # Log error from transaction context or the function itself
@@ -117,22 +161,213 @@ def with_transaction(func):
                 return None
     return wrapper
 
+# Soft deletes only flip an idempotent flag that is safe to re-apply on retry, so they
+# acknowledge from the primary without waiting for the journal flush. Inserts keep the
+# default (durable) write concern. Inside a transaction the transaction's concern wins.
+SOFT_DELETE_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+# Case-insensitive (strength 2) collation for exact name matching; must match the
+# collation of the students name index in init_db so the query stays index-eligible.
+NAME_COLLATION = Collation(locale="en", strength=CollationStrength.SECONDARY)
+
+_UTC = timezone.utc
+
+def _utcnow() -> datetime:
+    """Current time as a timezone-aware UTC datetime (single definition for all write paths)."""
+    return datetime.now(_UTC)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+def _hydrate(model_cls: Type[ModelT], doc: Dict[str, Any], validate: bool = True) -> ModelT:
+    """
+    Builds a model from a stored or just-inserted document (no re-read after insert).
+    The models alias id to "_id", so validation takes the document as-is; model_construct
+    (validate=False, trusted rows) gets the _id -> id rename done here instead.
+    The get_all_* and update_* functions pass their validate flag through here: False skips
+    the validator chain, and is only for rows written through this module's own create/update paths.
+    """
+    if validate: return model_cls(**doc)
+    mapped_data = {**doc}
+    if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
+    return model_cls.model_construct(**mapped_data)
+
+async def _aggregate_list(collection: AsyncCollection, pipeline: List[Dict[str, Any]], length: Optional[int] = None, session=None) -> List[Dict[str, Any]]:
+    """Runs an aggregation and drains its cursor (AsyncCollection.aggregate is awaited for the cursor)."""
+    cursor = await collection.aggregate(pipeline, session=session)
+    return await cursor.to_list(length=length)
+
+def _uuids_to_bson(ids: List[uuid.UUID]) -> List[Binary]:
+    """Encodes UUIDs to BSON Binary subtype 4 (standard) once, for reuse in $in / $each operands."""
+    return [Binary.from_uuid(value, UuidRepresentation.STANDARD) for value in ids]
+
+def _model_projection(model_cls) -> Dict[str, int]:
+    """Builds a find() projection containing only the fields the model declares (by DB name/alias)."""
+    return {(field.alias or name): 1 for name, field in model_cls.model_fields.items()}
+
+# Default projections for list reads: only ship the fields the response models use,
+# so legacy/auxiliary fields stored on the documents never cross the wire.
+STUDENT_LIST_PROJECTION = _model_projection(Student)
+DOCUMENT_LIST_PROJECTION = _model_projection(Document)
+SCHOOL_LIST_PROJECTION = _model_projection(School)
+TEACHER_LIST_PROJECTION = _model_projection(Teacher)
+CLASSGROUP_LIST_PROJECTION = _model_projection(ClassGroup)
+# Post-image projection for update_result (update_document_status reuses DOCUMENT_LIST_PROJECTION)
+RESULT_PROJECTION = _model_projection(Result)
+
+# Plain equality is sargable (an exact index key / partial-index match), unlike {"$ne": True}.
+# Every insert path writes is_deleted=False; legacy docs missing the field are
+# backfilled by app/migrations/backfill_is_deleted.py. Read-only: splice with ** into a query.
+_SOFT_DELETE_FILTERS: Dict[bool, Mapping[str, Any]] = {
+    False: MappingProxyType({"is_deleted": False}),
+    True: MappingProxyType({}),
+}
+
 def soft_delete_filter(include_deleted: bool = False) -> Dict[str, Any]:
-    if include_deleted: return {}
-    # return {"is_deleted": False} # Previous implementation
-    # NEW: Filter for documents where is_deleted is NOT True (includes missing or False)
-    return {"is_deleted": {"$ne": True}} 
+    # Returns a fresh dict: callers add their own keys to it
+    return dict(_SOFT_DELETE_FILTERS[bool(include_deleted)])
+
+# List pagination. after_id=None keeps offset pagination (skip/limit, O(skip) on the server).
+# With after_id the page is keyset-paginated: _id > after_id in _id order, so every page is an
+# _id index range of `limit` keys however deep it is. Callers pass the last item's id of a full
+# page as the next after_id (a short page is the last one).
+def _keyset_filter(query: Dict[str, Any], after_id: Optional[Any]) -> Dict[str, Any]:
+    if after_id is not None: query["_id"] = {"$gt": after_id}
+    return query
+
+def _paginate(find_cursor, skip: int, limit: int, after_id: Optional[Any]):
+    if after_id is None:
+        return find_cursor.skip(skip).limit(limit).batch_size(_list_batch_size(limit))
+    return find_cursor.sort("_id", ASCENDING).limit(limit).batch_size(_list_batch_size(limit))
 
-def _get_collection(collection_name: str) -> Optional[AsyncIOMotorCollection]:
+# Cursor batch sizes. A list page asks for its whole page in the first reply (one round-trip
+# for to_list) up to LIST_BATCH_SIZE_CAP; the streaming iter_* readers hold one batch at a time,
+# so a larger STREAM_BATCH_SIZE trades a little memory for fewer getMore round-trips.
+# limit=0 ("no limit") would mean "server default" as a batch size, so it maps to the cap.
+LIST_BATCH_SIZE_CAP = 500
+STREAM_BATCH_SIZE = 1000
+
+def _list_batch_size(limit: int, cap: int = LIST_BATCH_SIZE_CAP) -> int:
+    return min(limit, cap) if limit else cap
+
+# Collection handles resolved from the current database object. The cache is tied to
+# the database instance, so a reconnect (new db object) transparently repopulates it.
+_collection_cache: Dict[str, AsyncCollection] = {}
+_collection_cache_db: Optional[AsyncDatabase] = None
+
+def _get_collection(collection_name: str) -> Optional[AsyncCollection]:
+    global _collection_cache_db, _standalone_topology
     db = get_database()
-    if db is not None: return db[collection_name]
-    logger.error("Database connection is not available (db object is None). Cannot get collection.")
-    return None
+    if db is None:
+        logger.error("Database connection is not available (db object is None). Cannot get collection.")
+        return None
+    if db is not _collection_cache_db:
+        _collection_cache.clear(); _collection_cache_db = db; _standalone_topology = None
+    collection = _collection_cache.get(collection_name)
+    if collection is None:
+        collection = _collection_cache[collection_name] = db[collection_name]
+    return collection
+
+def init_collections(db: AsyncDatabase) -> None:
+    """Resolves the handles of every collection crud uses once, at startup (see main.startup_event).
+
+    Request paths then find a warm cache in _get_collection; a reconnect (new db object)
+    still repopulates it lazily. Also records whether the server is standalone: called after
+    connect_to_mongo's ping, the client's topology is already known here.
+    """
+    global _collection_cache_db, _standalone_topology
+    _collection_cache.clear(); _collection_cache_db = db
+    _standalone_topology = _topology_standalone(db)
+    for collection_name in (
+        SCHOOL_COLLECTION, TEACHER_COLLECTION, CLASSGROUP_COLLECTION, STUDENT_COLLECTION,
+        DOCUMENT_COLLECTION, RESULT_COLLECTION, BATCH_COLLECTION
+    ):
+        _collection_cache[collection_name] = db[collection_name]
+
+def reset_collection_cache() -> None:
+    """Drops the cached collection handles (see main.shutdown_event), so no handle bound to a
+    closed client outlives it; the next _get_collection after a reconnect repopulates lazily."""
+    global _collection_cache_db, _standalone_topology
+    _collection_cache.clear(); _collection_cache_db = None; _standalone_topology = None
+
+# --- Dashboard read cache ---
+# Per-process cache-aside for the dashboard/analytics aggregations, keyed by teacher_id and
+# then by kind. Entries expire after their TTL (DASHBOARD_CACHE_TTL_SECONDS unless given) and
+# all of a teacher's entries are dropped by the document/result write paths for that teacher.
+# With several workers, a worker that did not see the write can serve a stale value for at most the TTL.
+DASHBOARD_CACHE_TTL_SECONDS = 60.0
+DASHBOARD_STATS_CACHE = "dashboard_stats"
+SCORE_DISTRIBUTION_CACHE = "score_distribution"
+USAGE_STATS_CACHE = "usage_stats"
+# One TTL for open and closed periods alike: deletes still change an ended period, and
+# invalidation only reaches this worker, so the TTL bounds staleness everywhere else.
+USAGE_STATS_CACHE_TTL_SECONDS = 300.0
+_DASHBOARD_CACHE_MAX_ENTRIES = 4096 # Teachers with cached entries
+_dashboard_cache: Dict[str, Dict[str, Tuple[float, Any]]] = {}
+
+def _dashboard_cache_get(kind: str, teacher_id: str) -> Optional[Any]:
+    entries = _dashboard_cache.get(teacher_id)
+    entry = entries.get(kind) if entries else None
+    if entry is None: return None
+    expires_at, value = entry
+    if expires_at <= time.monotonic():
+        entries.pop(kind, None); return None
+    return copy.deepcopy(value) # Callers own the returned dict
+
+def _dashboard_cache_set(kind: str, teacher_id: str, value: Any, ttl: float = DASHBOARD_CACHE_TTL_SECONDS) -> None:
+    now = time.monotonic()
+    if teacher_id not in _dashboard_cache and len(_dashboard_cache) >= _DASHBOARD_CACHE_MAX_ENTRIES:
+        for owner_id in list(_dashboard_cache):
+            entries = _dashboard_cache[owner_id]
+            for key in [k for k, (expires_at, _) in entries.items() if expires_at <= now]:
+                del entries[key]
+            if not entries: del _dashboard_cache[owner_id]
+    _dashboard_cache.setdefault(teacher_id, {})[kind] = (now + ttl, copy.deepcopy(value))
+
+def invalidate_dashboard_cache(teacher_id: Optional[str]) -> None:
+    """Drops the cached dashboard/analytics aggregations for a teacher after one of their documents/results changes."""
+    if not teacher_id: return
+    _dashboard_cache.pop(teacher_id, None)
+
+# In-flight dashboard reads, keyed by (function name, key). Concurrent identical calls
+# (reloads, several tabs) await the first caller's result instead of re-running the queries.
+_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+def single_flight(key_fn):
+    """
+    Coalesces concurrent calls of the decorated coroutine that share key_fn(*args, **kwargs).
+    The first caller runs the function; the others await its result (as a deep copy).
+    A falsy key disables coalescing for that call.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            call_key = key_fn(*args, **kwargs)
+            if not call_key:
+                return await func(*args, **kwargs)
+            key = (func.__name__, str(call_key))
+            pending = _inflight.get(key)
+            if pending is not None:
+                # shield: a cancelled follower must not cancel the leader's shared future
+                return copy.deepcopy(await asyncio.shield(pending))
+            future = asyncio.get_running_loop().create_future()
+            _inflight[key] = future
+            try:
+                result = await func(*args, **kwargs)
+                future.set_result(copy.deepcopy(result)) # Snapshot: the leader's caller may mutate its result
+                return result
+            except asyncio.CancelledError:
+                future.cancel(); raise
+            except Exception as e:
+                future.set_exception(e); future.exception() # Mark retrieved when nobody is waiting
+                raise
+            finally:
+                _inflight.pop(key, None)
+        return wrapper
+    return decorator
 
 # --- School CRUD Functions ---
-@with_transaction
 async def create_school(school_in: SchoolCreate, session=None) -> Optional[School]:
-    collection = _get_collection(SCHOOL_COLLECTION); now = datetime.now(timezone.utc)
+    collection = _get_collection(SCHOOL_COLLECTION); now = _utcnow()
     if collection is None: return None
     new_school_id = uuid.uuid4()
     school_doc = school_in.model_dump(); school_doc["_id"] = new_school_id
@@ -140,67 +375,65 @@ async def create_school(school_in: SchoolCreate, session=None) -> Optional[Schoo
     logger.info(f"Inserting school: {school_doc['_id']}")
     try:
         inserted_result = await collection.insert_one(school_doc, session=session)
-        if inserted_result.acknowledged: created_doc = await collection.find_one({"_id": new_school_id}, session=session)
+        # Build the School model from the inserted document (no re-read needed)
+        if inserted_result.acknowledged: return _hydrate(School, school_doc)
         else: logger.error(f"Insert not acknowledged for school ID: {new_school_id}"); return None
-        if created_doc: return School(**created_doc) # Assumes schema handles alias
-        else: logger.error(f"Failed to retrieve school after insert: {new_school_id}"); return None
     except Exception as e: logger.error(f"Error inserting school: {e}", exc_info=True); return None
 
 async def get_school_by_id(school_id: uuid.UUID, include_deleted: bool = False, session=None) -> Optional[School]:
     collection = _get_collection(SCHOOL_COLLECTION);
     if collection is None: return None
     logger.info(f"Getting school ID: {school_id}")
-    query = {"_id": school_id}; query.update(soft_delete_filter(include_deleted))
+    query = {"_id": school_id, **_SOFT_DELETE_FILTERS[bool(include_deleted)]}
     try: school_doc = await collection.find_one(query, session=session)
     except Exception as e: logger.error(f"Error getting school: {e}", exc_info=True); return None
     if school_doc: return School(**school_doc) # Assumes schema handles alias
     else: logger.warning(f"School {school_id} not found."); return None
 
-async def get_all_schools(skip: int = 0, limit: int = 100, include_deleted: bool = False, session=None) -> List[School]:
+async def get_all_schools(skip: int = 0, limit: int = 100, include_deleted: bool = False, after_id: Optional[uuid.UUID] = None, validate: bool = True, projection: Optional[Dict[str, Any]] = None, session=None) -> List[School]:
     collection = _get_collection(SCHOOL_COLLECTION); schools_list: List[School] = []
     if collection is None: return schools_list
     query = soft_delete_filter(include_deleted)
-    logger.info(f"Getting all schools (deleted={include_deleted}) skip={skip} limit={limit}")
+    logger.info(f"Getting all schools (deleted={include_deleted}) skip={skip} limit={limit} after_id={after_id}")
     try:
-        cursor = collection.find(query, session=session).skip(skip).limit(limit)
-        async for doc in cursor:
+        cursor = _paginate(collection.find(_keyset_filter(query, after_id), projection=projection or SCHOOL_LIST_PROJECTION, session=session), skip, limit, after_id)
+        # limit=0 means "no limit" for find(); to_list needs None for that
+        docs = await cursor.to_list(length=limit or None)
+        for doc in docs:
             try:
-                mapped_data = {**doc}
-                if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-                else: logger.warning(f"School doc missing '_id': {doc}"); continue
-                schools_list.append(School(**mapped_data))
+                if "_id" not in doc: logger.warning(f"School doc missing '_id': {doc}"); continue
+                schools_list.append(_hydrate(School, doc, validate))
             except Exception as validation_err: logger.error(f"Pydantic validation failed for school doc {doc.get('_id', 'UNKNOWN')}: {validation_err}")
     except Exception as e: logger.error(f"Error getting all schools: {e}", exc_info=True)
     return schools_list
 
-@with_transaction
-async def update_school(school_id: uuid.UUID, school_in: SchoolUpdate, session=None) -> Optional[School]:
-    collection = _get_collection(SCHOOL_COLLECTION); now = datetime.now(timezone.utc)
+# Fields a caller may change through update_school
+_SCHOOL_UPDATE_FIELDS = frozenset({"school_name", "school_state_region", "school_country"})
+
+async def update_school(school_id: uuid.UUID, school_in: SchoolUpdate, validate: bool = True, session=None) -> Optional[School]:
+    collection = _get_collection(SCHOOL_COLLECTION); now = _utcnow()
     if collection is None: return None
-    update_data = school_in.model_dump(exclude_unset=True)
-    update_data.pop("_id", None); update_data.pop("id", None); update_data.pop("created_at", None)
+    update_data = {k: getattr(school_in, k) for k in school_in.model_fields_set & _SCHOOL_UPDATE_FIELDS}
     if not update_data: logger.warning(f"No update data for school {school_id}"); return await get_school_by_id(school_id, include_deleted=False, session=session)
     update_data["updated_at"] = now; logger.info(f"Updating school {school_id}")
-    query_filter = {"_id": school_id, "is_deleted": {"$ne": True}}
+    query_filter = {"_id": school_id, "is_deleted": False}
     try:
         updated_doc = await collection.find_one_and_update(query_filter, {"$set": update_data}, return_document=ReturnDocument.AFTER, session=session)
-        if updated_doc: return School(**updated_doc) # Assumes schema handles alias
+        if updated_doc: return _hydrate(School, updated_doc, validate)
         else: logger.warning(f"School {school_id} not found or deleted for update."); return None
     except Exception as e: logger.error(f"Error updating school: {e}", exc_info=True); return None
 
-@with_transaction
 async def delete_school(school_id: uuid.UUID, hard_delete: bool = False, session=None) -> bool:
-    collection = _get_collection(SCHOOL_COLLECTION); now = datetime.now(timezone.utc)
+    collection = _get_collection(SCHOOL_COLLECTION); now = _utcnow()
     if collection is None: return False
     logger.info(f"{'Hard' if hard_delete else 'Soft'} deleting school {school_id}")
     count = 0
     try:
         if hard_delete: result = await collection.delete_one({"_id": school_id}, session=session); count = result.deleted_count
         else:
-            now = datetime.now(timezone.utc)
             update_payload = {"is_deleted": True, "updated_at": now}
             result = await collection.update_one(
-                {"_id": school_id, "is_deleted": {"$ne": True}},
+                {"_id": school_id, "is_deleted": False},
                 {"$set": update_payload},
                 session=session
             )
@@ -219,7 +452,9 @@ async def create_teacher(
 ) -> Optional[Teacher]:
     """
     Creates a teacher record, using the Kinde ID as the primary document ID (_id).
-    Uses data from TeacherCreate model.
+    Uses data from TeacherCreate model. The insert is a single $setOnInsert upsert keyed on
+    _id, so an existing teacher (live or soft-deleted) is detected in the same round-trip
+    and returns None.
     """
     if session:
         logger.debug("create_teacher called within an existing session.")
@@ -227,20 +462,11 @@ async def create_teacher(
         logger.warning("create_teacher called WITHOUT an active session (transaction decorator removed/disabled).")
 
     collection = _get_collection(TEACHER_COLLECTION)
-    now = datetime.now(timezone.utc)
+    now = _utcnow()
     if collection is None: 
         logger.error("Teacher collection not found.")
         return None
 
-    # --- Application-level uniqueness check for _id (which will be the kinde_id) ---
-    # Note: MongoDB enforces _id uniqueness at the DB level, but an early check can be useful.
-    existing_teacher_count = await collection.count_documents({"_id": kinde_id, "is_deleted": {"$ne": True}}, session=session)
-    if existing_teacher_count > 0:
-        logger.warning(f"Attempted to create a teacher with an existing Kinde ID (as _id): {kinde_id}")
-        # Consider raising HTTPException(status_code=409, detail=...)
-        return None 
-    # --- End uniqueness check ---
-
     # Create the document to insert using data from TeacherCreate
     teacher_doc = teacher_in.model_dump()
     teacher_doc["_id"] = kinde_id      # Set Kinde ID as the document's primary key (_id)
@@ -263,20 +489,19 @@ async def create_teacher(
 
     logger.info(f"Attempting to insert new teacher with _id (Kinde ID): {kinde_id}")
     try:
-        inserted_result = await collection.insert_one(teacher_doc, session=session)
-        if inserted_result.acknowledged:
-            # Fetch the newly created document using the kinde_id (which is now _id)
-            created_doc = await collection.find_one({"_id": kinde_id, "is_deleted": {"$ne": True}}, session=session)
-            if created_doc:
-                logger.info(f"Successfully created teacher with _id (Kinde ID): {kinde_id}")
-                return Teacher(**created_doc) 
-            else:
-                logger.error(f"Failed to retrieve teacher after insert, _id (Kinde ID): {kinde_id}")
-                return None
-        else:
-            logger.error(f"Insert not acknowledged for teacher with _id (Kinde ID): {kinde_id}")
+        # _id seeds the upserted document, so it is left out of $setOnInsert
+        on_insert = {k: v for k, v in teacher_doc.items() if k != "_id"}
+        existing_doc = await collection.find_one_and_update(
+            {"_id": kinde_id}, {"$setOnInsert": on_insert}, upsert=True,
+            projection={"_id": 1}, return_document=ReturnDocument.BEFORE, session=session
+        )
+        if existing_doc is not None:
+            logger.warning(f"Attempted to create a teacher with an existing Kinde ID (as _id): {kinde_id}")
             return None
-    except DuplicateKeyError as e:
+        # No pre-image means the upsert inserted our document: build the model from it (no re-read)
+        logger.info(f"Successfully created teacher with _id (Kinde ID): {kinde_id}")
+        return _hydrate(Teacher, teacher_doc)
+    except DuplicateKeyError as e: # Concurrent upserts can still race on _id
         logger.error(f"Database-level DuplicateKeyError for _id (Kinde ID) '{kinde_id}': {e.details}", exc_info=True)
         return None
     except Exception as e:
@@ -290,7 +515,7 @@ async def get_teacher_by_id(teacher_id: str, session=None) -> Optional[Teacher]:
     logger.info(f"Getting teacher by internal ID: {teacher_id}")
     try:
         # Ensure ID is searched as string
-        teacher_doc = await collection.find_one({"_id": teacher_id, "is_deleted": {"$ne": True}}, session=session)
+        teacher_doc = await collection.find_one({"_id": teacher_id, "is_deleted": False}, session=session)
         if teacher_doc:
             # Convert _id to string BEFORE Pydantic validation if it's a UUID
             if isinstance(teacher_doc.get("_id"), uuid.UUID):
@@ -307,7 +532,7 @@ async def get_teacher_by_kinde_id(kinde_id: str, session=None) -> Optional[Teach
     if collection is None: return None
     logger.info(f"Getting teacher by kinde_id: {kinde_id}")
     try:
-        teacher_doc = await collection.find_one({"kinde_id": kinde_id, "is_deleted": {"$ne": True}}, session=session)
+        teacher_doc = await collection.find_one({"kinde_id": kinde_id, "is_deleted": False}, session=session)
         if teacher_doc:
             # Convert _id to string BEFORE Pydantic validation if it's a UUID
             if isinstance(teacher_doc.get("_id"), uuid.UUID):
@@ -324,41 +549,67 @@ async def get_teacher_by_kinde_id(kinde_id: str, session=None) -> Optional[Teach
         logger.error(f"General error getting teacher by Kinde ID {kinde_id}: {e}", exc_info=True)
         return None
 
-async def get_all_teachers(skip: int = 0, limit: int = 100, include_deleted: bool = False, session=None) -> List[Teacher]:
+# Per-request memo of resolved teachers (kinde_id -> Teacher). Every request is served in
+# its own context, so entries never leak between requests; the first lookup in a request
+# creates the memo. Long-lived tasks (batch processor) should call get_teacher_by_kinde_id.
+_request_teachers: ContextVar[Optional[Dict[str, Teacher]]] = ContextVar("request_teachers", default=None)
+
+def _request_teacher_memo() -> Dict[str, Teacher]:
+    memo = _request_teachers.get()
+    if memo is None:
+        memo = {}; _request_teachers.set(memo)
+    return memo
+
+def forget_current_teacher(kinde_id: str) -> None:
+    """Drops a memoized teacher after it is updated or deleted within the request."""
+    memo = _request_teachers.get()
+    if memo is not None: memo.pop(kinde_id, None)
+
+async def get_current_teacher(kinde_id: str) -> Optional[Teacher]:
+    """get_teacher_by_kinde_id, resolved at most once per request for a given Kinde ID."""
+    memo = _request_teacher_memo()
+    teacher = memo.get(kinde_id)
+    if teacher is None:
+        teacher = await get_teacher_by_kinde_id(kinde_id)
+        if teacher is not None: memo[kinde_id] = teacher
+    return teacher
+
+async def get_all_teachers(skip: int = 0, limit: int = 100, include_deleted: bool = False, after_id: Optional[str] = None, validate: bool = True, projection: Optional[Dict[str, Any]] = None, session=None) -> List[Teacher]:
     collection = _get_collection(TEACHER_COLLECTION); teachers_list: List[Teacher] = []
     if collection is None: return teachers_list
     query = soft_delete_filter(include_deleted)
-    logger.info(f"Getting all teachers skip={skip} limit={limit}")
+    logger.info(f"Getting all teachers skip={skip} limit={limit} after_id={after_id}")
     try:
-        # Fetch without session
-        cursor = collection.find(query).skip(skip).limit(limit)
-        async for doc in cursor:
+        # Fetch without session; teacher _ids are Kinde ID strings, so after_id is one too
+        cursor = _paginate(collection.find(_keyset_filter(query, after_id), projection=projection or TEACHER_LIST_PROJECTION), skip, limit, after_id)
+        docs = await cursor.to_list(length=limit or None)
+        for doc in docs:
             try:
-                 teachers_list.append(Teacher(**doc))
+                 teachers_list.append(_hydrate(Teacher, doc, validate))
             except Exception as validation_err:
                 logger.error(f"Pydantic validation failed for teacher doc {doc.get('_id', 'UNKNOWN')}: {validation_err}")
     except Exception as e:
         logger.error(f"Error getting all teachers: {e}", exc_info=True)
     return teachers_list
 
-@with_transaction # Keep transaction for update as it modifies existing data
-async def update_teacher(kinde_id: str, teacher_in: TeacherUpdate, session=None) -> Optional[Teacher]:
+# Profile fields a teacher may change through update_teacher; kinde_id, email and
+# how_did_you_hear are set at sign-up and never updatable here
+_TEACHER_UPDATE_FIELDS = frozenset({
+    "first_name", "last_name", "school_name", "role", "is_administrator",
+    "description", "country", "state_county", "is_active",
+})
+
+async def update_teacher(kinde_id: str, teacher_in: TeacherUpdate, validate: bool = True, session=None) -> Optional[Teacher]:
     """Updates a teacher's profile information identified by their Kinde ID."""
-    collection = _get_collection(TEACHER_COLLECTION); now = datetime.now(timezone.utc)
+    forget_current_teacher(kinde_id)
+    collection = _get_collection(TEACHER_COLLECTION); now = _utcnow()
     if collection is None: return None
 
-    update_data = teacher_in.model_dump(exclude_unset=True)
+    update_data = {k: getattr(teacher_in, k) for k in teacher_in.model_fields_set & _TEACHER_UPDATE_FIELDS}
 
     if 'role' in update_data and isinstance(update_data.get('role'), TeacherRole):
         update_data['role'] = update_data['role'].value
 
-    # Remove fields that should not be updated directly
-    update_data.pop("_id", None); update_data.pop("id", None)
-    update_data.pop("kinde_id", None)
-    update_data.pop("created_at", None)
-    update_data.pop("how_did_you_hear", None)
-    update_data.pop("email", None) # Don't allow email update via profile
-
     if not update_data:
         logger.warning(f"No valid update data provided for teacher with Kinde ID {kinde_id}")
         # Fetch without session if called outside transaction
@@ -367,7 +618,7 @@ async def update_teacher(kinde_id: str, teacher_in: TeacherUpdate, session=None)
     update_data["updated_at"] = now
     logger.info(f"Updating teacher with Kinde ID {kinde_id} with data: {update_data}")
 
-    query_filter = {"kinde_id": kinde_id, "is_deleted": {"$ne": True}}
+    query_filter = {"kinde_id": kinde_id, "is_deleted": False}
 
     try:
         updated_doc = await collection.find_one_and_update(
@@ -384,7 +635,7 @@ async def update_teacher(kinde_id: str, teacher_in: TeacherUpdate, session=None)
                 logger.debug(f"Converting updated_doc _id {updated_doc['_id']} to string for Pydantic.")
                 updated_doc["_id"] = str(updated_doc["_id"])
             # *** END CONVERSION ***
-            return Teacher(**updated_doc)
+            return _hydrate(Teacher, updated_doc, validate)
         else:
             logger.warning(f"Teacher with Kinde ID {kinde_id} not found or already deleted during update attempt.")
             return None
@@ -392,9 +643,9 @@ async def update_teacher(kinde_id: str, teacher_in: TeacherUpdate, session=None)
         logger.error(f"Error during teacher update operation for Kinde ID {kinde_id}: {e}", exc_info=True)
         return None
 
-@with_transaction # Keep transaction for delete
 async def delete_teacher(kinde_id: str, hard_delete: bool = False, session=None) -> bool:
     """Deletes a teacher record identified by their Kinde ID."""
+    forget_current_teacher(kinde_id)
     collection = _get_collection(TEACHER_COLLECTION)
     if collection is None: return False
     logger.info(f"{'Hard' if hard_delete else 'Soft'} deleting teacher with Kinde ID {kinde_id}")
@@ -405,10 +656,10 @@ async def delete_teacher(kinde_id: str, hard_delete: bool = False, session=None)
             result = await collection.delete_one(query_filter, session=session);
             count = result.deleted_count
         else:
-            now = datetime.now(timezone.utc)
+            now = _utcnow()
             update_payload = {"is_deleted": True, "updated_at": now}
             result = await collection.update_one(
-                {"kinde_id": kinde_id, "is_deleted": {"$ne": True}},
+                {"kinde_id": kinde_id, "is_deleted": False},
                 {"$set": update_payload},
                 session=session
             );
@@ -431,7 +682,7 @@ async def create_class_group(
     session=None
 ) -> Optional[ClassGroup]:
     """Creates a class group record using data and the provided teacher ID."""
-    collection = _get_collection(CLASSGROUP_COLLECTION); now = datetime.now(timezone.utc)
+    collection = _get_collection(CLASSGROUP_COLLECTION); now = _utcnow()
     if collection is None: return None
     new_id = uuid.uuid4()
     doc = class_group_in.model_dump();
@@ -442,64 +693,58 @@ async def create_class_group(
     logger.info(f"Inserting class group: {doc['_id']} for teacher: {teacher_id}")
     try: inserted_result = await collection.insert_one(doc, session=session) # Pass session if provided
     except Exception as e: logger.error(f"Error inserting class group: {e}", exc_info=True); return None
-    if inserted_result.acknowledged: created_doc = await collection.find_one({"_id": new_id}, session=session)
+    # Build the ClassGroup model from the inserted document (no re-read needed)
+    if inserted_result.acknowledged: return _hydrate(ClassGroup, doc)
     else: logger.error(f"Insert class group not acknowledged: {new_id}"); return None
-    if created_doc: return ClassGroup(**created_doc) # Assumes schema handles alias
-    else: logger.error(f"Failed retrieve class group post-insert: {new_id}"); return None
 
 async def get_class_group_by_id(class_group_id: uuid.UUID, include_deleted: bool = False, session=None) -> Optional[ClassGroup]:
     collection = _get_collection(CLASSGROUP_COLLECTION);
     if collection is None: return None
     logger.info(f"Getting class group: {class_group_id}")
-    query = {"_id": class_group_id}; query.update(soft_delete_filter(include_deleted))
+    query = {"_id": class_group_id, **_SOFT_DELETE_FILTERS[bool(include_deleted)]}
     try: doc = await collection.find_one(query, session=session)
     except Exception as e: logger.error(f"Error getting class group: {e}", exc_info=True); return None
     if doc: return ClassGroup(**doc) # Assumes schema handles alias
     else: logger.warning(f"Class group {class_group_id} not found."); return None
 
-async def get_all_class_groups( teacher_id: Optional[uuid.UUID] = None, school_id: Optional[uuid.UUID] = None, skip: int = 0, limit: int = 100, include_deleted: bool = False, session=None) -> List[ClassGroup]:
+async def get_all_class_groups( teacher_id: Optional[uuid.UUID] = None, school_id: Optional[uuid.UUID] = None, skip: int = 0, limit: int = 100, include_deleted: bool = False, after_id: Optional[uuid.UUID] = None, validate: bool = True, projection: Optional[Dict[str, Any]] = None, session=None) -> List[ClassGroup]:
     collection = _get_collection(CLASSGROUP_COLLECTION); items_list: List[ClassGroup] = []
     if collection is None: return items_list
     filter_query = soft_delete_filter(include_deleted)
     if teacher_id: filter_query["teacher_id"] = teacher_id # Assuming ClassGroup stores teacher's internal UUID (_id/id)
     # if school_id: filter_query["school_id"] = school_id # Assuming ClassGroup stores school's internal UUID (_id/id)
-    logger.info(f"Getting all class groups filter={filter_query} skip={skip} limit={limit}")
+    logger.info(f"Getting all class groups filter={filter_query} skip={skip} limit={limit} after_id={after_id}")
     try:
-        cursor = collection.find(filter_query, session=session).skip(skip).limit(limit)
-        async for doc in cursor:
+        cursor = _paginate(collection.find(_keyset_filter(filter_query, after_id), projection=projection or CLASSGROUP_LIST_PROJECTION, session=session), skip, limit, after_id)
+        docs = await cursor.to_list(length=limit or None)
+        for doc in docs:
             try:
-                mapped_data = {**doc}
-                if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-                else: logger.warning(f"ClassGroup doc missing '_id': {doc}"); continue
-                items_list.append(ClassGroup(**mapped_data))
+                if "_id" not in doc: logger.warning(f"ClassGroup doc missing '_id': {doc}"); continue
+                items_list.append(_hydrate(ClassGroup, doc, validate))
             except Exception as validation_err: logger.error(f"Pydantic validation failed for class group doc {doc.get('_id', 'UNKNOWN')}: {validation_err}")
     except Exception as e: logger.error(f"Error getting all class groups: {e}", exc_info=True)
     return items_list
 
-@with_transaction
-async def update_class_group(class_group_id: uuid.UUID, teacher_id: str, class_group_in: ClassGroupUpdate, session=None) -> Optional[ClassGroup]:
-    collection = _get_collection(CLASSGROUP_COLLECTION); now = datetime.now(timezone.utc)
+# Fields a caller may change through update_class_group; the owning teacher_id is not among them
+_CLASSGROUP_UPDATE_FIELDS = frozenset({"class_name", "academic_year", "student_ids"})
+
+async def update_class_group(class_group_id: uuid.UUID, teacher_id: str, class_group_in: ClassGroupUpdate, validate: bool = True, session=None) -> Optional[ClassGroup]:
+    collection = _get_collection(CLASSGROUP_COLLECTION); now = _utcnow()
     if collection is None: return None
-    update_data = class_group_in.model_dump(exclude_unset=True)
-    update_data.pop("_id", None); update_data.pop("id", None); # Pop internal 'id' if present
-    update_data.pop("created_at", None)
-    # Prevent changing teacher/school association via this update if needed
-    # update_data.pop("teacher_id", None) # Teacher ID should not be changed here
-    # update_data.pop("school_id", None)
+    update_data = {k: getattr(class_group_in, k) for k in class_group_in.model_fields_set & _CLASSGROUP_UPDATE_FIELDS}
     if not update_data: 
         logger.warning(f"No update data for class group {class_group_id}")
         # Need to fetch class_group by id and teacher_id if we are to implement RBAC here
         # For now, just getting by id, assuming teacher_id check is for the update operation itself.
         return await get_class_group_by_id(class_group_id, include_deleted=False, session=session)
     update_data["updated_at"] = now; logger.info(f"Updating class group {class_group_id} for teacher {teacher_id}")
-    query_filter = {"_id": class_group_id, "teacher_id": teacher_id, "is_deleted": {"$ne": True}}
+    query_filter = {"_id": class_group_id, "teacher_id": teacher_id, "is_deleted": False}
     try:
         updated_doc = await collection.find_one_and_update( query_filter, {"$set": update_data}, return_document=ReturnDocument.AFTER, session=session)
-        if updated_doc: return ClassGroup(**updated_doc) # Assumes schema handles alias
+        if updated_doc: return _hydrate(ClassGroup, updated_doc, validate)
         else: logger.warning(f"Class group {class_group_id} not found or already deleted for update."); return None
     except Exception as e: logger.error(f"Error during class group update operation: {e}", exc_info=True); return None
 
-@with_transaction
 async def delete_class_group(class_group_id: uuid.UUID, teacher_id: str, hard_delete: bool = False, session=None) -> bool:
     collection = _get_collection(CLASSGROUP_COLLECTION)
     if collection is None: return False
@@ -511,10 +756,10 @@ async def delete_class_group(class_group_id: uuid.UUID, teacher_id: str, hard_de
             result = await collection.delete_one(query_base, session=session)
             count = result.deleted_count
         else:
-            now = datetime.now(timezone.utc)
+            now = _utcnow()
             # For soft delete, also ensure it's not already deleted
-            soft_delete_query = {**query_base, "is_deleted": {"$ne": True}}
-            result = await collection.update_one(
+            soft_delete_query = {**query_base, "is_deleted": False}
+            result = await collection.with_options(write_concern=SOFT_DELETE_WRITE_CONCERN).update_one(
                 soft_delete_query,
                 {"$set": {"is_deleted": True, "updated_at": now}}, session=session
             )
@@ -530,7 +775,6 @@ async def delete_class_group(class_group_id: uuid.UUID, teacher_id: str, hard_de
         return False
 
 # --- START: NEW CRUD FUNCTIONS for ClassGroup <-> Student Relationship ---
-@with_transaction
 async def add_student_to_class_group(
     class_group_id: uuid.UUID, student_id: uuid.UUID, session=None
 ) -> bool:
@@ -544,13 +788,13 @@ async def add_student_to_class_group(
     collection = _get_collection(CLASSGROUP_COLLECTION)
     if collection is None:
         return False
-    now = datetime.now(timezone.utc)
+    now = _utcnow()
     logger.info(f"Attempting to add student {student_id} to class group {class_group_id}")
     # RBAC check for add_student_to_class_group: 
     # The calling layer should ensure teacher_id from token owns the class_group_id.
     # This function currently trusts class_group_id is valid for the context.
     # If direct RBAC needed here, add teacher_id to signature and query.
-    query_filter = {"_id": class_group_id, "is_deleted": {"$ne": True}}
+    query_filter = {"_id": class_group_id, "is_deleted": False}
     update_operation = {
         "$addToSet": {"student_ids": student_id},  # Use $addToSet to avoid duplicates
         "$set": {"updated_at": now},
@@ -580,7 +824,6 @@ async def add_student_to_class_group(
         return False
 
 
-@with_transaction
 async def remove_student_from_class_group(
     class_group_id: uuid.UUID, student_id: uuid.UUID, session=None
 ) -> bool:
@@ -594,10 +837,10 @@ async def remove_student_from_class_group(
     collection = _get_collection(CLASSGROUP_COLLECTION)
     if collection is None:
         return False
-    now = datetime.now(timezone.utc)
+    now = _utcnow()
     logger.info(f"Attempting to remove student {student_id} from class group {class_group_id}")
     # RBAC check for remove_student_from_class_group: Similar to add_student_to_class_group
-    query_filter = {"_id": class_group_id, "is_deleted": {"$ne": True}}
+    query_filter = {"_id": class_group_id, "is_deleted": False}
     update_operation = {
         "$pull": {"student_ids": student_id},  # Use $pull to remove the specific student ID
         "$set": {"updated_at": now},
@@ -632,8 +875,13 @@ async def remove_student_from_class_group(
 # --- END: NEW CRUD FUNCTIONS for ClassGroup <-> Student Relationship ---
 
 # --- Student CRUD Functions (Keep existing) ---
-@with_transaction
 async def create_student(student_in: StudentCreate, teacher_id: str, session=None) -> Optional[Student]:
+    """
+    Creates a student owned by teacher_id.
+    When an external_student_id is supplied the insert is an upsert keyed on
+    (teacher_id, external_student_id) with $setOnInsert, so a duplicate is detected in
+    the same round-trip. Duplicates return None.
+    """
     collection = _get_collection(STUDENT_COLLECTION)
     if collection is None:
         logger.error(f"Failed to get collection {STUDENT_COLLECTION}")
@@ -650,7 +898,7 @@ async def create_student(student_in: StudentCreate, teacher_id: str, session=Non
     #     # Depending on the desired behavior, you might want to return None or raise
     #     return None
 
-    now = datetime.now(timezone.utc)
+    now = _utcnow()
     if collection is None:
         return None
 
@@ -667,20 +915,29 @@ async def create_student(student_in: StudentCreate, teacher_id: str, session=Non
     # Example: student_doc["teacher_id"] = teacher_id_passed_to_function
 
     logger.info(f"Attempting to insert student with internal ID: {new_student_id} for teacher: {teacher_id}") # Update log
+    ext_id = student_doc.get("external_student_id")
     try:
+        if isinstance(ext_id, str) and ext_id:
+            # The equality keys seed the inserted document, so they are left out of $setOnInsert
+            key = {"teacher_id": teacher_id, "external_student_id": ext_id}
+            on_insert = {k: v for k, v in student_doc.items() if k not in key}
+            existing_doc = await collection.find_one_and_update(
+                key, {"$setOnInsert": on_insert}, upsert=True, projection={"_id": 1},
+                return_document=ReturnDocument.BEFORE, session=session
+            )
+            if existing_doc is not None:
+                logger.warning(f"Duplicate external_student_id: '{ext_id}' on create.")
+                return None
+            # No pre-image means the upsert inserted our document
+            return _hydrate(Student, student_doc)
+
         inserted_result = await collection.insert_one(student_doc, session=session)
         if inserted_result.acknowledged:
-            created_doc = await collection.find_one({"_id": new_student_id}, session=session)
-            if created_doc:
-                mapped_data = {**created_doc}
-                if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-                return Student(**mapped_data)
-            else:
-                logger.error(f"Failed retrieve student post-insert: {new_student_id}"); return None
+            # Hydrate from the document we just wrote instead of re-reading it
+            return _hydrate(Student, student_doc)
         else:
             logger.error(f"Insert student not acknowledged: {new_student_id}"); return None
-    except DuplicateKeyError:
-        ext_id = student_doc.get('external_student_id')
+    except DuplicateKeyError: # Concurrent upserts can still race on the unique index
         logger.warning(f"Duplicate external_student_id: '{ext_id}' on create.")
         return None
     except Exception as e:
@@ -695,19 +952,59 @@ async def get_student_by_id(
     collection = _get_collection(STUDENT_COLLECTION);
     if collection is None: return None
     logger.info(f"Getting student: {student_internal_id} for teacher: {teacher_id}") # Update log
-    query = {"_id": student_internal_id, "teacher_id": teacher_id}
-    query.update(soft_delete_filter(include_deleted))
+    query = {"_id": student_internal_id, "teacher_id": teacher_id, **_SOFT_DELETE_FILTERS[bool(include_deleted)]}
     try:
         student_doc = await collection.find_one(query, session=session)
-        if student_doc:
-            mapped_data = {**student_doc}
-            if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-            return Student(**mapped_data)
+        if student_doc: return _hydrate(Student, student_doc)
         else:
             logger.warning(f"Student {student_internal_id} not found for teacher {teacher_id}."); return None # Modified log
     except Exception as e:
         logger.error(f"Error getting student: {e}", exc_info=True); return None
 
+def _student_list_cursor(
+    collection: AsyncCollection,
+    teacher_id: str,
+    external_student_id: Optional[str],
+    first_name: Optional[str],
+    last_name: Optional[str],
+    year_group: Optional[str],
+    skip: int,
+    limit: int,
+    include_deleted: bool,
+    projection: Optional[Dict[str, Any]],
+    session,
+    after_id: Optional[uuid.UUID] = None
+):
+    """Builds the filtered, paginated student cursor shared by get_all_students and iter_all_students."""
+    filter_query = soft_delete_filter(include_deleted)
+    filter_query["teacher_id"] = teacher_id # <<< ADDED: Filter by teacher_id
+    if external_student_id is not None: filter_query["external_student_id"] = external_student_id
+    # Exact, case-insensitive name match via collation equality (index point lookup) rather than an anchored $regex
+    if first_name is not None: filter_query["first_name"] = first_name
+    if last_name is not None: filter_query["last_name"] = last_name
+    if year_group is not None: filter_query["year_group"] = year_group
+    collation = NAME_COLLATION if (first_name is not None or last_name is not None) else None
+    logger.info(f"Getting all students filter={filter_query} skip={skip} limit={limit} after_id={after_id}")
+    return _paginate(
+        collection.find(
+            _keyset_filter(filter_query, after_id), projection=projection or STUDENT_LIST_PROJECTION,
+            session=session, collation=collation
+        ),
+        skip, limit, after_id
+    )
+
+def _student_from_list_doc(doc: Dict[str, Any], validate: bool) -> Optional[Student]:
+    """Maps one listed student document to a model; returns None (logged) for unusable docs."""
+    try:
+        if "_id" not in doc:
+            logger.warning(f"Student document missing '_id': {doc}")
+            return None # Skip this document if it has no _id
+        return _hydrate(Student, doc, validate)
+    except Exception as validation_err:
+        doc_id_for_log = doc.get('_id', 'UNKNOWN_ID') # Use original doc for logging ID
+        logger.error(f"Pydantic validation failed for student doc {doc_id_for_log}: {validation_err}", exc_info=True) # Add traceback for validation errors
+        return None
+
 async def get_all_students(
     teacher_id: str, # <<< ADDED: Make teacher_id mandatory
     external_student_id: Optional[str] = None,
@@ -717,54 +1014,77 @@ async def get_all_students(
     skip: int = 0,
     limit: int = 100,
     include_deleted: bool = False,
+    projection: Optional[Dict[str, Any]] = None,
+    validate: bool = True,
+    after_id: Optional[uuid.UUID] = None,
     session=None
 ) -> List[Student]:
     collection = _get_collection(STUDENT_COLLECTION); students_list: List[Student] = []
     if collection is None: return students_list
-    filter_query = soft_delete_filter(include_deleted)
-    filter_query["teacher_id"] = teacher_id # <<< ADDED: Filter by teacher_id
-    if external_student_id is not None: filter_query["external_student_id"] = external_student_id
-    if first_name is not None: filter_query["first_name"] = {"$regex": f"^{re.escape(first_name)}$", "$options": "i"}
-    if last_name is not None: filter_query["last_name"] = {"$regex": f"^{re.escape(last_name)}$", "$options": "i"}
-    if year_group is not None: filter_query["year_group"] = year_group
-    logger.info(f"Getting all students filter={filter_query} skip={skip} limit={limit}")
     try:
-        cursor = collection.find(filter_query, session=session).skip(skip).limit(limit)
-        async for doc in cursor:
-            try:
-                mapped_data = {**doc}
-                if "_id" in mapped_data:
-                    mapped_data["id"] = mapped_data.pop("_id") # Rename key
-                else:
-                    logger.warning(f"Student document missing '_id': {doc}")
-                    continue # Skip this document if it has no _id
-                student_instance = Student(**mapped_data)
-                students_list.append(student_instance)
-            except Exception as validation_err:
-                doc_id_for_log = doc.get('_id', 'UNKNOWN_ID') # Use original doc for logging ID
-                logger.error(f"Pydantic validation failed for student doc {doc_id_for_log}: {validation_err}", exc_info=True) # Add traceback for validation errors
+        cursor = _student_list_cursor(
+            collection, teacher_id, external_student_id, first_name, last_name, year_group,
+            skip, limit, include_deleted, projection, session, after_id
+        )
+        docs = await cursor.to_list(length=limit or None)
+        for doc in docs:
+            student_instance = _student_from_list_doc(doc, validate)
+            if student_instance is not None: students_list.append(student_instance)
     except Exception as e:
         logger.error(f"Error getting all students during DB query: {e}", exc_info=True)
     return students_list
 
-@with_transaction
-async def update_student(student_internal_id: uuid.UUID, teacher_id: str, student_in: StudentUpdate, session=None) -> Optional[Student]:
-    collection = _get_collection(STUDENT_COLLECTION); now = datetime.now(timezone.utc)
+async def iter_all_students(
+    teacher_id: str,
+    external_student_id: Optional[str] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    year_group: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    include_deleted: bool = False,
+    projection: Optional[Dict[str, Any]] = None,
+    validate: bool = True,
+    after_id: Optional[uuid.UUID] = None,
+    session=None
+) -> AsyncIterator[Student]:
+    """
+    Streaming counterpart of get_all_students: yields each student as its batch arrives
+    instead of materialising the whole page, for large limits or NDJSON-style responses.
+    Unlike the list readers, DB errors are logged and re-raised: a stream that has already
+    yielded cannot signal failure by returning early, so the caller must abort the response.
+    """
+    collection = _get_collection(STUDENT_COLLECTION)
+    if collection is None: raise RuntimeError("Students collection not available")
+    try:
+        cursor = _student_list_cursor(
+            collection, teacher_id, external_student_id, first_name, last_name, year_group,
+            skip, limit, include_deleted, projection, session, after_id
+        ).batch_size(_list_batch_size(limit, STREAM_BATCH_SIZE))
+        async for doc in cursor:
+            student_instance = _student_from_list_doc(doc, validate)
+            if student_instance is not None: yield student_instance
+    except Exception as e:
+        logger.error(f"Error streaming students during DB query: {e}", exc_info=True); raise
+
+# Fields a caller may change through update_student (ownership, ids, timestamps and the
+# soft-delete flag are never client-updatable)
+_STUDENT_UPDATE_FIELDS = frozenset({"first_name", "last_name", "email", "external_student_id", "descriptor", "year_group"})
+
+async def update_student(student_internal_id: uuid.UUID, teacher_id: str, student_in: StudentUpdate, validate: bool = True, session=None) -> Optional[Student]:
+    collection = _get_collection(STUDENT_COLLECTION); now = _utcnow()
     if collection is None: return None
-    update_data = student_in.model_dump(exclude_unset=True)
-    update_data.pop("_id", None); update_data.pop("id", None); update_data.pop("created_at", None); update_data.pop("is_deleted", None)
+    # Read only the explicitly-set, allowlisted fields (all scalars) instead of dumping and popping
+    update_data = {k: getattr(student_in, k) for k in student_in.model_fields_set & _STUDENT_UPDATE_FIELDS}
     if "external_student_id" in update_data and update_data["external_student_id"] == "": update_data["external_student_id"] = None
     if not update_data: 
         logger.warning(f"No update data provided for student {student_internal_id}")
         return await get_student_by_id(student_internal_id, teacher_id=teacher_id, include_deleted=False, session=session)
     update_data["updated_at"] = now; logger.info(f"Updating student {student_internal_id} for teacher {teacher_id}")
-    query_filter = {"_id": student_internal_id, "teacher_id": teacher_id, "is_deleted": {"$ne": True}}
+    query_filter = {"_id": student_internal_id, "teacher_id": teacher_id, "is_deleted": False}
     try:
         updated_doc = await collection.find_one_and_update( query_filter, {"$set": update_data}, return_document=ReturnDocument.AFTER, session=session)
-        if updated_doc:
-            mapped_data = {**updated_doc}
-            if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-            return Student(**mapped_data)
+        if updated_doc: return _hydrate(Student, updated_doc, validate)
         else:
             logger.warning(f"Student {student_internal_id} not found or already deleted for update."); return None
     except DuplicateKeyError:
@@ -774,8 +1094,9 @@ async def update_student(student_internal_id: uuid.UUID, teacher_id: str, studen
     except Exception as e:
         logger.error(f"Error during student update operation for {student_internal_id}: {e}", exc_info=True); return None
 
-@with_transaction
 async def delete_student(student_internal_id: uuid.UUID, teacher_id: str, hard_delete: bool = False, session=None) -> bool:
+    """Deletes a student owned by teacher_id. Soft deletes use SOFT_DELETE_WRITE_CONCERN (w=1, j=False):
+    lower latency, at the cost that an acknowledged flag could be lost on a primary crash and must be re-applied."""
     collection = _get_collection(STUDENT_COLLECTION)
     if collection is None: return False
     logger.info(f"{'Hard' if hard_delete else 'Soft'} deleting student {student_internal_id} for teacher {teacher_id}")
@@ -786,10 +1107,10 @@ async def delete_student(student_internal_id: uuid.UUID, teacher_id: str, hard_d
             result = await collection.delete_one(query_base, session=session)
             count = result.deleted_count
         else:
-            now = datetime.now(timezone.utc)
+            now = _utcnow()
             # For soft delete, also ensure it's not already deleted
-            soft_delete_query = {**query_base, "is_deleted": {"$ne": True}}
-            result = await collection.update_one(
+            soft_delete_query = {**query_base, "is_deleted": False}
+            result = await collection.with_options(write_concern=SOFT_DELETE_WRITE_CONCERN).update_one(
                 soft_delete_query, 
                 {"$set": {"is_deleted": True, "updated_at": now}}, session=session
             )
@@ -811,9 +1132,11 @@ async def create_document(document_in: DocumentCreate, session=None) -> Optional
     collection = _get_collection(DOCUMENT_COLLECTION)
     if collection is None: return None
     document_id = uuid.uuid4()
-    now = datetime.now(timezone.utc); doc_dict = document_in.model_dump()
-    if isinstance(doc_dict.get("status"), DocumentStatus): doc_dict["status"] = doc_dict["status"].value
-    if isinstance(doc_dict.get("file_type"), FileType): doc_dict["file_type"] = doc_dict["file_type"].value
+    now = _utcnow(); doc_dict = document_in.model_dump()
+    # Coerce enums to their stored values once (model_dump already yields values when use_enum_values is set)
+    status_val = doc_dict.get("status"); ftype_val = doc_dict.get("file_type")
+    if isinstance(status_val, DocumentStatus): doc_dict["status"] = status_val.value
+    if isinstance(ftype_val, FileType): doc_dict["file_type"] = ftype_val.value
     doc = doc_dict
     # Explicitly add teacher_id from the input model
     if hasattr(document_in, 'teacher_id') and document_in.teacher_id:
@@ -822,10 +1145,10 @@ async def create_document(document_in: DocumentCreate, session=None) -> Optional
     logger.info(f"Inserting document metadata: {doc['_id']}")
     try:
         inserted_result = await collection.insert_one(doc, session=session)
-        if inserted_result.acknowledged: created_doc = await collection.find_one({"_id": document_id}, session=session)
+        if inserted_result.acknowledged:
+            invalidate_dashboard_cache(doc.get("teacher_id"))
+            return Document(**doc) # Hydrate locally; schema handles _id alias
         else: logger.error(f"Insert document not acknowledged: {document_id}"); return None
-        if created_doc: return Document(**created_doc) # Assumes schema handles alias
-        else: logger.error(f"Failed retrieve document post-insert: {document_id}"); return None
     except Exception as e: logger.error(f"Error during document insertion: {e}", exc_info=True); return None
 
 async def get_document_by_id(
@@ -837,13 +1160,58 @@ async def get_document_by_id(
     collection = _get_collection(DOCUMENT_COLLECTION)
     if collection is None: return None
     logger.info(f"Getting document: {document_id} for teacher: {teacher_id}") # Update log
-    query = {"_id": document_id, "teacher_id": teacher_id}
-    query.update(soft_delete_filter(include_deleted))
+    query = {"_id": document_id, "teacher_id": teacher_id, **_SOFT_DELETE_FILTERS[bool(include_deleted)]}
     try: doc = await collection.find_one(query, session=session)
     except Exception as e: logger.error(f"Error getting document: {e}", exc_info=True); return None
     if doc: return Document(**doc) # Assumes schema handles alias
     else: logger.warning(f"Document {document_id} not found."); return None
 
+def _document_list_cursor(
+    collection: AsyncCollection,
+    teacher_id: str,
+    student_id: Optional[uuid.UUID],
+    assignment_id: Optional[uuid.UUID],
+    status: Optional[DocumentStatus],
+    skip: int,
+    limit: int,
+    include_deleted: bool,
+    sort_by: Optional[str],
+    sort_order: int,
+    projection: Optional[Dict[str, Any]],
+    session
+):
+    """Builds the filtered, sorted, paginated document cursor used by get_all_documents."""
+    filter_query = soft_delete_filter(include_deleted)
+    filter_query["teacher_id"] = teacher_id # <<< ADDED: Filter by teacher_id
+    if student_id: filter_query["student_id"] = student_id
+    if assignment_id: filter_query["assignment_id"] = assignment_id
+    if status: filter_query["status"] = status.value # Filter DB by enum value
+
+    logger.info(f"Getting all documents filter={filter_query} sort_by={sort_by} sort_order={sort_order} skip={skip} limit={limit}")
+
+    cursor = collection.find(filter_query, projection=projection or DOCUMENT_LIST_PROJECTION, session=session)
+
+    # --- NEW: Apply Sorting ---
+    if sort_by:
+        # Map 'id' to '_id' for sorting if necessary
+        db_sort_field = "_id" if sort_by == "id" else sort_by
+        sort_criteria = [(db_sort_field, sort_order)]
+        logger.debug("Applying sort criteria: %s", sort_criteria)
+        cursor = cursor.sort(sort_criteria)
+    # --- END NEW Sorting ---
+
+    # Apply skip/limit after sorting; batch_size(limit) makes the first reply carry the whole
+    # page, so to_list() completes in one round-trip (no getMore for pages up to 16MB)
+    return cursor.skip(skip).limit(limit).batch_size(_list_batch_size(limit))
+
+def _document_from_list_doc(doc: Dict[str, Any], validate: bool) -> Optional[Document]:
+    """Maps one listed document to a model; returns None (logged) for unusable docs."""
+    try:
+        if "_id" not in doc: logger.warning(f"Document doc missing '_id': {doc}"); return None
+        return _hydrate(Document, doc, validate)
+    except Exception as validation_err:
+        logger.error(f"Pydantic validation failed for document doc {doc.get('_id', 'UNKNOWN')}: {validation_err}"); return None
+
 async def get_all_documents(
     teacher_id: str, # <<< ADDED: Make teacher_id mandatory
     student_id: Optional[uuid.UUID] = None,
@@ -854,59 +1222,40 @@ async def get_all_documents(
     include_deleted: bool = False,
     sort_by: Optional[str] = None, # NEW: Field to sort by (e.g., "upload_timestamp")
     sort_order: int = -1,        # NEW: 1 for asc, -1 for desc (default desc)
+    projection: Optional[Dict[str, Any]] = None,
+    validate: bool = True,
     session=None
 ) -> List[Document]:
     collection = _get_collection(DOCUMENT_COLLECTION)
     documents_list: List[Document] = []
     if collection is None: return documents_list
-
-    filter_query = soft_delete_filter(include_deleted)
-    filter_query["teacher_id"] = teacher_id # <<< ADDED: Filter by teacher_id
-    if student_id: filter_query["student_id"] = student_id
-    if assignment_id: filter_query["assignment_id"] = assignment_id
-    if status: filter_query["status"] = status.value # Filter DB by enum value
-
-    logger.info(f"Getting all documents filter={filter_query} sort_by={sort_by} sort_order={sort_order} skip={skip} limit={limit}")
-
     try:
-        cursor = collection.find(filter_query, session=session)
-
-        # --- NEW: Apply Sorting ---
-        if sort_by:
-            # Map 'id' to '_id' for sorting if necessary
-            db_sort_field = "_id" if sort_by == "id" else sort_by
-            sort_criteria = [(db_sort_field, sort_order)]
-            logger.debug(f"Applying sort criteria: {sort_criteria}")
-            cursor = cursor.sort(sort_criteria)
-        # --- END NEW Sorting ---
-
-        cursor = cursor.skip(skip).limit(limit) # Apply skip/limit after sorting
-
-        async for doc in cursor:
-            try:
-                mapped_data = {**doc}
-                if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-                else: logger.warning(f"Document doc missing '_id': {doc}"); continue
-                documents_list.append(Document(**mapped_data))
-            except Exception as validation_err: logger.error(f"Pydantic validation failed for document doc {doc.get('_id', 'UNKNOWN')}: {validation_err}")
+        cursor = _document_list_cursor(
+            collection, teacher_id, student_id, assignment_id, status, skip, limit,
+            include_deleted, sort_by, sort_order, projection, session
+        )
+        docs = await cursor.to_list(length=limit or None)
+        for doc in docs:
+            document = _document_from_list_doc(doc, validate)
+            if document is not None: documents_list.append(document)
     except Exception as e: logger.error(f"Error getting all documents: {e}", exc_info=True)
     return documents_list
 
-@with_transaction
 async def update_document_status(
     document_id: uuid.UUID,
     teacher_id: str, # ADDED teacher_id for RBAC
     status: DocumentStatus,
     character_count: Optional[int] = None, # New optional parameter
     word_count: Optional[int] = None,      # New optional parameter
+    validate: bool = True,
     session=None
 ) -> Optional[Document]:
     collection = _get_collection(DOCUMENT_COLLECTION)
     if collection is None: return None
-    now = datetime.now(timezone.utc)
+    now = _utcnow(); status_val = status.value # Resolve the stored enum value once
     # <<< START EDIT: Build update_data dictionary >>>
     update_data = {
-        "status": status.value, # Store enum value
+        "status": status_val, # Store enum value
         "updated_at": now
     }
     if character_count is not None:
@@ -917,11 +1266,11 @@ async def update_document_status(
         logger.info(f"Including word_count={word_count} in update for document {document_id}")
     # <<< END EDIT >>>
 
-    logger.info(f"Updating document {document_id} for teacher {teacher_id} status to {status.value} and counts if provided.")
-    query_filter = {"_id": document_id, "teacher_id": teacher_id, "is_deleted": {"$ne": True}}
+    logger.info(f"Updating document {document_id} for teacher {teacher_id} status to {status_val} and counts if provided.")
+    query_filter = {"_id": document_id, "teacher_id": teacher_id, "is_deleted": False}
 
     # <<< START EDIT: Add logging before DB call >>>
-    logger.debug(f"Attempting find_one_and_update for doc {document_id} with $set payload: {update_data}")
+    logger.debug("Attempting find_one_and_update for doc %s with $set payload: %s", document_id, update_data)
     # <<< END EDIT >>>
 
     try:
@@ -929,105 +1278,142 @@ async def update_document_status(
         updated_doc = await collection.find_one_and_update(
             query_filter,
             {"$set": update_data}, # Use the built dictionary
+            projection=DOCUMENT_LIST_PROJECTION, # Only the fields Document declares cross the wire
             return_document=ReturnDocument.AFTER,
             session=session
         )
         # <<< END EDIT >>>
-        if updated_doc: return Document(**updated_doc) # Assumes schema handles alias
+        if updated_doc: invalidate_dashboard_cache(teacher_id); return _hydrate(Document, updated_doc, validate)
         else: logger.warning(f"Document {document_id} not found or already deleted for status/count update."); return None
     except Exception as e: logger.error(f"Error updating document status/counts for ID {document_id}: {e}", exc_info=True); return None
 
+def _document_status_set(status: DocumentStatus, character_count: Optional[int], word_count: Optional[int], now: datetime) -> Dict[str, Any]:
+    """Builds the $set payload of update_document_status_fast; the caller reads the clock."""
+    update_data: Dict[str, Any] = {"status": status.value, "updated_at": now}
+    if character_count is not None: update_data["character_count"] = character_count
+    if word_count is not None: update_data["word_count"] = word_count
+    return update_data
+
+async def update_document_status_fast(
+    document_id: uuid.UUID,
+    teacher_id: str,
+    status: DocumentStatus,
+    character_count: Optional[int] = None,
+    word_count: Optional[int] = None,
+    session=None
+) -> bool:
+    """
+    Status-only counterpart of update_document_status for intermediate pipeline stages.
+    Uses a plain update_one (no fetch of the post-image, no model hydration) and returns
+    True when a live document owned by the teacher was matched.
+    """
+    collection = _get_collection(DOCUMENT_COLLECTION)
+    if collection is None: return False
+    update_data = _document_status_set(status, character_count, word_count, _utcnow())
+    query_filter = {"_id": document_id, "teacher_id": teacher_id, "is_deleted": False}
+    logger.info(f"Updating document {document_id} for teacher {teacher_id} status to {update_data['status']} (no read-back).")
+    try:
+        result = await collection.update_one(query_filter, {"$set": update_data}, session=session)
+        if result.matched_count == 0:
+            logger.warning(f"Document {document_id} not found or already deleted for status update."); return False
+        invalidate_dashboard_cache(teacher_id)
+        return True
+    except Exception as e: logger.error(f"Error updating document status for ID {document_id}: {e}", exc_info=True); return False
+
 @with_transaction
 async def delete_document(document_id: uuid.UUID, teacher_id: str, session=None) -> bool: # ADDED teacher_id
     """
     Performs deletion of a document and its associated data (blob, result).
-    Checks ownership using teacher_id before proceeding.
-    Performs a SOFT delete on the document record itself.
+    The ownership check and the SOFT delete of the document record are done in a
+    single conditional find_one_and_update, which also returns the blob path.
+    The soft delete uses SOFT_DELETE_WRITE_CONCERN (w=1, j=False): the flag is idempotent,
+    so a write lost on a primary crash is simply re-applied by retrying the delete.
+    If the blob or result cleanup fails, the soft delete is reverted and False is returned,
+    so a retry finds the document live and attempts the cleanup again.
 
     Args:
         document_id: UUID of the document to delete.
         teacher_id: Kinde ID of the user attempting deletion (for authorization).
-        session: Optional database session for transactions (REMOVED - no longer used here).
+        session: Optional database session for transactions.
 
     Returns:
-        True if deletion (including soft delete of document) was successful, False otherwise.
+        True if the document was soft-deleted and its blob/result cleaned up, False otherwise.
     """
     collection = _get_collection(DOCUMENT_COLLECTION)
     if collection is None:
         return False
-    now = datetime.now(timezone.utc)
+    now = _utcnow()
 
-    # Fetch document first to check ownership and get blob path, even if soft-deleted
-    document = await get_document_by_id(
-        document_id=document_id,
-        teacher_id=teacher_id,
-        include_deleted=True, # Fetch even if already soft-deleted
-        session=None # REMOVED session
+    # Atomically check ownership, mark deleted and fetch the blob path (pre-update image)
+    document = await collection.with_options(write_concern=SOFT_DELETE_WRITE_CONCERN).find_one_and_update(
+        {"_id": document_id, "teacher_id": teacher_id, "is_deleted": False},
+        {"$set": {"is_deleted": True, "updated_at": now}},
+        projection={"storage_blob_path": 1},
+        return_document=ReturnDocument.BEFORE,
+        session=session
     )
-    if not document:
-        logger.warning(f"Document {document_id} not found or not owned by teacher {teacher_id} during delete attempt.")
-        return False # Not found or not authorized
-
-    # If already soft-deleted, log and return True (idempotency)
-    if document.is_deleted: # CHANGED check from deleted_at to is_deleted
-        logger.info(f"Document {document_id} is already soft-deleted (is_deleted=True). Delete operation considered successful.") # Updated log
+    if document is None:
+        # Either already soft-deleted (idempotent success) or not found / not owned.
+        # Only this miss path pays for the extra lookup.
+        existing = await collection.find_one(
+            {"_id": document_id, "teacher_id": teacher_id}, projection={"_id": 1}, session=session
+        )
+        if existing is None:
+            logger.warning(f"Document {document_id} not found or not owned by teacher {teacher_id} during delete attempt.")
+            return False # Not found or not authorized
+        logger.info(f"Document {document_id} is already soft-deleted (is_deleted=True). Delete operation considered successful.")
         return True
 
-    blob_path_to_delete = document.storage_blob_path
-    result_to_delete = await get_result_by_document_id(
-        document_id=document_id,
-        teacher_id=teacher_id, # Pass teacher_id here
-        include_deleted=True, # Also fetch associated result even if soft-deleted
-        session=None # REMOVED session
-    )
-
-    logger.info(f"Attempting delete for document {document_id} owned by {teacher_id}. Blob: {blob_path_to_delete}. Result ID: {getattr(result_to_delete, 'id', 'None')}.")
+    logger.info(f"Successfully soft-deleted document {document_id} (set is_deleted=True)")
+    blob_path_to_delete = document.get("storage_blob_path")
 
-    # --- REMOVED internal try...except block --- 
-
-    # --- Delete Blob (Propagate errors) ---
+    # --- Delete Blob and Result concurrently (independent backends: Blob Storage vs Mongo) ---
+    cleanup_labels: List[str] = []
+    cleanup_tasks = []
     if blob_path_to_delete:
-        blob_deleted = await service_delete_blob(blob_path_to_delete)
-        if not blob_deleted:
-            logger.error(f"service_delete_blob failed for {blob_path_to_delete}. This might indicate an issue but delete process continues.")
-            # Allow continuing, but log clearly
-        else:
-            logger.info(f"Successfully deleted blob {blob_path_to_delete} for document {document_id}.")
+        cleanup_labels.append(f"blob {blob_path_to_delete}")
+        cleanup_tasks.append(service_delete_blob(blob_path_to_delete))
     else:
         logger.warning(f"No storage_blob_path found for document {document_id}. Skipping blob deletion.")
+    cleanup_labels.append("result")
+    cleanup_tasks.append(_maybe_delete_result(document_id=document_id, teacher_id=teacher_id))
+
+    cleanup_results = await asyncio.gather(*cleanup_tasks, return_exceptions=True)
+    cleanup_failed = False
+    for label, outcome in zip(cleanup_labels, cleanup_results):
+        if isinstance(outcome, Exception):
+            logger.error(f"Deleting {label} for document {document_id} raised: {outcome}", exc_info=outcome)
+            cleanup_failed = True
+        elif outcome is False:
+            logger.error(f"Deleting {label} failed for document {document_id}.")
+            cleanup_failed = True
+        elif outcome:
+            logger.info(f"Successfully deleted {label} for document {document_id}.")
+
+    if cleanup_failed:
+        # Undo the soft delete so a retry does not see "already deleted" and orphan the blob/result
+        await collection.update_one(
+            {"_id": document_id, "teacher_id": teacher_id},
+            {"$set": {"is_deleted": False, "updated_at": now}},
+            session=session
+        )
+        logger.warning(f"Reverted soft delete of document {document_id} after cleanup failure; retry the delete.")
+        return False
 
-    # --- Delete Result (Propagate errors) ---
-    if result_to_delete:
-        result_deleted = await delete_result(result_id=result_to_delete.id, session=None)
-        if not result_deleted:
-            logger.error(f"delete_result failed for {result_to_delete.id}. This might indicate an issue but delete process continues.")
-            # Allow continuing, but log clearly
-        else:
-            logger.info(f"Successfully deleted result {result_to_delete.id} for document {document_id}.")
+    invalidate_dashboard_cache(teacher_id)
+    return True
 
-    # --- Soft Delete Document (Propagate errors) ---
-    result = await collection.update_one(
-        # OLD Filter: {"_id": document_id, "is_deleted": False},
-        # NEW Filter: Match if is_deleted is not True (handles False, null, missing)
-        {"_id": document_id, "teacher_id": teacher_id, "is_deleted": {"$ne": True}}, 
-        {"$set": {"is_deleted": True, "updated_at": now}},
-        session=session # Pass session to the update_one call
+async def _maybe_delete_result(document_id: uuid.UUID, teacher_id: str) -> Optional[bool]:
+    """Deletes the result for a document if one exists. Returns None when there was no result."""
+    result_to_delete = await get_result_by_document_id(
+        document_id=document_id,
+        teacher_id=teacher_id,
+        include_deleted=True, # Also fetch associated result even if soft-deleted
+        session=None
     )
-    count = result.modified_count
-
-    if count == 1:
-        logger.info(f"Successfully soft-deleted document {document_id} (set is_deleted=True)")
-        delete_success = True
-    else: # count == 0
-        logger.warning(
-            f"Document {document_id} soft-delete update modified 0 records. "
-            f"Assuming already deleted or gone (idempotent success)."
-        )
-        delete_success = True # Treat as success for idempotency
-
-    # Log final intended return value (still useful)
-    logger.critical(f"!!! FINAL INTENDED RETURN VALUE for delete_document({document_id}): {delete_success} (Type: {type(delete_success)}) ")
-    return delete_success # Let any exceptions from await calls above propagate
+    if not result_to_delete:
+        return None
+    return await delete_result(result_id=result_to_delete.id, session=None)
 
 # --- Optional: Add logging to get_result_by_document_id ---
 async def get_result_by_document_id(document_id: uuid.UUID, teacher_id: Optional[str] = None, include_deleted: bool = False, session=None) -> Optional[Result]:
@@ -1035,17 +1421,15 @@ async def get_result_by_document_id(document_id: uuid.UUID, teacher_id: Optional
     if collection is None:
         return None
     
-    query = {"document_id": document_id}
+    query = {"document_id": document_id, **_SOFT_DELETE_FILTERS[bool(include_deleted)]}
     if teacher_id:
         query["teacher_id"] = teacher_id
         logger.info(f"Getting result for document: {document_id} and teacher: {teacher_id}")
     else:
         logger.info(f"Getting result for document: {document_id}")
-        
-    query.update(soft_delete_filter(include_deleted))
     
     # Add logging to show the actual query being made
-    logger.debug(f"Executing find_one for result with query: {query}")
+    logger.debug("Executing find_one for result with query: %s", query)
 
     try:
         result_doc = await collection.find_one(query, session=session)
@@ -1055,18 +1439,9 @@ async def get_result_by_document_id(document_id: uuid.UUID, teacher_id: Optional
 
     if result_doc:
         # Add detailed logging for the fetched document before parsing
-        logger.debug(f"Raw data fetched from DB for doc {document_id}: {result_doc}")
+        logger.debug("Raw data fetched from DB for doc %s: %s", document_id, result_doc)
         try:
-            # Map Pydantic field names (like id) from DB field names (_id)
-            # This explicit mapping is safer if aliases are not universally working or understood
-            mapped_data = {**result_doc}
-            if "_id" in mapped_data:
-                mapped_data["id"] = mapped_data.pop("_id")
-            
-            # Log the data being passed to the Pydantic model
-            logger.debug(f"Data being passed to Result model for doc {document_id}: {mapped_data}")
-            
-            return Result(**mapped_data)
+            return _hydrate(Result, result_doc)
         except ValidationError as ve:
             logger.error(f"Pydantic validation error for result of document {document_id}: {ve}", exc_info=True)
             return None
@@ -1078,14 +1453,13 @@ async def get_result_by_document_id(document_id: uuid.UUID, teacher_id: Optional
         return None
 
 # --- Result Create, Update, Delete ---
-@with_transaction
 async def create_result(result_in: ResultCreate, session=None) -> Optional[Result]:
     """
     Creates a new result record in the database, typically with a PENDING status.
 
     Args:
         result_in: Pydantic model containing result data to create.
-        session: Optional Motor session for transaction management.
+        session: Optional client session for transaction management.
 
     Returns:
         The created Result object or None if creation failed.
@@ -1095,7 +1469,7 @@ async def create_result(result_in: ResultCreate, session=None) -> Optional[Resul
         logger.error("Failed to get results collection for create_result")
         return None
 
-    now = datetime.now(timezone.utc)
+    now = _utcnow()
     new_result_id = uuid.uuid4()
 
     # Prepare the document dictionary from the input model
@@ -1127,13 +1501,9 @@ async def create_result(result_in: ResultCreate, session=None) -> Optional[Resul
     try:
         inserted_result = await collection.insert_one(result_doc, session=session)
         if inserted_result.acknowledged:
-            # Fetch the newly created document to return the full Result model
-            created_doc = await collection.find_one({"_id": new_result_id}, session=session)
-            if created_doc:
-                return Result(**created_doc) # Validate and return the full model
-            else:
-                logger.error(f"Failed to retrieve result post-insert: {new_result_id}")
-                return None
+            invalidate_dashboard_cache(result_doc.get("teacher_id"))
+            # Build the Result model from the inserted document (no re-read needed)
+            return Result(**result_doc)
         else:
             logger.error(f"Insert result not acknowledged: {new_result_id}")
             return None
@@ -1141,37 +1511,39 @@ async def create_result(result_in: ResultCreate, session=None) -> Optional[Resul
         logger.error(f"Error inserting result for document {result_doc.get('document_id')}: {e}", exc_info=True)
         return None
 
-@with_transaction
+# Keys update_result never writes: identity, creation time and the linked document
+_RESULT_IMMUTABLE_FIELDS = frozenset({"_id", "id", "created_at", "document_id"})
+
 async def update_result(
     result_id: uuid.UUID,
     update_data: Dict[str, Any], # Pass update data as a dictionary
     teacher_id: Optional[str] = None, # Add optional teacher_id for authorization
+    return_document: bool = True,
+    validate: bool = True,
     session=None
-) -> Optional[Result]:
+) -> Union[Optional[Result], bool]:
     """
     Updates an existing result record by its ID.
     Optionally checks teacher_id if provided.
+    With return_document=False (status-only callers that ignore the result) the updated
+    document is not shipped back: returns True if a result matched, False otherwise.
+    update_data is not mutated.
     """
     collection = _get_collection(RESULT_COLLECTION)
-    now = datetime.now(timezone.utc)
+    now = _utcnow()
     if collection is None:
         logger.error("Result collection not found during update.")
         return None
 
-    # Ensure _id is not in update data and add updated_at timestamp
-    update_data.pop("_id", None)
-    update_data.pop("id", None)
-    update_data.pop("created_at", None) # Don't allow updating creation time
-    update_data.pop("document_id", None) # Don't allow changing the linked document
-    
-    # IMPORTANT: Do not pop teacher_id from update_data if it's part of the Result model's updatable fields
-    # If teacher_id is only for auth here, it's not part of $set.
-    # For now, let's assume teacher_id in Result model is not meant to be updated via this general function,
-    # and the teacher_id param is for query authorization.
-
-    # Convert enums to their values if necessary (e.g., ResultStatus)
-    if "status" in update_data and isinstance(update_data["status"], ResultStatus):
-        update_data["status"] = update_data["status"].value
+    # Build a fresh $set dict in one pass: drop the immutable keys (_id/id, created_at,
+    # document_id) and convert enums to their values (e.g. ResultStatus). The caller's
+    # dict is left untouched.
+    # IMPORTANT: teacher_id is not dropped here; the teacher_id param is for query authorization.
+    update_data = {
+        k: (v.value if isinstance(v, ResultStatus) else v)
+        for k, v in update_data.items()
+        if k not in _RESULT_IMMUTABLE_FIELDS
+    }
 
     if not update_data:
         logger.warning(f"No valid update data provided for result {result_id}. Fetching current.")
@@ -1182,26 +1554,39 @@ async def update_result(
     update_data["updated_at"] = now
 
     # Build the query filter
-    query_filter = {"_id": result_id, "is_deleted": {"$ne": True}}
+    query_filter = {"_id": result_id, "is_deleted": False}
     if teacher_id:
         query_filter["teacher_id"] = teacher_id
-        logger.info(f"Attempting to update result {result_id} for teacher {teacher_id} with data: {update_data}")
+        logger.info("Attempting to update result %s for teacher %s with data: %s", result_id, teacher_id, update_data)
     else:
-        logger.info(f"Attempting to update result {result_id} with data: {update_data} (no teacher_id specified for auth)")
+        logger.info("Attempting to update result %s with data: %s (no teacher_id specified for auth)", result_id, update_data)
     
     update_operation = {"$set": update_data}
-    logger.debug(f"Executing find_one_and_update for result with query: {query_filter}, operation: {update_operation}")
+    logger.debug("Executing find_one_and_update for result with query: %s, operation: %s", query_filter, update_operation)
 
     try:
+        if not return_document:
+            # Only teacher_id comes back (needed to invalidate the dashboard cache)
+            matched_doc = await collection.find_one_and_update(
+                query_filter, update_operation, projection={"teacher_id": 1}, session=session
+            )
+            if matched_doc is None:
+                logger.warning(f"Result {result_id} not found for update, or teacher_id mismatch if provided.")
+                return False
+            invalidate_dashboard_cache(matched_doc.get("teacher_id"))
+            return True
         updated_doc = await collection.find_one_and_update(
             query_filter,
             update_operation,
+            projection=RESULT_PROJECTION, # Only the fields Result declares cross the wire
             return_document=ReturnDocument.AFTER,
             session=session
         )
         if updated_doc:
-            logger.debug(f"Raw updated result doc from DB: {updated_doc}")
-            return Result(**updated_doc)
+            if logger.isEnabledFor(logging.DEBUG): # Don't format the full BSON doc unless it will be logged
+                logger.debug(f"Raw updated result doc from DB: {updated_doc}")
+            invalidate_dashboard_cache(updated_doc.get("teacher_id"))
+            return _hydrate(Result, updated_doc, validate)
         else:
             logger.warning(f"Result {result_id} not found for update, or teacher_id mismatch if provided.")
             return None
@@ -1209,6 +1594,36 @@ async def update_result(
         logger.error(f"Error updating result {result_id}: {e}", exc_info=True)
         return None
 
+def _facet_value(facet: Dict[str, Any], key: str, field: str, default: Any) -> Any:
+    """Reads field from the single row of a $facet branch (e.g. a $count/$group output); default if the branch is empty."""
+    rows = facet.get(key) or []
+    return rows[0].get(field, default) if rows else default
+
+# Request-independent parts of the get_dashboard_stats pipelines, built once at import.
+# Only the teacher $match (and the flaggedRecent date cutoff) are assembled per request.
+# Average Score. $type: number (rather than $ne: None) skips pending results whose score is None.
+# flaggedRecent is counted up to this cap; above it the stats carry flaggedRecentCapped=True
+DASHBOARD_FLAGGED_CAP = 100
+
+_DASHBOARD_AVG_SCORE_FACET: List[Dict[str, Any]] = [
+    {"$match": {"score": {"$type": "number"}}},
+    {"$group": {"_id": None, "avgScore": {"$avg": "$score"}}}
+]
+_DASHBOARD_DOCS_TAIL: List[Dict[str, Any]] = [
+    # Only status is needed downstream, so the scan can be covered by the
+    # (teacher_id, status) index without fetching the documents themselves
+    {"$project": {"_id": 0, "status": 1}},
+    {"$facet": {
+        "totalDocs": [{"$count": "count"}],
+        # Pending/Processing Documents (based on Document status)
+        "pending": [
+            {"$match": {"status": {"$in": [DocumentStatus.QUEUED.value, DocumentStatus.PROCESSING.value]}}},
+            {"$count": "count"}
+        ]
+    }}
+]
+
+@single_flight(lambda current_user_payload: current_user_payload.get("sub"))
 async def get_dashboard_stats(current_user_payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Calculate dashboard statistics for the given teacher based on Kinde payload.
@@ -1219,13 +1634,18 @@ async def get_dashboard_stats(current_user_payload: Dict[str, Any]) -> Dict[str,
         logger.warning("get_dashboard_stats called without teacher Kinde ID (sub) in payload.")
         return {'totalDocs': 0, 'avgScore': None, 'flaggedRecent': 0, 'pending': 0}
 
+    cached_stats = _dashboard_cache_get(DASHBOARD_STATS_CACHE, teacher_kinde_id)
+    if cached_stats is not None:
+        logger.debug(f"Dashboard stats cache hit for teacher {teacher_kinde_id}")
+        return cached_stats
+
     # +++ ADDED Logging +++
     logger.info(f"Calculating dashboard stats for teacher kinde_id: {teacher_kinde_id}")
     # --- END Logging ---
 
     try:
         # 1. Find the internal teacher ObjectId using the Kinde ID
-        teacher = await get_teacher_by_kinde_id(teacher_kinde_id)
+        teacher = await get_current_teacher(teacher_kinde_id)
         if not teacher:
              # +++ ADDED Logging +++
             logger.warning(f"No teacher found in DB for kinde_id: {teacher_kinde_id}")
@@ -1245,41 +1665,41 @@ async def get_dashboard_stats(current_user_payload: Dict[str, Any]) -> Dict[str,
             logger.error("Could not get documents or results collection for dashboard stats.")
             return {'totalDocs': 0, 'avgScore': None, 'flaggedRecent': 0, 'pending': 0}
 
-        # 3. Perform Aggregations (using the internal teacher_internal_id)
-        # Total Documents
-        total_docs = await docs_collection.count_documents({"teacher_id": teacher_kinde_id})
-        logger.debug(f"[Stats] Total docs query found: {total_docs}")
-
-        # Average Score (from Results where status is COMPLETED)
-        # Note: We use teacher_kinde_id here as it's on the result record directly
-        avg_score_pipeline = [
-            {"$match": {"teacher_id": teacher_kinde_id, "status": ResultStatus.COMPLETED.value, "score": {"$ne": None}}},
-            {"$group": {"_id": None, "avgScore": {"$avg": "$score"}}}
+        # 3. Perform Aggregations: one $match on teacher_id per collection, then a $facet with
+        # the per-stat sub-pipelines. Both aggregations run concurrently (two round-trips, not four).
+        # Note: We use teacher_kinde_id here as it's on the document/result records directly
+        seven_days_ago = _utcnow() - timedelta(days=7)
+        # Both result stats only look at COMPLETED results, so status is part of the shared
+        # top-level $match: one (teacher_id, status, ...) index scan feeds both branches.
+        results_pipeline = [
+            {"$match": {"teacher_id": teacher_kinde_id, "status": ResultStatus.COMPLETED.value}},
+            {"$facet": {
+                "avgScore": _DASHBOARD_AVG_SCORE_FACET,
+                # Flagged Recently (score >= 0.8 in last 7 days)
+                "flaggedRecent": [
+                    {"$match": {
+                        "score": {"$gte": 0.8},
+                        "updated_at": {"$gte": seven_days_ago}
+                    }},
+                    # The badge only shows "N+" beyond the cap, so stop counting at cap + 1
+                    {"$limit": DASHBOARD_FLAGGED_CAP + 1},
+                    {"$count": "count"}
+                ]
+            }}
         ]
-        avg_score_result = await results_collection.aggregate(avg_score_pipeline).to_list(length=1)
-        avg_score = avg_score_result[0]['avgScore'] if avg_score_result else None
-        logger.debug(f"[Stats] Avg score query result: {avg_score}")
-
-        # Flagged Recently (Documents with score >= 0.8 in last 7 days)
-        # Requires joining Documents and Results or querying Results directly
-        seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-        flagged_recent_pipeline = [
-            {"$match": {
-                "teacher_id": teacher_kinde_id,
-                "status": ResultStatus.COMPLETED.value,
-                "score": {"$gte": 0.8},
-                "updated_at": {"$gte": seven_days_ago}
-            }},
-            {"$count": "count"}
-        ]
-        flagged_recent_result = await results_collection.aggregate(flagged_recent_pipeline).to_list(length=1)
-        flagged_recent = flagged_recent_result[0]['count'] if flagged_recent_result else 0
-        logger.debug(f"[Stats] Flagged recent query result: {flagged_recent}")
+        docs_pipeline = [{"$match": {"teacher_id": teacher_kinde_id}}, *_DASHBOARD_DOCS_TAIL]
+        results_facets, docs_facets = await asyncio.gather(
+            _aggregate_list(results_collection, results_pipeline, length=1),
+            _aggregate_list(docs_collection, docs_pipeline, length=1)
+        )
+        results_facet = results_facets[0] if results_facets else {}
+        docs_facet = docs_facets[0] if docs_facets else {}
 
-        # Pending/Processing Documents (based on Document status)
-        pending_statuses = [DocumentStatus.QUEUED.value, DocumentStatus.PROCESSING.value]
-        pending = await docs_collection.count_documents({"teacher_id": teacher_kinde_id, "status": {"$in": pending_statuses}})
-        logger.debug(f"[Stats] Pending query result: {pending}")
+        total_docs = _facet_value(docs_facet, "totalDocs", "count", 0)
+        avg_score = _facet_value(results_facet, "avgScore", "avgScore", None)
+        flagged_recent = _facet_value(results_facet, "flaggedRecent", "count", 0)
+        pending = _facet_value(docs_facet, "pending", "count", 0)
+        logger.debug("[Stats] totalDocs=%s avgScore=%s flaggedRecent=%s pending=%s", total_docs, avg_score, flagged_recent, pending)
 
         # 4. Assemble Results
         stats = {
@@ -1288,9 +1708,14 @@ async def get_dashboard_stats(current_user_payload: Dict[str, Any]) -> Dict[str,
             'flaggedRecent': flagged_recent,
             'pending': pending
         }
+        if flagged_recent > DASHBOARD_FLAGGED_CAP:
+            # Exact count unknown past the cap; the frontend renders this as "100+"
+            stats['flaggedRecent'] = DASHBOARD_FLAGGED_CAP
+            stats['flaggedRecentCapped'] = True
         # +++ ADDED Logging +++
-        logger.info(f"Dashboard stats calculated for teacher {teacher_kinde_id}: {stats}")
+        logger.info("Dashboard stats calculated for teacher %s: %s", teacher_kinde_id, stats)
         # --- END Logging ---
+        _dashboard_cache_set(DASHBOARD_STATS_CACHE, teacher_kinde_id, stats)
         return stats
 
     except Exception as e:
@@ -1298,6 +1723,31 @@ async def get_dashboard_stats(current_user_payload: Dict[str, Any]) -> Dict[str,
         # Return default/empty stats on error to prevent frontend crash
         return {'totalDocs': 0, 'avgScore': None, 'flaggedRecent': 0, 'pending': 0}
 
+# (label, inclusive upper bound) for get_score_distribution, in display order
+SCORE_DISTRIBUTION_RANGES: List[Tuple[str, float]] = [
+    ("0-20", 0.2), ("21-40", 0.4), ("41-60", 0.6), ("61-80", 0.8), ("81-100", 1.0)
+]
+
+# get_score_distribution's $group stage does not depend on the request, so it is built
+# once here; only the teacher $match is prepended per request. A single $group partitions
+# the matched results in one pass (ranges are upper-inclusive).
+_SCORE_DISTRIBUTION_TAIL: List[Dict[str, Any]] = [
+    {
+        "$group": {
+            "_id": {
+                "$switch": {
+                    "branches": [
+                        {"case": {"$lte": ["$score", upper]}, "then": label}
+                        for label, upper in SCORE_DISTRIBUTION_RANGES
+                    ]
+                }
+            },
+            "count": {"$sum": 1}
+        }
+    }
+]
+
+@single_flight(lambda current_user_payload: current_user_payload.get("sub"))
 async def get_score_distribution(current_user_payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Calculate the distribution of document scores for the given teacher based on Kinde payload.
@@ -1308,6 +1758,11 @@ async def get_score_distribution(current_user_payload: Dict[str, Any]) -> Dict[s
         logger.warning("get_score_distribution called without teacher Kinde ID (sub) in payload.")
         return {"distribution": []}
 
+    cached_distribution = _dashboard_cache_get(SCORE_DISTRIBUTION_CACHE, teacher_kinde_id)
+    if cached_distribution is not None:
+        logger.debug(f"Score distribution cache hit for teacher {teacher_kinde_id}")
+        return cached_distribution
+
     # +++ ADDED Logging +++
     logger.info(f"Calculating score distribution for teacher kinde_id: {teacher_kinde_id}")
     # --- END Logging ---
@@ -1329,94 +1784,49 @@ async def get_score_distribution(current_user_payload: Dict[str, Any]) -> Dict[s
             return {"distribution": []}
 
         # 3. Define Score Ranges and Aggregation Pipeline
-        # Use teacher_kinde_id as it exists on the result document
+        # Use teacher_kinde_id as it exists on the result document. The [0, 1] range bound in
+        # $match replaces the old {"$ne": None} check; the prebuilt $group tail does the rest.
         pipeline = [
             {
                 "$match": {
                     "teacher_id": teacher_kinde_id,
                     "status": ResultStatus.COMPLETED.value,
-                    "score": {"$ne": None} # Exclude documents without a score
-                }
-            },
-            # --- START REPLACEMENT: Use $facet instead of $bucket ---
-            {
-                "$facet": {
-                    "0-20": [
-                        { "$match": { "score": { "$gte": 0, "$lte": 0.2 } } },
-                        { "$count": "count" }
-                    ],
-                    "21-40": [
-                        { "$match": { "score": { "$gt": 0.2, "$lte": 0.4 } } },
-                        { "$count": "count" }
-                    ],
-                    "41-60": [
-                        { "$match": { "score": { "$gt": 0.4, "$lte": 0.6 } } },
-                        { "$count": "count" }
-                    ],
-                    "61-80": [
-                        { "$match": { "score": { "$gt": 0.6, "$lte": 0.8 } } },
-                        { "$count": "count" }
-                    ],
-                    "81-100": [
-                        { "$match": { "score": { "$gt": 0.8, "$lte": 1.0 } } }, # Adjusted range slightly for edge cases
-                        { "$count": "count" }
-                    ]
-                }
-            },
-            # Reshape the $facet output to the desired format [{range: "...", count: ...}]
-            {
-                "$project": {
-                    "distribution": [
-                        { "range": "0-20", "count": { "$ifNull": [ { "$arrayElemAt": ["$0-20.count", 0] }, 0 ] } },
-                        { "range": "21-40", "count": { "$ifNull": [ { "$arrayElemAt": ["$21-40.count", 0] }, 0 ] } },
-                        { "range": "41-60", "count": { "$ifNull": [ { "$arrayElemAt": ["$41-60.count", 0] }, 0 ] } },
-                        { "range": "61-80", "count": { "$ifNull": [ { "$arrayElemAt": ["$61-80.count", 0] }, 0 ] } },
-                        { "range": "81-100", "count": { "$ifNull": [ { "$arrayElemAt": ["$81-100.count", 0] }, 0 ] } }
-                    ]
+                    "score": {"$gte": 0, "$lte": 1.0}
                 }
             },
-            # Extract the distribution array from the single document result
-            {
-                "$unwind": "$distribution"
-            },
-            {
-                "$replaceRoot": { "newRoot": "$distribution" }
-            }
-            # --- END REPLACEMENT ---
+            *_SCORE_DISTRIBUTION_TAIL
         ]
 
         # +++ ADDED Logging +++
-        logger.debug(f"Score distribution pipeline for {teacher_kinde_id}: {pipeline}")
+        logger.debug("Score distribution pipeline for %s: %s", teacher_kinde_id, pipeline)
         # --- END Logging ---
 
-        aggregation_result = await results_collection.aggregate(pipeline).to_list(None)
+        aggregation_result = await _aggregate_list(results_collection, pipeline, length=len(SCORE_DISTRIBUTION_RANGES))
 
         # +++ ADDED Logging +++
-        logger.debug(f"Raw aggregation result for score distribution: {aggregation_result}")
+        logger.debug("Raw aggregation result for score distribution: %s", aggregation_result)
         # --- END Logging ---
 
-        # 4. Format results, ensuring all ranges are present
-        # The new pipeline directly outputs the desired format, so mapping is simplified
-        # If the aggregation returns nothing (e.g., no results found), aggregation_result will be empty
-        final_distribution = aggregation_result if aggregation_result else [
-            {"range": "0-20", "count": 0},
-            {"range": "21-40", "count": 0},
-            {"range": "41-60", "count": 0},
-            {"range": "61-80", "count": 0},
-            {"range": "81-100", "count": 0}
+        # 4. Format results: $group only emits non-empty ranges, so fill the rest with zero
+        counts = {row["_id"]: row["count"] for row in aggregation_result}
+        final_distribution = [
+            {"range": label, "count": counts.get(label, 0)} for label, _ in SCORE_DISTRIBUTION_RANGES
         ]
 
         # +++ ADDED Logging +++
-        logger.info(f"Final score distribution for teacher {teacher_kinde_id}: {final_distribution}")
+        logger.info("Final score distribution for teacher %s: %s", teacher_kinde_id, final_distribution)
         # --- END Logging ---
 
-        return {"distribution": final_distribution}
+        distribution = {"distribution": final_distribution}
+        _dashboard_cache_set(SCORE_DISTRIBUTION_CACHE, teacher_kinde_id, distribution)
+        return distribution
 
     except Exception as e:
         logger.error(f"Error calculating score distribution for teacher {teacher_kinde_id}: {str(e)}", exc_info=True)
         return {"distribution": []} # Return empty on error
 
 
+@single_flight(lambda teacher_id, limit=4: f"{teacher_id}:{limit}" if teacher_id else None)
 async def get_recent_documents(teacher_id: str, limit: int = 4) -> List[Document]:
     """
     Get the most recent documents for a teacher using their Kinde ID.
@@ -1437,20 +1847,23 @@ async def get_recent_documents(teacher_id: str, limit: int = 4) -> List[Document
             return []
 
         # Use the teacher_id (Kinde ID string) directly for filtering
-        # Ensure the index exists in Cosmos DB: { "teacher_id": 1, "upload_timestamp": -1 }
+        # Served by document_teacher_usage_covering_index (teacher_id, upload_timestamp, ...) walked backwards (see init_db)
+        # Only the Document model's fields are fetched; batch_size(limit) returns the page in the first reply
         cursor = docs_collection.find(
             {
                 "teacher_id": teacher_id
-            }
-        ).sort([("upload_timestamp", -1)]).limit(limit)
+            },
+            projection=DOCUMENT_LIST_PROJECTION
+        ).sort([("upload_timestamp", -1)]).limit(limit).batch_size(_list_batch_size(limit))
 
         docs = await cursor.to_list(length=limit)
 
         # +++ ADDED Logging +++
-        logger.debug(f"Found {len(docs)} raw documents for teacher {teacher_id}.")
-        # Example log of one document ID if found
-        if docs:
-            logger.debug(f"First raw doc example: {docs[0]}")
+        if logger.isEnabledFor(logging.DEBUG): # Don't format raw BSON docs unless they will be logged
+            logger.debug(f"Found {len(docs)} raw documents for teacher {teacher_id}.")
+            # Example log of one document ID if found
+            if docs:
+                logger.debug(f"First raw doc example: {docs[0]}")
         # --- END Logging ---
 
         # Convert to Pydantic models
@@ -1463,7 +1876,7 @@ async def get_recent_documents(teacher_id: str, limit: int = 4) -> List[Document
             try:
                 # Map Pydantic field names (like id) from DB field names (_id)
                 doc['id'] = doc.pop('_id', None)
-                documents_list.append(Document(**doc))
+                documents_list.append(Document.model_validate(doc))
             except ValidationError as ve:
                 logger.warning(f"Validation error converting document {doc.get('id', 'N/A')} to model: {ve}")
             except Exception as model_ex:
@@ -1483,7 +1896,7 @@ async def get_recent_documents(teacher_id: str, limit: int = 4) -> List[Document
 async def bulk_create_schools(schools_in: List[SchoolCreate], session=None) -> List[School]:
     collection = _get_collection(SCHOOL_COLLECTION)
     if collection is None: return []
-    now = datetime.now(timezone.utc); school_docs = []; created_schools = []; inserted_ids = []
+    now = _utcnow(); school_docs = []
     for school_in in schools_in:
         school_id = uuid.uuid4(); school_doc = school_in.model_dump()
         school_doc["_id"] = school_id; school_doc["created_at"] = now; school_doc["updated_at"] = now; school_doc["is_deleted"] = False
@@ -1491,10 +1904,9 @@ async def bulk_create_schools(schools_in: List[SchoolCreate], session=None) -> L
     try:
         result = await collection.insert_many(school_docs, session=session)
         if result.acknowledged:
-            inserted_ids = result.inserted_ids
-            if inserted_ids:
-                cursor = collection.find({"_id": {"$in": inserted_ids}}, session=session)
-                async for doc in cursor: created_schools.append(School(**doc)) # Assumes schema handles alias
+            # Hydrate from the documents we just wrote instead of re-reading them. They were
+            # dumped from validated SchoolCreate inputs, so model_construct skips re-validation
+            created_schools = [_hydrate(School, school_doc, validate=False) for school_doc in school_docs]
             logger.info(f"Successfully created {len(created_schools)} schools"); return created_schools
         else: logger.error("Bulk school creation insert_many not acknowledged."); return []
     except Exception as e: logger.error(f"Error during bulk school creation: {e}", exc_info=True); return []
@@ -1503,25 +1915,35 @@ async def bulk_create_schools(schools_in: List[SchoolCreate], session=None) -> L
 async def bulk_update_schools(updates: List[Dict[str, Any]], session=None) -> List[School]:
     collection = _get_collection(SCHOOL_COLLECTION)
     if collection is None: return []
-    now = datetime.now(timezone.utc); updated_schools = []
+    now = _utcnow(); operations: List[UpdateOne] = []; school_ids: List[uuid.UUID] = []
+    for update_item in updates:
+        school_id = update_item.get("id"); update_model_data = update_item.get("data")
+        if not isinstance(school_id, uuid.UUID) or not isinstance(update_model_data, dict):
+            logger.warning(f"Skipping invalid item in bulk update: id={school_id}, data_type={type(update_model_data)}")
+            continue
+        try: update_model = SchoolUpdate.model_validate(update_model_data)
+        except Exception as validation_err: logger.warning(f"Skipping item due to validation error for school {school_id}: {validation_err}"); continue
+
+        # Same allow-list as update_school: only explicitly-set, updatable fields are written
+        update_doc = {k: getattr(update_model, k) for k in update_model.model_fields_set & _SCHOOL_UPDATE_FIELDS}
+        if not update_doc: continue
+        update_doc["updated_at"] = now
+        operations.append(UpdateOne({"_id": school_id, "is_deleted": False}, {"$set": update_doc})) # Query by _id
+        school_ids.append(school_id)
+    if not operations: return []
+    unique_ids = list(dict.fromkeys(school_ids))
     try:
-        for update_item in updates:
-            school_id = update_item.get("id"); update_model_data = update_item.get("data")
-            if not isinstance(school_id, uuid.UUID) or not isinstance(update_model_data, dict):
-                logger.warning(f"Skipping invalid item in bulk update: id={school_id}, data_type={type(update_model_data)}")
-                continue
-            try: update_model = SchoolUpdate.model_validate(update_model_data)
-            except Exception as validation_err: logger.warning(f"Skipping item due to validation error for school {school_id}: {validation_err}"); continue
-
-            update_doc = update_model.model_dump(exclude_unset=True)
-            update_doc.pop("_id", None); update_doc.pop("id", None); update_doc.pop("created_at", None); update_doc.pop("is_deleted", None)
-            if not update_doc: continue
-            update_doc["updated_at"] = now
-            result = await collection.find_one_and_update(
-                {"_id": school_id, "is_deleted": {"$ne": True}}, {"$set": update_doc}, # Query by _id
-                return_document=ReturnDocument.AFTER, session=session )
-            if result: updated_schools.append(School(**result)) # Assumes schema handles alias
-            else: logger.warning(f"School {school_id} not found/deleted during bulk update.")
+        # One bulk_write instead of a find_one_and_update per school. ordered=True keeps
+        # the previous last-write-wins behaviour when the same school appears twice.
+        result = await collection.bulk_write(operations, ordered=True, session=session)
+        if result.matched_count < len(operations):
+            logger.warning(f"{len(operations) - result.matched_count} schools not found/deleted during bulk update.")
+        # Single read-back of the updated schools to keep the List[School] return contract
+        docs = await collection.find(
+            {"_id": {"$in": _uuids_to_bson(unique_ids)}, "is_deleted": False}, session=session
+        ).to_list(length=len(unique_ids))
+        schools_by_id = {doc["_id"]: School(**doc) for doc in docs} # Assumes schema handles alias
+        updated_schools = [schools_by_id[school_id] for school_id in unique_ids if school_id in schools_by_id]
         logger.info(f"Successfully updated {len(updated_schools)} schools"); return updated_schools
     except Exception as e: logger.error(f"Error during bulk school update: {e}", exc_info=True); return []
 
@@ -1534,8 +1956,8 @@ async def bulk_delete_schools(school_ids: List[uuid.UUID], hard_delete: bool = F
         if hard_delete: result = await collection.delete_many( {"_id": {"$in": school_ids}}, session=session); deleted_count = result.deleted_count # Query by _id
         else:
             result = await collection.update_many(
-                {"_id": {"$in": school_ids}, "is_deleted": {"$ne": True}},
-                {"$set": {"is_deleted": True, "updated_at": datetime.now(timezone.utc)}},
+                {"_id": {"$in": school_ids}, "is_deleted": False},
+                {"$set": {"is_deleted": True, "updated_at": _utcnow()}},
                 session=session
             ); deleted_count = result.modified_count # Query by _id
         logger.info(f"Successfully {'hard' if hard_delete else 'soft'} deleted {deleted_count} schools"); return deleted_count
@@ -1553,8 +1975,8 @@ class FilterOperator:
     # Array operators
     ALL = "$all"; ELEM_MATCH = "$elemMatch"; SIZE = "$size"
 
-# Whitelist of allowed $-prefixed operators
-ALLOWED_MONGO_OPERATORS = {
+# Whitelist of allowed $-prefixed operators (frozenset: O(1) membership, immutable at runtime)
+ALLOWED_MONGO_OPERATORS = frozenset({
     FilterOperator.EQUALS, FilterOperator.NOT_EQUALS, FilterOperator.GREATER_THAN, 
     FilterOperator.LESS_THAN, FilterOperator.GREATER_THAN_EQUALS, FilterOperator.LESS_THAN_EQUALS,
     FilterOperator.IN, FilterOperator.NOT_IN, FilterOperator.EXISTS, FilterOperator.REGEX,
@@ -1563,32 +1985,42 @@ ALLOWED_MONGO_OPERATORS = {
     # Add any other specific, safe operators you intend to use.
     # Logical operators that combine expressions (their values will be recursively checked)
     "$and", "$or", "$not", "$nor"
-}
+})
+
+def _sanitized_child(value: Any, worklist: List[Tuple[Any, Any]]) -> Any:
+    """Returns the output slot for value: scalars as-is, containers as empty copies queued for filling."""
+    if isinstance(value, dict): child: Any = {}
+    elif isinstance(value, list): child = []
+    else: return value
+    worklist.append((value, child))
+    return child
 
 def _validate_and_sanitize_filter_part(filter_part: Any) -> Any:
-    """Recursively validates and sanitizes a part of the filter query."""
-    if isinstance(filter_part, dict):
-        sanitized_dict = {}
-        for key, value in filter_part.items():
-            if isinstance(key, str) and key.startswith('$'):
-                if key not in ALLOWED_MONGO_OPERATORS:
-                    logger.warning(f"Disallowed MongoDB operator '{key}' found in filter. Ignoring this part: {key}: {value}")
-                    # Option 1: Skip this invalid operator
-                    continue 
-                    # Option 2: Raise an error
-                    # raise ValueError(f"Disallowed MongoDB operator '{key}' found in filter.")
-                # If the operator is allowed, sanitize its value recursively
-                sanitized_dict[key] = _validate_and_sanitize_filter_part(value)
-            else:
-                # Regular field name, sanitize its value recursively
-                sanitized_dict[key] = _validate_and_sanitize_filter_part(value)
-        return sanitized_dict
-    elif isinstance(filter_part, list):
-        # For lists (e.g., in $and, $or, $in clauses), sanitize each item
-        return [_validate_and_sanitize_filter_part(item) for item in filter_part]
-    else:
-        # Primitive value, return as is
-        return filter_part
+    """Validates and sanitizes a filter (sub)tree.
+
+    Walks the tree with an explicit worklist rather than recursion, so deeply nested
+    $and/$or filters cost no Python frames and cannot hit the recursion limit. Always
+    returns new containers (key order preserved), so the caller's filter is never mutated.
+    """
+    worklist: List[Tuple[Any, Any]] = []
+    root = _sanitized_child(filter_part, worklist)
+    while worklist:
+        source, target = worklist.pop()
+        if isinstance(source, list):
+            # For lists (e.g., in $and, $or, $in clauses), sanitize each item
+            for item in source:
+                target.append(_sanitized_child(item, worklist))
+            continue
+        for key, value in source.items():
+            if isinstance(key, str) and key.startswith('$') and key not in ALLOWED_MONGO_OPERATORS:
+                logger.warning(f"Disallowed MongoDB operator '{key}' found in filter. Ignoring this part: {key}: {value}")
+                # Option 1: Skip this invalid operator
+                continue 
+                # Option 2: Raise an error
+                # raise ValueError(f"Disallowed MongoDB operator '{key}' found in filter.")
+            # Allowed operator or regular field name: its value is sanitized in turn
+            target[key] = _sanitized_child(value, worklist)
+    return root
 
 def build_filter_query(filters: Dict[str, Any], include_deleted: bool = False) -> Dict[str, Any]:
     """
@@ -1599,11 +2031,11 @@ def build_filter_query(filters: Dict[str, Any], include_deleted: bool = False) -
     query = {}
     if filters:
         # Validate and sanitize the user-provided filters first
-        sanitized_filters = _validate_and_sanitize_filter_part(filters.copy()) # Work on a copy
-        query.update(sanitized_filters)
+        # The sanitizer builds new containers, so the caller's dict is not copied first
+        query.update(_validate_and_sanitize_filter_part(filters))
     
     # Apply soft delete filter - this is trusted internal logic, no need to sanitize its structure here
-    # as it's constructed with known safe operators ($ne).
+    # as it's constructed by us (plain equality on is_deleted).
     soft_delete_part = soft_delete_filter(include_deleted)
     
     # Merge the sanitized filters with the soft delete part.
@@ -1621,11 +2053,11 @@ def build_filter_query(filters: Dict[str, Any], include_deleted: bool = False) -
                 f"User filter for \'is_deleted\': {query['is_deleted']} conflicts with soft delete logic. "
                 f"Prioritizing soft delete: {soft_delete_part['is_deleted']}"
             )
-        query.update(soft_delete_part) # This will enforce is_deleted: {"$ne": True}
+        query.update(soft_delete_part) # This will enforce is_deleted: False
     elif 'is_deleted' not in query and include_deleted: # if explicitly asking for all and no filter on is_deleted
         pass # No specific is_deleted filter, so all documents (deleted or not) are implicitly included by query
 
-    logger.debug(f"Constructed filter query: {query}")
+    logger.debug("Constructed filter query: %s", query)
     return query
 
 # Example Usage (for testing):
@@ -1643,16 +2075,32 @@ async def validate_school_teacher_relationship( school_id: uuid.UUID, teacher_id
     return teacher is not None and teacher.school_id == school_id # Ensure teacher is not None
 
 async def validate_class_group_relationships( class_group_id: uuid.UUID, teacher_id: uuid.UUID, school_id: uuid.UUID, session=None) -> bool:
-    class_group = await get_class_group_by_id(class_group_id, include_deleted=False, session=session)
-    if class_group is None: return False
-    # Assuming teacher_id passed is the internal UUID (_id) stored in ClassGroup
-    # If teacher_id passed is Kinde ID, fetch teacher by Kinde ID first
-    # teacher = await get_teacher_by_kinde_id(kinde_id=str(teacher_id), session=session)
-    # if teacher is None: return False
-    # if not await validate_school_teacher_relationship(school_id, teacher.id, session=session): return False # Validate using internal teacher ID
-    # For now, assume teacher_id is the internal UUID
-    if not await validate_school_teacher_relationship(school_id, teacher_id, session=session): return False
-    return (class_group.teacher_id == teacher_id and class_group.school_id == school_id)
+    """Checks that a live class group is owned by teacher_id (Kinde ID) and that the live teacher belongs to school_id.
+
+    One aggregation ($match + $lookup on teachers) replaces the previous class group, teacher
+    and school-teacher lookups. Class groups no longer carry school_id (see models/class_group.py),
+    so the school is checked through the owning teacher.
+    """
+    collection = _get_collection(CLASSGROUP_COLLECTION)
+    if collection is None: return False
+    teacher_kinde_id = str(teacher_id) # Assuming teacher_id is Kinde ID string (as stored on the class group)
+    pipeline = [
+        {"$match": {"_id": class_group_id, "teacher_id": teacher_kinde_id, "is_deleted": False}},
+        {"$lookup": {"from": TEACHER_COLLECTION, "localField": "teacher_id", "foreignField": "kinde_id", "as": "teachers"}},
+        {"$project": {"_id": 0, "ok": {"$in": [school_id, {
+            "$map": {
+                "input": {"$filter": {"input": "$teachers", "as": "t", "cond": {"$eq": ["$$t.is_deleted", False]}}},
+                "as": "t",
+                "in": "$$t.school_id"
+            }
+        }]}}}
+    ]
+    try:
+        docs = await _aggregate_list(collection, pipeline, length=1, session=session)
+    except Exception as e:
+        logger.error(f"Error validating class group {class_group_id} relationships: {e}", exc_info=True)
+        return False
+    return bool(docs) and docs[0].get("ok") is True
 
 async def validate_student_class_group_relationship( student_id: uuid.UUID, class_group_id: uuid.UUID, session=None) -> bool:
     class_group = await get_class_group_by_id(class_group_id, include_deleted=False, session=session)
@@ -1662,7 +2110,8 @@ async def validate_student_class_group_relationship( student_id: uuid.UUID, clas
 # --- Enhanced Query Functions (Keep existing) ---
 async def get_schools_with_filters(
     filters: Dict[str, Any], include_deleted: bool = False, skip: int = 0,
-    limit: int = 100, sort_by: Optional[str] = None, sort_order: int = 1, session=None
+    limit: int = 100, sort_by: Optional[str] = None, sort_order: int = 1,
+    validate: bool = True, session=None
 ) -> List[School]:
     collection = _get_collection(SCHOOL_COLLECTION)
     if collection is None: return []
@@ -1670,14 +2119,11 @@ async def get_schools_with_filters(
     sort_field = "_id" if sort_by == "id" else sort_by
     sort_criteria = [(sort_field, sort_order)] if sort_field else None; schools = []
     try:
-        cursor = collection.find(query, session=session)
+        cursor = collection.find(query, projection=SCHOOL_LIST_PROJECTION, session=session)
         if sort_criteria: cursor = cursor.sort(sort_criteria)
-        cursor = cursor.skip(skip).limit(limit)
+        cursor = cursor.skip(skip).limit(limit).batch_size(_list_batch_size(limit))
         async for doc in cursor:
-            try:
-                mapped_data = {**doc}
-                if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-                schools.append(School(**mapped_data))
+            try: schools.append(_hydrate(School, doc, validate))
             except Exception as validation_err: logger.error(f"Pydantic validation failed for school doc {doc.get('_id', 'UNKNOWN')}: {validation_err}")
         logger.info(f"Retrieved {len(schools)} schools with filters")
         return schools
@@ -1685,19 +2131,18 @@ async def get_schools_with_filters(
 
 async def get_teachers_by_school(
     school_id: uuid.UUID, include_deleted: bool = False, skip: int = 0,
-    limit: int = 100, session=None
+    limit: int = 100, validate: bool = True, session=None
 ) -> List[Teacher]:
     collection = _get_collection(TEACHER_COLLECTION)
     if collection is None: return []
-    query = {"school_id": school_id}; query.update(soft_delete_filter(include_deleted))
+    query = {"school_id": school_id, **_SOFT_DELETE_FILTERS[bool(include_deleted)]}
     teachers = []
     try:
-        cursor = collection.find(query, session=session).skip(skip).limit(limit)
+        cursor = collection.find(
+            query, projection=TEACHER_LIST_PROJECTION, session=session
+        ).skip(skip).limit(limit).batch_size(_list_batch_size(limit))
         async for doc in cursor:
-            try:
-                mapped_data = {**doc}
-                if "_id" in mapped_data: mapped_data["id"] = mapped_data.pop("_id")
-                teachers.append(Teacher(**mapped_data))
+            try: teachers.append(_hydrate(Teacher, doc, validate))
             except Exception as validation_err: logger.error(f"Pydantic validation failed for teacher doc {doc.get('_id', 'UNKNOWN')}: {validation_err}")
         logger.info(f"Retrieved {len(teachers)} teachers for school {school_id}")
         return teachers
@@ -1708,69 +2153,89 @@ async def get_teachers_by_school(
 
 # === Batch Operations ===
 
+def _db_operation(default: Any):
+    """
+    Wraps a coroutine CRUD function so any exception is logged (lazily) and turned into
+    `default` (None / [] / {}), replacing a per-function try/except + logger.error.
+    Driver/server errors (PyMongoError) are expected operational failures whose message says
+    it all, so their traceback is only captured at DEBUG; anything else is a bug and keeps it.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except PyMongoError as e:
+                logger.error("Database error in %s(%s): %r", func.__name__, kwargs or args, e,
+                             exc_info=logger.isEnabledFor(logging.DEBUG))
+                return copy.copy(default) # Callers may mutate a returned []/{}
+            except Exception as e:
+                logger.error("Error in %s(%s): %s", func.__name__, kwargs or args, e, exc_info=True)
+                return copy.copy(default)
+        return wrapper
+    return decorator
+
+@_db_operation(default=None)
 async def create_batch(*, batch_in: BatchCreate) -> Optional[Batch]:
     """Create a new batch record."""
-    collection = _get_collection("batches")
+    collection = _get_collection(BATCH_COLLECTION)
     if collection is None:
         logger.error("Failed to get batches collection")
         return None
 
-    try:
-        batch_dict = batch_in.dict()
-        batch_dict["_id"] = uuid.uuid4()  # Generate new UUID for the batch
-        batch_dict["created_at"] = datetime.now(timezone.utc)
-        batch_dict["updated_at"] = batch_dict["created_at"]
-        
-        result = await collection.insert_one(batch_dict)
-        if result.inserted_id:
-            return await get_batch_by_id(batch_id=batch_dict["_id"])
-        return None
-    except Exception as e:
-        logger.error(f"Error creating batch: {e}")
-        return None
+    batch_dict = batch_in.model_dump()
+    batch_dict["_id"] = uuid.uuid4()  # Generate new UUID for the batch
+    batch_dict["created_at"] = _utcnow()
+    batch_dict["updated_at"] = batch_dict["created_at"]
 
-async def get_batch_by_id(*, batch_id: uuid.UUID) -> Optional[Batch]:
-    """Get a batch by its ID."""
-    collection = _get_collection("batches")
+    result = await collection.insert_one(batch_dict)
+    if result.inserted_id:
+        # Build the Batch model from the inserted document (no re-read needed)
+        return Batch(**batch_dict)
+    return None
+
+@_db_operation(default=None)
+async def get_batch_by_id(*, batch_id: uuid.UUID, validate: bool = True) -> Optional[Batch]:
+    """Get a batch by its ID.
+
+    validate=False builds the model with model_construct (no field validation) for callers
+    that re-validate or re-serialize the batch themselves.
+    """
+    collection = _get_collection(BATCH_COLLECTION)
     if collection is None:
         logger.error("Failed to get batches collection")
         return None
 
-    try:
-        batch_dict = await collection.find_one({"_id": batch_id})
-        if batch_dict:
-            return Batch(**batch_dict)
-        return None
-    except Exception as e:
-        logger.error(f"Error getting batch {batch_id}: {e}")
-        return None
+    batch_dict = await collection.find_one({"_id": batch_id})
+    if batch_dict:
+        return _hydrate(Batch, batch_dict, validate)
+    return None
 
+@_db_operation(default=None)
 async def update_batch(*, batch_id: uuid.UUID, batch_in: BatchUpdate) -> Optional[Batch]:
     """Update a batch record."""
-    collection = _get_collection("batches")
+    collection = _get_collection(BATCH_COLLECTION)
     if collection is None:
         logger.error("Failed to get batches collection")
         return None
 
-    try:
-        update_data = batch_in.dict(exclude_unset=True)
-        if not update_data:
-            return await get_batch_by_id(batch_id=batch_id)
-        
-        update_data["updated_at"] = datetime.now(timezone.utc)
-        
-        result = await collection.update_one(
-            {"_id": batch_id},
-            {"$set": update_data}
-        )
-        
-        if result.modified_count:
-            return await get_batch_by_id(batch_id=batch_id)
-        return None
-    except Exception as e:
-        logger.error(f"Error updating batch {batch_id}: {e}")
-        return None
+    # Nothing set: skip the dump (and the write) entirely. Otherwise dump once with the v2
+    # API (.dict() is the deprecated v1 shim and warns on every call)
+    if not batch_in.model_fields_set:
+        return await get_batch_by_id(batch_id=batch_id)
+    update_data = batch_in.model_dump(exclude_unset=True)
+
+    update_data["updated_at"] = _utcnow()
 
+    # One round-trip: update and get the post-image back
+    updated_doc = await collection.find_one_and_update(
+        {"_id": batch_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    return Batch(**updated_doc) if updated_doc else None
+
+@_db_operation(default=[])
 async def get_documents_by_batch_id(*, batch_id: uuid.UUID) -> List[Document]:
     """Get all documents in a batch."""
     collection = _get_collection(DOCUMENT_COLLECTION)
@@ -1778,66 +2243,130 @@ async def get_documents_by_batch_id(*, batch_id: uuid.UUID) -> List[Document]:
         logger.error("Failed to get documents collection")
         return []
 
-    try:
-        cursor = collection.find({"batch_id": batch_id})
-        documents = []
-        async for doc in cursor:
-            documents.append(Document(**doc))
-        return documents
-    except Exception as e:
-        logger.error(f"Error getting documents for batch {batch_id}: {e}")
-        return []
+    # Drain the cursor with one to_list call instead of one await per document
+    docs = await collection.find({"batch_id": batch_id}).to_list(length=None)
+    return [Document(**doc) for doc in docs]
 
-async def get_batch_status_summary(*, batch_id: uuid.UUID) -> dict:
-    """Get a summary of document statuses in a batch."""
+@_db_operation(default={})
+async def get_batch_dashboard(*, batch_id: uuid.UUID) -> dict:
+    """
+    Get the per-status document counts and usage totals of a batch in one aggregation.
+
+    Returns {"status_counts": {status: count}, "document_count", "total_characters", "total_words"},
+    or {} on error.
+    """
     collection = _get_collection(DOCUMENT_COLLECTION)
     if collection is None:
         logger.error("Failed to get documents collection")
         return {}
 
-    try:
-        pipeline = [
-            {"$match": {"batch_id": batch_id}},
-            {
-                "$group": {
-                    "_id": "$status",
-                    "count": {"$sum": 1}
-                }
+    # One $match on batch_id, then a $facet so both summaries come back in a single round-trip
+    pipeline = [
+        {"$match": {"batch_id": batch_id}},
+        {
+            "$facet": {
+                "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                "totals": [{
+                    "$group": {
+                        "_id": None,
+                        "document_count": {"$sum": 1},
+                        # $sum skips null/missing counts (documents not yet extracted), so no $ifNull
+                        "total_characters": {"$sum": "$character_count"},
+                        "total_words": {"$sum": "$word_count"}
+                    }
+                }]
             }
-        ]
-        
-        cursor = collection.aggregate(pipeline)
-        status_counts = {}
-        async for result in cursor:
-            status_counts[result["_id"]] = result["count"]
-        
-        return status_counts
-    except Exception as e:
-        logger.error(f"Error getting status summary for batch {batch_id}: {e}")
-        return {}
+        }
+    ]
+
+    facets = await _aggregate_list(collection, pipeline, length=1)
+    facet = facets[0] if facets else {}
+    return {
+        "status_counts": {row["_id"]: row["count"] for row in facet.get("status") or []},
+        "document_count": _facet_value(facet, "totals", "document_count", 0),
+        "total_characters": _facet_value(facet, "totals", "total_characters", 0),
+        "total_words": _facet_value(facet, "totals", "total_words", 0)
+    }
+
+async def iter_documents_by_batch_id(*, batch_id: uuid.UUID, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[Document]:
+    """
+    Streams the documents of a batch in queue_position order (batch_queue_position_index),
+    documents without a queue_position last, ties broken by _id.
 
-async def delete_batch(*, batch_id: uuid.UUID) -> bool:
-    """Delete a batch and optionally its documents (metadata only)."""
-    batch_collection = _get_collection("batches")
+    Each page of batch_size documents is its own short find().limit() drained with to_list,
+    keyed on the last (queue_position, _id) seen, so no server cursor stays open while the
+    caller works on a page (an idle cursor would time out during slow per-document work).
+    Errors propagate to the caller; use get_documents_by_batch_id when the whole list is needed.
+    """
+    collection = _get_collection(DOCUMENT_COLLECTION)
+    if collection is None:
+        raise RuntimeError("Documents collection not available")
+
+    last_position, last_id = None, None
+    while True: # Positioned documents: keyset on (queue_position, _id)
+        query: Dict[str, Any] = {"batch_id": batch_id, "queue_position": {"$type": "number"}}
+        if last_id is not None:
+            query["$or"] = [
+                {"queue_position": {"$gt": last_position}},
+                {"queue_position": last_position, "_id": {"$gt": last_id}}
+            ]
+        docs = await collection.find(query).sort([("queue_position", 1), ("_id", 1)]).limit(batch_size).to_list(length=None)
+        for doc in docs: yield Document(**doc)
+        if len(docs) < batch_size: break
+        last_position, last_id = docs[-1]["queue_position"], docs[-1]["_id"]
+
+    last_id = None
+    while True: # Unpositioned documents (null/missing queue_position): keyset on _id
+        query = {"batch_id": batch_id, "queue_position": None}
+        if last_id is not None: query["_id"] = {"$gt": last_id}
+        docs = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(length=None)
+        for doc in docs: yield Document(**doc)
+        if len(docs) < batch_size: break
+        last_id = docs[-1]["_id"]
+
+async def get_batch_status_summary(*, batch_id: uuid.UUID) -> dict:
+    """Get a summary of document statuses in a batch (see get_batch_dashboard for the usage totals)."""
+    dashboard = await get_batch_dashboard(batch_id=batch_id)
+    return dashboard.get("status_counts", {})
+
+@with_transaction
+async def delete_batches(*, batch_ids: List[uuid.UUID], session=None) -> int:
+    """Delete several batches and unlink their documents (metadata only); returns the number of batches deleted.
+
+    Two round-trips regardless of len(batch_ids): one delete_many and one update_many, both
+    $in on the ids and run in one transaction, so a failure part-way never leaves documents
+    pointing at a deleted batch.
+    """
+    if not batch_ids: return 0
+    batch_collection = _get_collection(BATCH_COLLECTION)
     doc_collection = _get_collection(DOCUMENT_COLLECTION)
     if batch_collection is None or doc_collection is None:
         logger.error("Failed to get required collections")
-        return False
+        return 0
 
+    ids_in = {"$in": _uuids_to_bson(batch_ids)}
     try:
-        # Delete the batch record
-        result = await batch_collection.delete_one({"_id": batch_id})
+        # Delete the batch records
+        result = await batch_collection.delete_many({"_id": ids_in}, session=session)
         if result.deleted_count:
-            # Update documents to remove batch_id reference
+            # Update documents to remove batch_id reference. No count_documents probe first:
+            # an update_many that matches nothing (drained batch) is the same single indexed
+            # round-trip the probe would be, and the probe would add one when documents exist.
             await doc_collection.update_many(
-                {"batch_id": batch_id},
-                {"$unset": {"batch_id": "", "queue_position": ""}}
+                {"batch_id": ids_in},
+                {"$unset": {"batch_id": "", "queue_position": ""}},
+                session=session
             )
-            return True
-        return False
+        return result.deleted_count
     except Exception as e:
-        logger.error(f"Error deleting batch {batch_id}: {e}")
-        return False
+        logger.error(f"Error deleting batches {batch_ids}: {e}")
+        if session is not None:
+            raise # Let the transaction abort so the batch deletes are rolled back
+        return 0
+
+async def delete_batch(*, batch_id: uuid.UUID, session=None) -> bool:
+    """Delete a batch and optionally its documents (metadata only); see delete_batches."""
+    return bool(await delete_batches(batch_ids=[batch_id], session=session))
 
 async def delete_result(result_id: uuid.UUID, session=None) -> bool:
     collection = _get_collection(RESULT_COLLECTION)
@@ -1859,7 +2388,49 @@ async def delete_result(result_id: uuid.UUID, session=None) -> bool:
         logger.error(f"Error deleting result {result_id}: {e}", exc_info=True)
         return False
 
+# get_usage_stats_for_period's $group does not depend on the request, so it is built once;
+# only the $match (teacher + period bounds) is assembled per call. The driver only reads it.
+_USAGE_GROUP_STAGE: Dict[str, Any] = {
+    '$group': {
+        '_id': None, # Group all matched documents together
+        'document_count': {'$sum': 1},
+        # $sum skips null/missing counts (documents not yet extracted), so no $ifNull
+        'total_characters': {'$sum': '$character_count'},
+        'total_words': {'$sum': '$word_count'}
+    }
+}
+
+@lru_cache(maxsize=512)
+def _period_bounds(period: str, target_date: date_type) -> Tuple[datetime, datetime, date_type, date_type]:
+    """
+    Returns (start_utc, end_utc_exclusive, start_date, end_date) for a usage-stats period.
+
+    Pure function of (period, target_date), so it is memoized: dashboards asking many teachers
+    for the same period reuse the bounds. Raises ValueError for an unknown period.
+    """
+    min_time = datetime.min.time()
+
+    if period == 'daily':
+        start_date_local = target_date
+        end_date_local = target_date
+    elif period == 'weekly':
+        # Monday is 0, Sunday is 6. Calculate start of week (Monday).
+        start_date_local = target_date - timedelta(days=target_date.weekday())
+        end_date_local = start_date_local + timedelta(days=6)
+    elif period == 'monthly':
+        # Get the first and last day of the month
+        start_date_local = target_date.replace(day=1)
+        end_date_local = target_date.replace(day=calendar.monthrange(target_date.year, target_date.month)[1])
+    else:
+        raise ValueError(f"Invalid period specified: {period}")
+
+    start_datetime_utc = datetime.combine(start_date_local, min_time, tzinfo=timezone.utc)
+    # End date is the beginning of the day *after* the period ends, exclusive
+    end_datetime_utc = datetime.combine(end_date_local + timedelta(days=1), min_time, tzinfo=timezone.utc)
+    return start_datetime_utc, end_datetime_utc, start_date_local, end_date_local
+
 # <<< START EDIT: Add new analytics CRUD function >>>
+@single_flight(lambda teacher_id, period, target_date: f"{teacher_id}:{period}:{target_date}" if teacher_id else None)
 async def get_usage_stats_for_period(
     teacher_id: str,
     period: str, # 'daily', 'weekly', 'monthly'
@@ -1882,56 +2453,27 @@ async def get_usage_stats_for_period(
         logger.error(f"Failed to get document collection for usage stats (teacher: {teacher_id})")
         return None
 
+    cache_kind = f"{USAGE_STATS_CACHE}:{period}:{target_date.isoformat()}"
+    cached_stats = _dashboard_cache_get(cache_kind, teacher_id)
+    if cached_stats is not None:
+        logger.debug(f"Usage stats cache hit for teacher {teacher_id}, period={period}, target_date={target_date}")
+        return cached_stats
+
     logger.info(f"Calculating usage stats for teacher {teacher_id}, period={period}, target_date={target_date}")
 
     # --- Calculate Date Range in UTC --- START ---
-    start_datetime_utc: Optional[datetime] = None
-    end_datetime_utc: Optional[datetime] = None
-    start_date_local: Optional[date_type] = None # For response
-    end_date_local: Optional[date_type] = None   # For response
-
     try:
-        # Combine target_date with min/max time and make timezone-aware (UTC)
-        min_time = datetime.min.time()
-        max_time_plus_one = (datetime.combine(target_date, min_time) + timedelta(days=1)).time()
-
-        if period == 'daily':
-            start_date_local = target_date
-            end_date_local = target_date
-            start_datetime_utc = datetime.combine(target_date, min_time, tzinfo=timezone.utc)
-            # End date is the beginning of the *next* day, exclusive
-            end_datetime_utc = datetime.combine(target_date + timedelta(days=1), min_time, tzinfo=timezone.utc)
-
-        elif period == 'weekly':
-            # Monday is 0, Sunday is 6. Calculate start of week (Monday).
-            start_of_week = target_date - timedelta(days=target_date.weekday())
-            end_of_week = start_of_week + timedelta(days=6)
-            start_date_local = start_of_week
-            end_date_local = end_of_week
-            start_datetime_utc = datetime.combine(start_of_week, min_time, tzinfo=timezone.utc)
-            # End date is the beginning of the day *after* the week ends, exclusive
-            end_datetime_utc = datetime.combine(end_of_week + timedelta(days=1), min_time, tzinfo=timezone.utc)
-
-        elif period == 'monthly':
-            # Get the first and last day of the month
-            first_day_of_month = target_date.replace(day=1)
-            last_day_of_month = target_date.replace(day=calendar.monthrange(target_date.year, target_date.month)[1])
-            start_date_local = first_day_of_month
-            end_date_local = last_day_of_month
-            start_datetime_utc = datetime.combine(first_day_of_month, min_time, tzinfo=timezone.utc)
-            # End date is the beginning of the day *after* the month ends, exclusive
-            end_datetime_utc = datetime.combine(last_day_of_month + timedelta(days=1), min_time, tzinfo=timezone.utc)
-        else:
-            raise ValueError(f"Invalid period specified: {period}")
-
-        logger.debug(f"Calculated UTC range for {teacher_id}, {period}: {start_datetime_utc} to {end_datetime_utc}")
-
+        start_datetime_utc, end_datetime_utc, start_date_local, end_date_local = _period_bounds(period, target_date)
+        logger.debug("Calculated UTC range for %s, %s: %s to %s", teacher_id, period, start_datetime_utc, end_datetime_utc)
     except Exception as date_err:
         logger.error(f"Error calculating date range for usage stats: {date_err}", exc_info=True)
         return None # Or raise a specific error
     # --- Calculate Date Range in UTC --- END ---
 
     # --- Aggregation Pipeline --- START ---
+    # $match (teacher_id equality + upload_timestamp range) and the $group fields are all in
+    # document_teacher_usage_covering_index, so the aggregation is index-only. Keep $group
+    # directly after $match: a $project/$addFields in between can defeat the covered plan.
     pipeline = [
         {
             '$match': {
@@ -1942,51 +2484,37 @@ async def get_usage_stats_for_period(
                 }
             }
         },
-        {
-            '$group': {
-                '_id': None, # Group all matched documents together
-                'document_count': {'$sum': 1},
-                # Sum counts, treating null/missing as 0
-                'total_characters': {'$sum': {'$ifNull': ['$character_count', 0]}},
-                'total_words': {'$sum': {'$ifNull': ['$word_count', 0]}}
-            }
-        }
+        _USAGE_GROUP_STAGE
     ]
     # --- Aggregation Pipeline --- END ---
 
     try:
-        aggregation_result = await collection.aggregate(pipeline).to_list(length=1)
-        logger.debug(f"Usage stats aggregation result for {teacher_id}, {period}: {aggregation_result}")
+        aggregation_result = await _aggregate_list(collection, pipeline, length=1)
+        logger.debug("Usage stats aggregation result for %s, %s: %s", teacher_id, period, aggregation_result)
 
         # --- Process Results --- START ---
+        # An empty period needs no separate existence probe: $group over no matches returns
+        # no rows in the same round-trip, and the totals default to zero.
         if aggregation_result:
             stats = aggregation_result[0]
-            result_payload = {
-                "period": period,
-                "target_date": target_date,
-                "start_date": start_date_local,
-                "end_date": end_date_local,
-                "document_count": stats.get('document_count', 0),
-                "total_characters": stats.get('total_characters', 0),
-                "total_words": stats.get('total_words', 0),
-                "teacher_id": teacher_id
-            }
         else:
             # No documents found in the period for this teacher
             logger.info(f"No documents found for usage stats (teacher: {teacher_id}, period: {period}, target: {target_date})")
-            result_payload = {
-                "period": period,
-                "target_date": target_date,
-                "start_date": start_date_local,
-                "end_date": end_date_local,
-                "document_count": 0,
-                "total_characters": 0,
-                "total_words": 0,
-                "teacher_id": teacher_id
-            }
+            stats = {}
+        result_payload = {
+            "period": period,
+            "target_date": target_date,
+            "start_date": start_date_local,
+            "end_date": end_date_local,
+            "document_count": stats.get('document_count', 0),
+            "total_characters": stats.get('total_characters', 0),
+            "total_words": stats.get('total_words', 0),
+            "teacher_id": teacher_id
+        }
         # --- Process Results --- END ---
 
-        logger.info(f"Successfully retrieved usage stats for {teacher_id}, period={period}: {result_payload}")
+        logger.info("Successfully retrieved usage stats for %s, period=%s: %s", teacher_id, period, result_payload)
+        _dashboard_cache_set(cache_kind, teacher_id, result_payload, ttl=USAGE_STATS_CACHE_TTL_SECONDS)
         return result_payload
 
     except Exception as e:
@@ -1999,19 +2527,17 @@ async def get_result_by_id(result_id: uuid.UUID, teacher_id: Optional[str] = Non
     collection = _get_collection(RESULT_COLLECTION)
     if collection is None: return None
 
-    query = {"_id": result_id}
+    query = {"_id": result_id, **_SOFT_DELETE_FILTERS[bool(include_deleted)]}
     if teacher_id:
         query["teacher_id"] = teacher_id
         logger.info(f"Getting result by ID: {result_id} for teacher: {teacher_id}")
     else:
         logger.info(f"Getting result by ID: {result_id}")
-    
-    query.update(soft_delete_filter(include_deleted))
-    logger.debug(f"Executing find_one for result by ID with query: {query}")
+    logger.debug("Executing find_one for result by ID with query: %s", query)
     try:
         result_doc = await collection.find_one(query, session=session)
         if result_doc:
-            logger.debug(f"Raw result doc from DB by ID: {result_doc}")
+            logger.debug("Raw result doc from DB by ID: %s", result_doc)
             return Result(**result_doc)
         else:
             logger.warning(f"Result {result_id} not found.")
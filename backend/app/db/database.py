@@ -1,12 +1,18 @@
 # app/db/database.py
-import motor.motor_asyncio
+import bson
+import pymongo
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone # Added timezone import
 
 # Import configuration from your core config module
 # Adjust path if needed
-from app.core.config import MONGODB_URL, DB_NAME, PROJECT_NAME
+from app.core.config import (
+    MONGODB_URL, DB_NAME, PROJECT_NAME,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_MAX_IDLE_TIME_MS
+)
 
 # Setup logging using your project name
 # Ensure logging is configured elsewhere (e.g., main.py)
@@ -15,8 +21,8 @@ logger = logging.getLogger(f"{PROJECT_NAME}.db") # Using f-string for logger nam
 
 # Global variables to hold the client and database instances with type hints
 # Using underscore prefix convention for module-level globals
-_client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
-_db: Optional[motor.motor_asyncio.AsyncIOMotorDatabase] = None
+_client: Optional[AsyncMongoClient] = None
+_db: Optional[AsyncDatabase] = None
 
 async def connect_to_mongo() -> bool:
     """
@@ -37,15 +43,28 @@ async def connect_to_mongo() -> bool:
         return False
 
     logger.info(f"Attempting to connect to MongoDB database: '{DB_NAME}'...")
+    if not (bson.has_c() and pymongo.has_c()):
+        # Pure-Python BSON encode/decode is several times slower for every query
+        logger.warning("PyMongo/BSON C extensions are not available; BSON encoding/decoding will be slow. Reinstall pymongo from a wheel.")
     try:
-        _client = motor.motor_asyncio.AsyncIOMotorClient(
+        # PyMongo's native asyncio client (Motor is deprecated): operations run on the event
+        # loop directly instead of being handed to a thread pool running the sync driver
+        _client = AsyncMongoClient(
             MONGODB_URL,
             tls=True,           # Often required for Cosmos DB
             retryWrites=False,    # Required for Cosmos DB
             serverSelectionTimeoutMS=10000,
-            maxPoolSize=10,
-            uuidRepresentation='standard' # <-- ADDED THIS LINE
-            # appname=PROJECT_NAME # Optional: helps identify app in logs/metrics
+            # Pool sizing is env-tunable (see Settings.MONGO_*). Keeping warm connections avoids
+            # TLS handshakes on bursts; the wait-queue timeout surfaces saturation quickly.
+            # Size it for concurrent requests, not for bulk volume: crud's bulk helpers
+            # (bulk_create_schools, bulk_update_schools, ...) send one command per
+            # chunk, sequentially, so each holds a single connection however many rows it writes.
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            uuidRepresentation='standard', # <-- ADDED THIS LINE
+            appname=PROJECT_NAME # Helps identify app in logs/metrics
         )
         # Ping the server to verify connection before proceeding
         await _client.admin.command('ping')
@@ -66,14 +85,14 @@ async def close_mongo_connection():
     global _client, _db
     if _client:
         logger.info("Closing MongoDB connection...")
-        _client.close()
+        await _client.close()
         logger.info("MongoDB connection closed.")
         _client = None
         _db = None
     else:
         logger.info("No active MongoDB connection to close.")
 
-def get_database() -> Optional[motor.motor_asyncio.AsyncIOMotorDatabase]:
+def get_database() -> Optional[AsyncDatabase]:
     """
     Returns the database instance.
     Relies on connect_to_mongo() being called successfully at app startup.
@@ -82,7 +101,7 @@ def get_database() -> Optional[motor.motor_asyncio.AsyncIOMotorDatabase]:
         logger.warning("Warning: Database instance is not initialized! Check connection.")
     return _db
 
-def get_mongo_client() -> Optional[motor.motor_asyncio.AsyncIOMotorClient]:
+def get_mongo_client() -> Optional[AsyncMongoClient]:
     """
     Returns the MongoDB client instance.
     Relies on connect_to_mongo() being called successfully at app startup.
@@ -170,5 +189,5 @@ async def check_database_health() -> Dict[str, Any]:
         return health_info
 
 # Helper function (kept for reference, but crud.py has its own _get_collection)
-# def _get_collection(collection_name: str) -> Optional[AsyncIOMotorCollection]: ...
+# def _get_collection(collection_name: str) -> Optional[AsyncCollection]: ...
 
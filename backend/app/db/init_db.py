@@ -1,95 +1,254 @@
-from motor.motor_asyncio import AsyncIOMotorDatabase
+import logging
+from typing import Dict, List
+
+from pymongo.asynchronous.database import AsyncDatabase
 from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.collation import Collation, CollationStrength
+from pymongo.errors import OperationFailure
 from .database import get_database
 
-async def init_db_indexes():
+logger = logging.getLogger(__name__)
+
+# NOTE: MongoDB always maintains the implicit unique index on _id, so it is not
+# declared here (re-declaring it under a different name fails the whole batch).
+
+# Partial filter for indexes that only serve live-row reads. Queries built with
+# crud.soft_delete_filter() ({"is_deleted": False}) imply this filter, so the planner can
+# use the smaller index; include_deleted=True reads fall back to the full indexes.
+LIVE_ROWS_ONLY = {"is_deleted": False}
+
+# School Collection Indexes
+SCHOOL_INDEXES: List[IndexModel] = [
+    # get_all_schools pages through live schools only; the partial index holds just those rows
+    IndexModel([("is_deleted", ASCENDING)], name="school_live_index", partialFilterExpression=LIVE_ROWS_ONLY)
+]
+
+# Teacher Collection Indexes (the unique kinde_id index is ensured in main.startup_event)
+TEACHER_INDEXES: List[IndexModel] = [
+    # get_teachers_by_school: school_id equality over live teachers
+    IndexModel([("school_id", ASCENDING)], name="teacher_school_live_index", partialFilterExpression=LIVE_ROWS_ONLY)
+]
+
+# Class Group Collection Indexes
+CLASSGROUP_INDEXES: List[IndexModel] = [
+    # get_all_class_groups: teacher_id equality over live class groups
+    IndexModel([("teacher_id", ASCENDING)], name="classgroup_teacher_live_index", partialFilterExpression=LIVE_ROWS_ONLY)
+]
+
+# Student Collection Indexes
+STUDENT_INDEXES: List[IndexModel] = [
+    # Serves get_all_students / get_student_by_id: equality on teacher_id and is_deleted
+    IndexModel(
+        [("teacher_id", ASCENDING), ("is_deleted", ASCENDING)],
+        name="student_teacher_deleted_index"
+    ),
+
+    # external_student_id is unique per teacher, but only when it is actually set
+    IndexModel(
+        [("teacher_id", ASCENDING), ("external_student_id", ASCENDING)],
+        name="student_teacher_external_id_unique",
+        unique=True,
+        partialFilterExpression={"external_student_id": {"$type": "string"}}
+    ),
+
+    # Case-insensitive name lookup scoped to the owning teacher. The collation must
+    # match crud.NAME_COLLATION for get_all_students name filters to use this index.
+    IndexModel(
+        [
+            ("teacher_id", ASCENDING),
+            ("last_name", ASCENDING),
+            ("first_name", ASCENDING)
+        ],
+        name="student_teacher_name_ci_index",
+        collation=Collation(locale="en", strength=CollationStrength.SECONDARY),
+        partialFilterExpression=LIVE_ROWS_ONLY
+    ),
+
+    # first_name-only filters cannot seek past last_name in the index above; same collation
+    IndexModel(
+        [("teacher_id", ASCENDING), ("first_name", ASCENDING)],
+        name="student_teacher_first_name_ci_index",
+        collation=Collation(locale="en", strength=CollationStrength.SECONDARY),
+        partialFilterExpression=LIVE_ROWS_ONLY
+    )
+]
+
+# Batch Collection Indexes
+BATCH_INDEXES: List[IndexModel] = [
+    # Index for user_id for quick lookup of user's batches
+    IndexModel([("user_id", ASCENDING)], name="batch_user_index"),
+
+    # Compound index for status and creation time
+    IndexModel(
+        [
+            ("status", ASCENDING),
+            ("created_at", DESCENDING)
+        ],
+        name="batch_status_time_index"
+    ),
+
+    # Index for batch priority
+    IndexModel([("priority", ASCENDING)], name="batch_priority_index")
+]
+
+# Document Collection Indexes
+DOCUMENT_INDEXES: List[IndexModel] = [
+    # Compound index for queue position within a batch; its batch_id prefix also serves
+    # plain batch lookups (get_documents_by_batch_id, delete_batches)
+    IndexModel(
+        [
+            ("batch_id", ASCENDING),
+            ("queue_position", ASCENDING)
+        ],
+        name="batch_queue_position_index"
+    ),
+
+    # Compound index for processing priority and status
+    IndexModel(
+        [
+            ("processing_priority", DESCENDING),
+            ("status", ASCENDING)
+        ],
+        name="document_processing_index"
+    ),
+
+    # Owner-scoped reads (get_document_by_id, dashboard counts)
+    IndexModel(
+        [("teacher_id", ASCENDING), ("is_deleted", ASCENDING)],
+        name="document_teacher_deleted_index"
+    ),
+
+    # get_all_documents: equality keys first, then the upload_timestamp sort, so
+    # paginated find().sort().skip().limit() is a bounded IXSCAN with no in-memory SORT
+    IndexModel(
+        [
+            ("teacher_id", ASCENDING),
+            ("student_id", ASCENDING),
+            ("assignment_id", ASCENDING),
+            ("upload_timestamp", DESCENDING)
+        ],
+        name="document_teacher_student_assignment_time_index",
+        partialFilterExpression=LIVE_ROWS_ONLY
+    ),
+
+    # get_all_documents filtered by status (no student/assignment): equality keys, then the
+    # upload_timestamp sort; partial on live rows like the soft-delete filter the query carries
+    IndexModel(
+        [("teacher_id", ASCENDING), ("status", ASCENDING), ("upload_timestamp", DESCENDING)],
+        name="document_teacher_status_time_live_index",
+        partialFilterExpression=LIVE_ROWS_ONLY
+    ),
+
+    # Dashboard: totalDocs / pending counts (teacher_id, optionally status $in)
+    IndexModel(
+        [("teacher_id", ASCENDING), ("status", ASCENDING)],
+        name="document_teacher_status_index"
+    ),
+
+    # Covers get_usage_stats_for_period: $match on teacher_id + upload_timestamp range and
+    # $group over character_count / word_count are answered from the index, no document fetch.
+    # Also serves get_recent_documents: its upload_timestamp sort (either direction) after the
+    # teacher_id equality walks this prefix, so find().sort().limit() reads `limit` index keys
+    IndexModel(
+        [
+            ("teacher_id", ASCENDING),
+            ("upload_timestamp", ASCENDING),
+            ("character_count", ASCENDING),
+            ("word_count", ASCENDING)
+        ],
+        name="document_teacher_usage_covering_index"
+    ),
+
+    # get_batch_dashboard / get_batch_status_summary: batch_id equality, grouped by status
+    IndexModel(
+        [("batch_id", ASCENDING), ("status", ASCENDING)],
+        name="document_batch_status_index"
+    )
+]
+
+# Result Collection Indexes
+RESULT_INDEXES: List[IndexModel] = [
+    # get_result_by_document_id (live rows): a single index-key lookup, and enforces the
+    # domain invariant of at most one live result per document
+    IndexModel(
+        [("document_id", ASCENDING), ("teacher_id", ASCENDING), ("is_deleted", ASCENDING)],
+        name="result_document_teacher_live_unique",
+        unique=True,
+        partialFilterExpression=LIVE_ROWS_ONLY
+    ),
+
+    # Non-unique secondary for include_deleted=True lookups (e.g. the document delete path)
+    IndexModel(
+        [("document_id", ASCENDING), ("teacher_id", ASCENDING)],
+        name="result_document_teacher_index"
+    ),
+
+    # Owner-scoped reads (dashboard/analytics aggregations)
+    IndexModel(
+        [("teacher_id", ASCENDING), ("is_deleted", ASCENDING)],
+        name="result_teacher_deleted_index"
+    ),
+
+    # Dashboard: avgScore / flaggedRecent / score distribution all match teacher_id + status
+    # and then filter or group on score
+    IndexModel(
+        [("teacher_id", ASCENDING), ("status", ASCENDING), ("score", ASCENDING)],
+        name="result_teacher_status_score_index"
+    )
+]
+
+COLLECTION_INDEXES: Dict[str, List[IndexModel]] = {
+    "schools": SCHOOL_INDEXES,
+    "teachers": TEACHER_INDEXES,
+    "classgroups": CLASSGROUP_INDEXES,
+    "students": STUDENT_INDEXES,
+    "batches": BATCH_INDEXES,
+    "documents": DOCUMENT_INDEXES,
+    "results": RESULT_INDEXES,
+}
+
+
+async def _create_collection_indexes(db: AsyncDatabase, collection_name: str, indexes: List[IndexModel]) -> bool:
+    """Create the indexes for one collection, tolerating Cosmos DB index restrictions.
+
+    Indexes are created one at a time so a restricted (e.g. unique on a non-empty
+    collection) index does not prevent the remaining ones from being built.
+    """
+    collection = db[collection_name]
+    all_created = True
+    for index in indexes:
+        index_name = index.document["name"]
+        try:
+            await collection.create_indexes([index])
+            logger.info(f"Index '{index_name}' on '{collection_name}' ensured.")
+        except OperationFailure as e:
+            all_created = False
+            if e.code in (67, 13): # CannotCreateIndex / Unauthorized - Cosmos DB unique-index restrictions
+                logger.warning(
+                    f"Could not create index '{index_name}' on '{collection_name}' programmatically (Cosmos DB restriction, code {e.code}). "
+                    f"Please ensure this index exists in Azure Portal. Error: {e.details}"
+                )
+            else:
+                logger.error(f"Database OperationFailure while creating index '{index_name}' on '{collection_name}': {e}", exc_info=True)
+        except Exception as e:
+            all_created = False
+            logger.error(f"Unexpected error creating index '{index_name}' on '{collection_name}': {e}", exc_info=True)
+    return all_created
+
+
+async def init_db_indexes() -> bool:
     """
     Initialize MongoDB indexes for collections.
     This should be called during application startup.
     """
     db = get_database()
-    if not db:
+    if db is None:
         return False
 
-    try:
-        # Student Collection Indexes
-        student_indexes = [
-            # Index for internal ID (should be created automatically by MongoDB)
-            IndexModel([("_id", ASCENDING)], name="internal_id_index"),
-            
-            # Sparse unique index for external_student_id
-            # Only indexes documents where external_student_id exists
-            IndexModel(
-                [("external_student_id", ASCENDING)],
-                name="external_student_id_unique",
-                unique=True,
-                sparse=True
-            ),
-            
-            # Compound index for efficient filtering and sorting
-            IndexModel(
-                [
-                    ("last_name", ASCENDING),
-                    ("first_name", ASCENDING)
-                ],
-                name="name_lookup"
-            )
-        ]
-        
-        # Batch Collection Indexes
-        batch_indexes = [
-            # Index for internal ID
-            IndexModel([("_id", ASCENDING)], name="batch_id_index"),
-            
-            # Index for user_id for quick lookup of user's batches
-            IndexModel([("user_id", ASCENDING)], name="batch_user_index"),
-            
-            # Compound index for status and creation time
-            IndexModel(
-                [
-                    ("status", ASCENDING),
-                    ("created_at", DESCENDING)
-                ],
-                name="batch_status_time_index"
-            ),
-            
-            # Index for batch priority
-            IndexModel([("priority", ASCENDING)], name="batch_priority_index")
-        ]
-
-        # Document Collection Indexes
-        document_indexes = [
-            # Index for internal ID
-            IndexModel([("_id", ASCENDING)], name="document_id_index"),
-            
-            # Index for batch_id for quick lookup of documents in a batch
-            IndexModel([("batch_id", ASCENDING)], name="document_batch_index"),
-            
-            # Compound index for queue position within a batch
-            IndexModel(
-                [
-                    ("batch_id", ASCENDING),
-                    ("queue_position", ASCENDING)
-                ],
-                name="batch_queue_position_index"
-            ),
-            
-            # Compound index for processing priority and status
-            IndexModel(
-                [
-                    ("processing_priority", DESCENDING),
-                    ("status", ASCENDING)
-                ],
-                name="document_processing_index"
-            )
-        ]
-        
-        # Create indexes
-        await db["students"].create_indexes(student_indexes)
-        await db["batches"].create_indexes(batch_indexes)
-        await db["documents"].create_indexes(document_indexes)
-        
-        return True
-    except Exception as e:
-        print(f"Error creating indexes: {e}")
-        return False 
\ No newline at end of file
+    # Each collection (and index) is handled independently so one restricted index
+    # does not prevent the others from being created.
+    results = [
+        await _create_collection_indexes(db, collection_name, indexes)
+        for collection_name, indexes in COLLECTION_INDEXES.items()
+    ]
+    return all(results)
@@ -14,6 +14,8 @@ from pymongo.errors import OperationFailure
 # Adjust path '.' based on where main.py is relative to 'core' and 'db'
 from app.core.config import PROJECT_NAME, API_V1_PREFIX, VERSION
 from app.db.database import connect_to_mongo, close_mongo_connection, check_database_health, get_database
+from app.db.init_db import init_db_indexes
+from app.db.crud import init_collections, reset_collection_cache
 
 # Import all endpoint routers
 # Adjust path '.' based on where main.py is relative to 'api'
@@ -82,6 +84,8 @@ async def startup_event():
         try:
             db_instance = get_database()
             if db_instance is not None:
+                # Resolve the collection handles once instead of on the first request for each
+                init_collections(db_instance)
                 logger.info("Ensuring database indexes...")
                 # Index for teachers.kinde_id
                 # Use the collection name string directly as defined in crud.py or your DB
@@ -112,12 +116,9 @@ async def startup_event():
                 except Exception as e_general: # Catch other general errors during index creation
                     logger.error(f"Unexpected error creating index 'idx_teacher_kinde_id': {e_general}", exc_info=True)
                 
-                # Example for other potential indexes (uncomment and adapt as needed):
-                # documents_collection_name = "documents"
-                # documents_collection = db_instance.get_collection(documents_collection_name)
-                # await documents_collection.create_index([("teacher_id", 1), ("student_id", 1)], name="idx_doc_teacher_student")
-                # logger.info(f"Compound index 'idx_doc_teacher_student' on {documents_collection_name} ensured.")
-                
+                # Compound indexes for the student/document/result/batch read paths (see app/db/init_db.py)
+                await init_db_indexes()
+
                 logger.info("Database indexes ensured.")
             else:
                 logger.error("Could not get database instance to ensure indexes.")
@@ -140,6 +141,7 @@ async def shutdown_event():
     # Disconnect from database
     logger.info("Disconnecting from database...")
     await close_mongo_connection()
+    reset_collection_cache()
 
 # --- API Endpoints ---
 @app.get("/", tags=["Root"], include_in_schema=False) # Hide from API docs if desired
@@ -2,7 +2,7 @@
 
 import asyncio
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 from app.core.config import settings
 
 # Setup logging
@@ -11,9 +11,8 @@ logger = logging.getLogger(__name__)
 
 async def create_unique_email_index():
     """Create a unique index on the email field in the teachers collection."""
+    client = AsyncMongoClient(settings.MONGODB_URL)
     try:
-        # Connect to MongoDB
-        client = AsyncIOMotorClient(settings.MONGODB_URL)
         db = client[settings.MONGODB_DB]
         collection = db[settings.TEACHERS_COLLECTION]
 
@@ -29,7 +28,7 @@ async def create_unique_email_index():
         logger.error(f"Error creating unique index: {e}", exc_info=True)
         raise
     finally:
-        client.close()
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(create_unique_email_index()) 
\ No newline at end of file
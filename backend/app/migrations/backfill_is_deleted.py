@@ -0,0 +1,55 @@
+# backend/app/migrations/backfill_is_deleted.py
+"""
+One-off backfill for the soft-delete flag.
+
+crud.soft_delete_filter now matches live records with {"is_deleted": False}
+(sargable equality) instead of {"is_deleted": {"$ne": True}}. Records written
+before every insert path set the flag would no longer match, so this sets
+is_deleted=False wherever the field is not a boolean: missing, null, or any other
+value the old $ne: True reads treated as live. Safe to re-run.
+
+Usage (from backend/):  python -m app.migrations.backfill_is_deleted
+"""
+import logging
+from pymongo import MongoClient
+from app.core.config import settings
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Collections read through soft_delete_filter / is_deleted equality in crud.py
+SOFT_DELETE_COLLECTIONS = ["schools", "teachers", "classgroups", "students", "documents", "results"]
+
+def get_mongo_client() -> MongoClient:
+    """Create a MongoDB client with proper UUID handling."""
+    return MongoClient(
+        settings.MONGODB_URL,
+        retryWrites=False,  # Required for Cosmos DB
+        uuidRepresentation='standard'  # This enables proper UUID handling
+    )
+
+def backfill_is_deleted():
+    """Set is_deleted=False on every document whose is_deleted is not True/False."""
+    logger.info("Starting is_deleted backfill")
+    client = get_mongo_client()
+    db = client[settings.DB_NAME]
+
+    try:
+        for collection_name in SOFT_DELETE_COLLECTIONS:
+            result = db[collection_name].update_many(
+                {"is_deleted": {"$nin": [True, False]}}, # Missing, null or non-boolean
+                {"$set": {"is_deleted": False}}
+            )
+            logger.info(f"{collection_name}: set is_deleted=False on {result.modified_count} documents")
+
+        logger.info("is_deleted backfill completed successfully")
+
+    except Exception as e:
+        logger.error(f"Error during is_deleted backfill: {str(e)}")
+        raise
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    backfill_is_deleted()
@@ -0,0 +1,148 @@
+# backend/app/migrations/convert_string_uuids.py
+"""
+One-off conversion of string-form UUIDs to BSON Binary subtype 4.
+
+The app client uses uuidRepresentation='standard', so every UUID written through
+crud.py is stored as a 16-byte Binary subtype 4. Records written by older scripts
+may carry the 36-character string form instead: such _ids bloat the _id index
+(~2.25x per key) and never match the UUID-typed queries crud.py issues.
+
+By default this only reports, per collection, how many _ids / reference fields are
+strings plus the collection's index sizes. With --apply it rewrites them: a document
+whose _id is a UUID string is re-inserted under the Binary _id (its listed reference
+fields converted too) and the old one deleted; UUID-string reference fields are
+converted in place. Only _id and the fields in UUID_REFERENCE_FIELDS are touched.
+
+While both copies exist, fields under a unique index (UNIQUE_INDEXED_FIELDS) would
+collide, so the new copy is inserted with them parked under STASH_FIELD and restored
+once the old copy is gone. Every step is re-runnable, so a crash at any point is
+finished by the next run (no transaction needed, standalone servers included).
+
+Usage (from backend/):  python -m app.migrations.convert_string_uuids [--apply]
+"""
+import argparse
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Collections whose _id is a UUID (teachers are keyed by the Kinde ID string on purpose),
+# and the UUID reference fields each collection carries
+UUID_ID_COLLECTIONS = ["schools", "classgroups", "students", "batches", "documents", "results"]
+UUID_REFERENCE_FIELDS: Dict[str, List[str]] = {
+    "teachers": ["school_id"],
+    "classgroups": ["student_ids"],
+    "documents": ["student_id", "assignment_id", "batch_id"],
+    "results": ["document_id"],
+}
+
+# Fields covered by a unique index (see init_db) that the old and new copy of a document
+# would share: external_student_id (student_teacher_external_id_unique, per teacher) and
+# is_deleted (result_document_teacher_live_unique is partial on is_deleted=False)
+UNIQUE_INDEXED_FIELDS: Dict[str, List[str]] = {
+    "students": ["external_student_id"],
+    "results": ["is_deleted"],
+}
+STASH_FIELD = "_uuid_migration_stash"
+
+def get_mongo_client() -> MongoClient:
+    """Create a MongoDB client with proper UUID handling."""
+    return MongoClient(
+        settings.MONGODB_URL,
+        retryWrites=False,  # Required for Cosmos DB
+        uuidRepresentation='standard'  # This enables proper UUID handling
+    )
+
+def _as_uuid(value: Any) -> Optional[uuid.UUID]:
+    """Parses a UUID string; None for anything else (already-binary values, Kinde IDs, ...)."""
+    if not isinstance(value, str): return None
+    try: return uuid.UUID(value)
+    except ValueError: return None
+
+def _converted(value: Any) -> Any:
+    """value with UUID strings (also inside lists) replaced by uuid.UUID."""
+    if isinstance(value, list): return [_converted(item) for item in value]
+    parsed = _as_uuid(value)
+    return parsed if parsed is not None else value
+
+def _restore_stash(collection, doc_id: Any, stash: Dict[str, Any]):
+    """Moves the parked unique-indexed fields back onto the new copy."""
+    update: Dict[str, Any] = {"$unset": {STASH_FIELD: ""}}
+    if stash: update["$set"] = stash
+    collection.update_one({"_id": doc_id}, update)
+
+def _rewrite_string_id(collection, collection_name: str, doc: Dict[str, Any], new_id: uuid.UUID):
+    """Re-keys one document from its string _id to new_id; see the module docstring for the steps."""
+    old_id = doc["_id"]
+    new_doc = dict(doc)
+    for field in UUID_REFERENCE_FIELDS.get(collection_name, []):
+        if field in new_doc: new_doc[field] = _converted(new_doc[field])
+    new_doc["_id"] = new_id
+    new_doc[STASH_FIELD] = {
+        field: new_doc.pop(field) for field in UNIQUE_INDEXED_FIELDS.get(collection_name, []) if field in new_doc
+    }
+    try:
+        collection.insert_one(new_doc)
+    except DuplicateKeyError:
+        # A previous run inserted the new copy but crashed before finishing; any other
+        # unique-index conflict is re-raised so nothing is lost
+        existing = collection.find_one({"_id": new_id}, {STASH_FIELD: 1})
+        if existing is None: raise
+        logger.info(f"{collection_name}: {new_id} already inserted, finishing the rewrite")
+        new_doc[STASH_FIELD] = existing.get(STASH_FIELD)
+    collection.delete_one({"_id": old_id})
+    if new_doc[STASH_FIELD] is not None: _restore_stash(collection, new_id, new_doc[STASH_FIELD])
+
+def convert_string_uuids(apply: bool = False):
+    """Report (and with apply=True convert) string-form UUID _ids and reference fields."""
+    logger.info(f"Starting string UUID {'conversion' if apply else 'report'}")
+    client = get_mongo_client()
+    db = client[settings.DB_NAME]
+
+    try:
+        for collection_name in sorted(set(UUID_ID_COLLECTIONS) | set(UUID_REFERENCE_FIELDS)):
+            collection = db[collection_name]
+            index_sizes = db.command("collStats", collection_name).get("indexSizes", {})
+            logger.info(f"{collection_name}: index sizes {index_sizes}")
+
+            if collection_name in UUID_ID_COLLECTIONS:
+                string_ids = 0
+                for doc in collection.find({"_id": {"$type": "string"}}):
+                    new_id = _as_uuid(doc["_id"])
+                    if new_id is None: continue
+                    string_ids += 1
+                    if apply: _rewrite_string_id(collection, collection_name, doc, new_id)
+                logger.info(f"{collection_name}: {string_ids} string _ids{' converted' if apply else ''}")
+                if apply:
+                    # A crash after a delete but before the restore leaves a parked stash behind
+                    for doc in collection.find({STASH_FIELD: {"$exists": True}}, {STASH_FIELD: 1}):
+                        _restore_stash(collection, doc["_id"], doc[STASH_FIELD])
+
+            for field in UUID_REFERENCE_FIELDS.get(collection_name, []):
+                string_refs = 0
+                for doc in collection.find({field: {"$type": "string"}}, {field: 1}):
+                    if _converted(doc[field]) == doc[field]: continue
+                    string_refs += 1
+                    if apply:
+                        collection.update_one({"_id": doc["_id"]}, {"$set": {field: _converted(doc[field])}})
+                logger.info(f"{collection_name}.{field}: {string_refs} string references{' converted' if apply else ''}")
+
+        logger.info(f"String UUID {'conversion' if apply else 'report'} completed successfully")
+
+    except Exception as e:
+        logger.error(f"Error during string UUID conversion: {str(e)}")
+        raise
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="Rewrite the string UUIDs (default: report only)")
+    convert_string_uuids(apply=parser.parse_args().apply)
@@ -1,13 +1,13 @@
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 import uuid
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 from app.core.config import settings
 from app.models.teacher import TeacherInDBBase, TeacherCreate
 from app.core.security import verify_token
 
 class AuthService:
-    def __init__(self, db: AsyncIOMotorClient):
+    def __init__(self, db: AsyncMongoClient):
         self.db = db
         self.teachers_collection = db[settings.MONGODB_DB][settings.TEACHERS_COLLECTION]
 
@@ -22,7 +22,6 @@ class BatchProcessor:
     def __init__(self):
         self.is_running = False
         self.current_batch: Optional[Batch] = None
-        self.current_documents: List[Document] = []
 
     async def process_batches(self):
         """Main loop for processing batches."""
@@ -40,16 +39,11 @@ class BatchProcessor:
                 logger.info(f"Processing batch {batch.id} (claimed atomically)")
 
                 try:
-                    # Get all documents in the batch
-                    self.current_documents = await crud.get_documents_by_batch_id(batch_id=batch.id)
-                    
-                    # Sort documents by queue position
-                    self.current_documents.sort(key=lambda x: x.queue_position or float('inf'))
-                    
-                    # Process each document
+                    # Stream the batch's documents in queue position order (unpositioned last)
+                    # instead of loading them all; a read error propagates and marks the batch ERROR
                     completed = 0
                     failed = 0
-                    for doc in self.current_documents:
+                    async for doc in crud.iter_documents_by_batch_id(batch_id=batch.id):
                         try:
                             success = await self._process_document(doc)
                             if success:
@@ -84,7 +78,6 @@ class BatchProcessor:
                     )
                 finally:
                     self.current_batch = None
-                    self.current_documents = []
 
         except Exception as e:
             logger.error(f"Batch processor error: {e}")
@@ -154,7 +147,7 @@ class BatchProcessor:
         try:
             logger.info(f"Processing document {document.id} for teacher {document.teacher_id}")
             # Update document status to PROCESSING
-            await crud.update_document_status(
+            await crud.update_document_status_fast(
                 document_id=document.id,
                 teacher_id=document.teacher_id,
                 status=DocumentStatus.PROCESSING
@@ -189,7 +182,8 @@ class BatchProcessor:
                 teacher_id=document.teacher_id,
                 status=DocumentStatus.COMPLETED,
                 character_count=character_count,
-                word_count=word_count
+                word_count=word_count,
+                validate=False # Returned document is unused
             )
 
             # Update result status
@@ -202,7 +196,8 @@ class BatchProcessor:
                 await crud.update_result(
                     result_id=result_to_update.id, # Use the actual result_id
                     # Ensure teacher_id is handled correctly in update_result if needed by that function
-                    update_data={"status": ResultStatus.COMPLETED.value}
+                    update_data={"status": ResultStatus.COMPLETED.value},
+                    return_document=False
                 )
             else:
                 logger.warning(f"No result found for document {document.id} to update to COMPLETED status.")
@@ -213,7 +208,7 @@ class BatchProcessor:
         except Exception as e:
             logger.error(f"Error processing document {document.id} for teacher {document.teacher_id}: {e}", exc_info=True)
             # Update document status to ERROR
-            await crud.update_document_status(
+            await crud.update_document_status_fast(
                 document_id=document.id,
                 teacher_id=document.teacher_id,
                 status=DocumentStatus.ERROR,
@@ -226,7 +221,8 @@ class BatchProcessor:
                 await crud.update_result(
                     result_id=result_to_update_on_error.id,
                      # Ensure teacher_id is handled correctly in update_result if needed
-                    update_data={"status": ResultStatus.ERROR.value}
+                    update_data={"status": ResultStatus.ERROR.value},
+                    return_document=False
                 )
             else:
                 logger.warning(f"No result found for document {document.id} to update to ERROR status.")
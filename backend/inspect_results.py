@@ -1,7 +1,7 @@
 # inspect_results.py
 import asyncio
 import os
-import motor.motor_asyncio
+from pymongo import AsyncMongoClient
 from dotenv import load_dotenv # To load variables from .env file
 
 # --- Configuration ---
@@ -33,7 +33,7 @@ async def inspect_data():
     print(f"Connecting to MongoDB using {CONNECTION_STRING_ENV_VAR}...")
     try:
         # Increase timeout settings for Cosmos DB
-        client = motor.motor_asyncio.AsyncIOMotorClient(
+        client = AsyncMongoClient(
             connection_string,
             serverSelectionTimeoutMS=10000, # Increase server selection timeout to 10s
             connectTimeoutMS=10000         # Increase connection timeout to 10s
@@ -74,7 +74,7 @@ async def inspect_data():
         traceback.print_exc()
     finally:
         if 'client' in locals() and client:
-            client.close()
+            await client.close()
             print("\nConnection closed.")
 
 if __name__ == "__main__":
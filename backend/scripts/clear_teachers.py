@@ -6,7 +6,7 @@ This is a destructive operation and should be used with caution.
 
 import asyncio
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 from app.core.config import settings
 from app.db.crud import clear_all_teachers
 
@@ -17,7 +17,7 @@ logger = logging.getLogger(__name__)
 async def main():
     """Main function to clear all teachers."""
     # Connect to MongoDB
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    client = AsyncMongoClient(settings.MONGODB_URL)
     db = client[settings.MONGODB_DB]
     
     try:
@@ -43,7 +43,7 @@ async def main():
         print(f"\nAn error occurred: {e}")
     finally:
         # Close the MongoDB connection
-        client.close()
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -12,7 +12,8 @@ import asyncio
 import sys
 import os
 from pathlib import Path # Added for path manipulation
-from motor.motor_asyncio import AsyncIOMotorClient # Added Motor import
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
 from fastapi import FastAPI # <-- ADD FastAPI IMPORT
 from contextlib import asynccontextmanager # Need this for LifespanManager
 from asgi_lifespan import LifespanManager # <-- ADD LifespanManager IMPORT
@@ -136,7 +137,7 @@ async def app(mocker: MockerFixture) -> AsyncGenerator[FastAPI, None]:
 
 
 @pytest_asyncio.fixture(scope="function")
-async def db(app: FastAPI) -> AsyncIOMotorClient:
+async def db(app: FastAPI) -> AsyncGenerator[AsyncDatabase, None]:
     # --- This fixture might need adjustment --- 
     # Since the app fixture now mocks connect_to_mongo and get_database,
     # this db fixture might not be necessary for tests that *only* use the app fixture
@@ -154,7 +155,7 @@ async def db(app: FastAPI) -> AsyncIOMotorClient:
     test_db_name = settings.DB_NAME + "_test_via_db_fixture" # Make name distinct
     logger.info(f"Connecting to MongoDB test database via 'db' fixture: {test_db_name}")
 
-    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=5000) # Add timeout
+    client = AsyncMongoClient(settings.MONGODB_URL, serverSelectionTimeoutMS=5000) # Add timeout
     try:
         # Check connection
         await client.admin.command('ping')
@@ -167,7 +168,7 @@ async def db(app: FastAPI) -> AsyncIOMotorClient:
 
     logger.info(f"Dropping test database via 'db' fixture: {test_db_name}")
     await client.drop_database(test_db_name)
-    client.close()
+    await client.close()
     logger.info("Test database connection (db fixture) closed.")
 
 
@@ -0,0 +1,55 @@
+# backend/tests/functional/api/v1/endpoints/test_students_endpoint.py
+import json
+import pytest
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Any
+from httpx import AsyncClient, ASGITransport
+from fastapi import FastAPI, status
+from pytest_mock import MockerFixture
+
+from backend.app.core.config import settings
+from app.core.security import get_current_user_payload
+from backend.app.models.student import Student
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_export_students_streams_ndjson(app: FastAPI, mocker: MockerFixture):
+    """GET /students/export streams one JSON student per line from crud.iter_all_students."""
+    test_user_kinde_id = f"user_kinde_id_student_export_{uuid.uuid4()}"
+
+    async def override_get_current_user_payload() -> Dict[str, Any]:
+        return {"sub": test_user_kinde_id, "exp": time.time() + 3600, "roles": ["teacher"]}
+
+    app.dependency_overrides[get_current_user_payload] = override_get_current_user_payload
+
+    now_utc = datetime.now(timezone.utc)
+    students = [
+        Student(_id=uuid.uuid4(), first_name=name, last_name="Smith", teacher_id=test_user_kinde_id,
+                created_at=now_utc, updated_at=now_utc, is_deleted=False)
+        for name in ("Ada", "Bob")
+    ]
+
+    async def mock_iter_all_students(**kwargs):
+        for student in students:
+            yield student
+
+    mocked_iter = mocker.patch(
+        'backend.app.api.v1.endpoints.students.crud.iter_all_students',
+        side_effect=mock_iter_all_students
+    )
+
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(f"{settings.API_V1_PREFIX}/students/export", params={"year_group": "Year 9"})
+    finally:
+        app.dependency_overrides.pop(get_current_user_payload, None)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["first_name"] for line in lines] == ["Ada", "Bob"]
+    assert lines[0]["_id"] == str(students[0].id)
+    mocked_iter.assert_called_once_with(teacher_id=test_user_kinde_id, year_group="Year 9", limit=0)
@@ -4,7 +4,6 @@ import time
 from typing import Any, Dict, Optional
 import httpx # <-- ADD THIS IMPORT
 from httpx import AsyncClient, ASGITransport # Use this for type hinting
-from motor.motor_asyncio import AsyncIOMotorClient  # For DB checks
 # backend.app.core.config.settings is imported within the test or via conftest
 from backend.app.main import app as fastapi_app # <-- ADD THIS IMPORT
 from backend.app.models.teacher import TeacherCreate # Assuming model is here
@@ -862,7 +861,7 @@ async def test_list_teachers_as_admin_success(
         )
     ]
 
-    def mock_get_all_teachers_side_effect(skip: int, limit: int):
+    def mock_get_all_teachers_side_effect(skip: int, limit: int, after_id=None):
         print(f"mock_get_all_teachers_side_effect called with skip={skip}, limit={limit}")
         return mock_teachers_db[skip : skip + limit]
 
@@ -890,7 +889,7 @@ async def test_list_teachers_as_admin_success(
         expected_ids_no_pagination = [t.id for t in mock_teachers_db]
         assert returned_ids_no_pagination == expected_ids_no_pagination, \
             "No pagination: Returned teacher list IDs do not match expected IDs."
-        mocked_crud_get_all.assert_called_with(skip=0, limit=100) # Default query params
+        mocked_crud_get_all.assert_called_with(skip=0, limit=100, after_id=None) # Default query params
 
         # Scenario 2: With pagination (e.g., skip=1, limit=1)
         print("Testing GET /teachers/ with pagination (skip=1, limit=1)...")
@@ -907,7 +906,7 @@ async def test_list_teachers_as_admin_success(
         expected_ids_with_pagination = [mock_teachers_db[test_skip].id] # Sliced expectation
         assert returned_ids_with_pagination == expected_ids_with_pagination, \
             "With pagination: Returned teacher list IDs do not match expected sliced IDs."
-        mocked_crud_get_all.assert_called_with(skip=test_skip, limit=test_limit)
+        mocked_crud_get_all.assert_called_with(skip=test_skip, limit=test_limit, after_id=None)
 
     # Cleanup the dependency override
     if original_override:
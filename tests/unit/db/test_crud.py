@@ -0,0 +1,1456 @@
+# tests/unit/db/test_crud.py
+import asyncio
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pytest_mock import MockerFixture
+from bson.binary import Binary, UuidRepresentation
+
+from app.db import crud
+from app.models.student import StudentCreate
+from app.models.document import DocumentCreate
+from app.models.result import ResultCreate
+from app.models.enums import DocumentStatus, FileType, ResultStatus
+
+pytestmark = pytest.mark.asyncio
+
+TEACHER_ID = "kinde_teacher_unit_test"
+
+
+@pytest.fixture(autouse=True)
+def _clear_dashboard_cache():
+    crud._dashboard_cache.clear()
+    yield
+    crud._dashboard_cache.clear()
+
+
+def _mock_collection(mocker: MockerFixture) -> MagicMock:
+    """Patch crud._get_collection to return a mock collection with an acknowledged insert."""
+    collection = MagicMock()
+    collection.insert_one = AsyncMock(return_value=MagicMock(acknowledged=True))
+    collection.find_one = AsyncMock(return_value=None)
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    return collection
+
+
+# --- Create paths hydrate locally (no read-after-insert) ---
+
+async def test_create_student_hydrates_without_find_one(mocker: MockerFixture):
+    collection = _mock_collection(mocker)
+    student_in = StudentCreate(first_name="Ada", last_name="Lovelace", teacher_id=TEACHER_ID)
+
+    student = await crud.create_student(student_in, teacher_id=TEACHER_ID, session=MagicMock())
+
+    assert student is not None
+    assert student.first_name == "Ada"
+    assert student.teacher_id == TEACHER_ID
+    inserted_doc = collection.insert_one.await_args.args[0]
+    assert student.id == inserted_doc["_id"]
+    collection.find_one.assert_not_awaited()
+
+
+async def test_create_document_hydrates_without_find_one(mocker: MockerFixture):
+    collection = _mock_collection(mocker)
+    document_in = DocumentCreate(
+        original_filename="essay.pdf",
+        storage_blob_path="blob/essay.pdf",
+        file_type=FileType.PDF,
+        status=DocumentStatus.UPLOADED,
+        student_id=uuid.uuid4(),
+        assignment_id=uuid.uuid4(),
+        teacher_id=TEACHER_ID,
+    )
+
+    document = await crud.create_document(document_in)
+
+    assert document is not None
+    assert document.status == DocumentStatus.UPLOADED.value
+    assert document.id == collection.insert_one.await_args.args[0]["_id"]
+    collection.find_one.assert_not_awaited()
+
+
+async def test_create_result_hydrates_without_find_one(mocker: MockerFixture):
+    collection = _mock_collection(mocker)
+    result_in = ResultCreate(document_id=uuid.uuid4(), teacher_id=TEACHER_ID)
+
+    result = await crud.create_result(result_in, session=MagicMock())
+
+    assert result is not None
+    assert result.status == ResultStatus.PENDING.value
+    assert result.id == collection.insert_one.await_args.args[0]["_id"]
+    collection.find_one.assert_not_awaited()
+
+
+async def test_create_student_not_acknowledged_returns_none(mocker: MockerFixture):
+    collection = _mock_collection(mocker)
+    collection.insert_one.return_value = MagicMock(acknowledged=False)
+    student_in = StudentCreate(first_name="Ada", last_name="Lovelace", teacher_id=TEACHER_ID)
+
+    assert await crud.create_student(student_in, teacher_id=TEACHER_ID, session=MagicMock()) is None
+
+
+# --- Name filters use collation equality, not $regex ---
+
+async def test_get_all_students_name_filter_uses_collation(mocker: MockerFixture):
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.skip.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[])
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    await crud.get_all_students(teacher_id=TEACHER_ID, first_name="ada", last_name="LOVELACE")
+
+    filter_query = collection.find.call_args.args[0]
+    assert filter_query["first_name"] == "ada"
+    assert filter_query["last_name"] == "LOVELACE"
+    assert collection.find.call_args.kwargs["collation"] == crud.NAME_COLLATION
+
+
+async def test_get_all_students_without_name_filter_has_no_collation(mocker: MockerFixture):
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.skip.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[])
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    await crud.get_all_students(teacher_id=TEACHER_ID)
+
+    assert collection.find.call_args.kwargs["collation"] is None
+
+
+async def test_get_all_class_groups_without_validation_uses_model_construct(mocker: MockerFixture):
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.skip.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    class_group_id = uuid.uuid4()
+    # class_name missing: fails validation, but validate=False trusts our own stored rows
+    cursor.to_list = AsyncMock(return_value=[{"_id": class_group_id, "teacher_id": TEACHER_ID, "is_deleted": False}])
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    assert await crud.get_all_class_groups(teacher_id=TEACHER_ID) == []
+    class_groups = await crud.get_all_class_groups(teacher_id=TEACHER_ID, validate=False)
+
+    assert [c.id for c in class_groups] == [class_group_id]
+
+
+# --- Keyset pagination ---
+
+async def test_get_all_schools_after_id_pages_by_id_without_skip(mocker: MockerFixture):
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[])
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    after_id = uuid.uuid4()
+
+    await crud.get_all_schools(skip=50, limit=20, after_id=after_id)
+
+    assert collection.find.call_args.args[0] == {"is_deleted": False, "_id": {"$gt": after_id}}
+    assert collection.find.call_args.kwargs["projection"] == crud.SCHOOL_LIST_PROJECTION
+    cursor.sort.assert_called_once_with("_id", 1)
+    cursor.limit.assert_called_once_with(20)
+    cursor.skip.assert_not_called()
+
+
+# --- delete_document ---
+
+async def test_delete_document_soft_deletes_in_one_update(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    collection.find_one_and_update = AsyncMock(return_value={"_id": uuid.uuid4(), "storage_blob_path": "blob/essay.pdf"})
+    collection.find_one = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    delete_blob = mocker.patch.object(crud, "service_delete_blob", new_callable=AsyncMock, return_value=True)
+    mocker.patch.object(crud, "get_result_by_document_id", new_callable=AsyncMock, return_value=None)
+
+    assert await crud.delete_document(uuid.uuid4(), teacher_id=TEACHER_ID, session=MagicMock()) is True
+
+    update = collection.find_one_and_update.await_args
+    assert update.args[0]["teacher_id"] == TEACHER_ID
+    assert update.args[1]["$set"]["is_deleted"] is True
+    delete_blob.assert_awaited_once_with("blob/essay.pdf")
+    collection.find_one.assert_not_awaited()
+
+
+async def test_delete_document_already_deleted_is_idempotent(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    collection.find_one = AsyncMock(return_value={"_id": uuid.uuid4()})
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    delete_blob = mocker.patch.object(crud, "service_delete_blob", new_callable=AsyncMock)
+
+    assert await crud.delete_document(uuid.uuid4(), teacher_id=TEACHER_ID, session=MagicMock()) is True
+    delete_blob.assert_not_awaited()
+
+
+async def test_delete_document_not_owned_returns_false(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    collection.find_one = AsyncMock(return_value=None)
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    assert await crud.delete_document(uuid.uuid4(), teacher_id=TEACHER_ID, session=MagicMock()) is False
+
+
+async def test_delete_document_cleanup_failure_reverts_soft_delete(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    collection.find_one_and_update = AsyncMock(return_value={"_id": uuid.uuid4(), "storage_blob_path": "blob/essay.pdf"})
+    collection.update_one = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    mocker.patch.object(crud, "service_delete_blob", new_callable=AsyncMock, side_effect=RuntimeError("storage down"))
+    maybe_delete_result = mocker.patch.object(crud, "_maybe_delete_result", new_callable=AsyncMock, return_value=True)
+    document_id = uuid.uuid4()
+
+    assert await crud.delete_document(document_id, teacher_id=TEACHER_ID, session=MagicMock()) is False
+    maybe_delete_result.assert_awaited_once() # The result cleanup still ran alongside the blob delete
+    revert = collection.update_one.await_args
+    assert revert.args[0] == {"_id": document_id, "teacher_id": TEACHER_ID}
+    assert revert.args[1]["$set"]["is_deleted"] is False
+
+
+async def test_delete_document_result_delete_false_reverts_soft_delete(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    collection.find_one_and_update = AsyncMock(return_value={"_id": uuid.uuid4(), "storage_blob_path": None})
+    collection.update_one = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    mocker.patch.object(crud, "_maybe_delete_result", new_callable=AsyncMock, return_value=False)
+
+    assert await crud.delete_document(uuid.uuid4(), teacher_id=TEACHER_ID, session=MagicMock()) is False
+    collection.update_one.assert_awaited_once()
+
+
+# --- List reads drain the cursor in one to_list call ---
+
+def _student_doc(**overrides):
+    doc = {"_id": uuid.uuid4(), "first_name": "Ada", "last_name": "Lovelace", "teacher_id": TEACHER_ID, "is_deleted": False}
+    doc.update(overrides)
+    return doc
+
+
+async def test_get_all_students_uses_to_list_and_skips_invalid_docs(mocker: MockerFixture):
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.skip.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[_student_doc(), _student_doc(first_name="")])
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    students = await crud.get_all_students(teacher_id=TEACHER_ID, limit=25)
+
+    cursor.to_list.assert_awaited_once_with(length=25)
+    cursor.batch_size.assert_called_once_with(25)
+    assert [s.first_name for s in students] == ["Ada"]
+    assert collection.find.call_args.kwargs["projection"] == crud.STUDENT_LIST_PROJECTION
+
+
+def test_list_projections_cover_response_model_fields():
+    assert crud.STUDENT_LIST_PROJECTION["_id"] == 1
+    assert {"_id", "school_name", "school_country"} <= set(crud.SCHOOL_LIST_PROJECTION)
+    assert {"_id", "email", "role", "is_deleted"} <= set(crud.TEACHER_LIST_PROJECTION)
+    assert {"_id", "class_name", "teacher_id", "student_ids"} <= set(crud.CLASSGROUP_LIST_PROJECTION)
+    assert "id" not in crud.STUDENT_LIST_PROJECTION
+    assert {"first_name", "last_name", "teacher_id", "is_deleted"} <= set(crud.STUDENT_LIST_PROJECTION)
+    assert {"_id", "storage_blob_path", "status", "upload_timestamp"} <= set(crud.DOCUMENT_LIST_PROJECTION)
+
+
+# --- Collection handle cache ---
+
+def test_get_collection_caches_handles_per_database(mocker: MockerFixture):
+    first_db, second_db = MagicMock(), MagicMock()
+    get_database = mocker.patch.object(crud, "get_database", return_value=first_db)
+
+    handle = crud._get_collection(crud.STUDENT_COLLECTION)
+    assert crud._get_collection(crud.STUDENT_COLLECTION) is handle
+    first_db.__getitem__.assert_called_once_with(crud.STUDENT_COLLECTION)
+
+    # A reconnect yields a new database object; stale handles must not be reused
+    get_database.return_value = second_db
+    assert crud._get_collection(crud.STUDENT_COLLECTION) is second_db.__getitem__.return_value
+
+    get_database.return_value = None
+    assert crud._get_collection(crud.STUDENT_COLLECTION) is None
+
+
+def test_init_collections_warms_the_handle_cache(mocker: MockerFixture):
+    db = MagicMock()
+    mocker.patch.object(crud, "get_database", return_value=db)
+
+    crud.init_collections(db)
+    calls_after_init = db.__getitem__.call_count
+
+    assert crud._get_collection(crud.BATCH_COLLECTION) is db.__getitem__.return_value
+    assert crud._get_collection(crud.RESULT_COLLECTION) is db.__getitem__.return_value
+    assert db.__getitem__.call_count == calls_after_init # Served from the warm cache
+
+
+def test_reset_collection_cache_drops_handles(mocker: MockerFixture):
+    db = MagicMock()
+    mocker.patch.object(crud, "get_database", return_value=db)
+    crud.init_collections(db)
+
+    crud.reset_collection_cache()
+
+    assert crud._collection_cache == {} and crud._collection_cache_db is None
+    calls_after_reset = db.__getitem__.call_count
+    crud._get_collection(crud.SCHOOL_COLLECTION)
+    assert db.__getitem__.call_count == calls_after_reset + 1 # Repopulated lazily
+
+
+async def test_delete_student_soft_delete_relaxes_write_concern(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    collection.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    assert await crud.delete_student(uuid.uuid4(), teacher_id=TEACHER_ID, session=MagicMock()) is True
+    collection.with_options.assert_called_once_with(write_concern=crud.SOFT_DELETE_WRITE_CONCERN)
+    assert crud.SOFT_DELETE_WRITE_CONCERN.document == {"w": 1, "j": False}
+
+
+# --- Soft-delete predicate ---
+
+def test_soft_delete_filter_uses_equality():
+    assert crud.soft_delete_filter() == {"is_deleted": False}
+    assert crud.soft_delete_filter(include_deleted=True) == {}
+
+
+async def test_by_id_reads_splice_the_soft_delete_constant(mocker: MockerFixture):
+    collection = _mock_collection(mocker)
+    school_id, document_id = uuid.uuid4(), uuid.uuid4()
+
+    await crud.get_school_by_id(school_id)
+    assert collection.find_one.await_args.args[0] == {"_id": school_id, "is_deleted": False}
+    await crud.get_document_by_id(document_id, teacher_id=TEACHER_ID, include_deleted=True)
+    assert collection.find_one.await_args.args[0] == {"_id": document_id, "teacher_id": TEACHER_ID}
+    assert crud.soft_delete_filter() == {"is_deleted": False} # Shared constants left untouched
+
+
+# --- update_student builds $set from the allowlisted, explicitly-set fields ---
+
+async def test_update_student_sets_only_explicit_fields(mocker: MockerFixture):
+    from app.models.student import StudentUpdate
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=_student_doc(first_name="Augusta"))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    student = await crud.update_student(
+        uuid.uuid4(), teacher_id=TEACHER_ID,
+        student_in=StudentUpdate(first_name="Augusta", external_student_id=""), session=MagicMock()
+    )
+
+    update_set = collection.find_one_and_update.await_args.args[1]["$set"]
+    assert set(update_set) == {"first_name", "external_student_id", "updated_at"}
+    assert update_set["external_student_id"] is None
+    assert student.first_name == "Augusta"
+
+
+async def test_update_student_validate_false_constructs_returned_doc(mocker: MockerFixture):
+    from app.models.student import StudentUpdate
+    doc = _student_doc(first_name="Augusta")
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=doc)
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    construct_spy = mocker.spy(crud.Student, "model_construct")
+
+    student = await crud.update_student(
+        doc["_id"], teacher_id=TEACHER_ID, student_in=StudentUpdate(first_name="Augusta"), validate=False
+    )
+
+    assert student.id == doc["_id"] and student.first_name == "Augusta"
+    construct_spy.assert_called_once()
+
+
+# --- Lightweight / bulk document status updates ---
+
+async def test_update_document_status_fast_uses_update_one(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+    collection.find_one_and_update = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    document_id = uuid.uuid4()
+
+    assert await crud.update_document_status_fast(document_id, TEACHER_ID, DocumentStatus.PROCESSING, word_count=3) is True
+
+    query, update = collection.update_one.await_args.args
+    assert query == {"_id": document_id, "teacher_id": TEACHER_ID, "is_deleted": False}
+    assert update["$set"]["status"] == DocumentStatus.PROCESSING.value
+    assert update["$set"]["word_count"] == 3
+    assert "character_count" not in update["$set"]
+    collection.find_one_and_update.assert_not_awaited()
+
+
+async def test_update_document_status_fast_not_found(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.update_one = AsyncMock(return_value=MagicMock(matched_count=0))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    assert await crud.update_document_status_fast(uuid.uuid4(), TEACHER_ID, DocumentStatus.ERROR) is False
+
+
+# --- create_student upserts on (teacher_id, external_student_id) ---
+
+async def test_create_student_with_external_id_upserts(mocker: MockerFixture):
+    collection = _mock_collection(mocker)
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    student_in = StudentCreate(first_name="Ada", last_name="Lovelace", external_student_id="S-1", teacher_id=TEACHER_ID)
+
+    student = await crud.create_student(student_in, teacher_id=TEACHER_ID, session=MagicMock())
+
+    query, update = collection.find_one_and_update.await_args.args
+    assert query == {"teacher_id": TEACHER_ID, "external_student_id": "S-1"}
+    assert "teacher_id" not in update["$setOnInsert"]
+    assert collection.find_one_and_update.await_args.kwargs["upsert"] is True
+    assert student.id == update["$setOnInsert"]["_id"]
+    assert student.external_student_id == "S-1"
+    collection.insert_one.assert_not_awaited()
+
+
+async def test_create_student_duplicate_external_id(mocker: MockerFixture):
+    collection = _mock_collection(mocker)
+    existing = _student_doc(external_student_id="S-1")
+    collection.find_one_and_update = AsyncMock(return_value=existing)
+    student_in = StudentCreate(first_name="Ada", last_name="Lovelace", external_student_id="S-1", teacher_id=TEACHER_ID)
+
+    assert await crud.create_student(student_in, teacher_id=TEACHER_ID, session=MagicMock()) is None
+
+
+# --- validate=False skips Pydantic validation for trusted list reads ---
+
+async def test_get_all_students_without_validation_uses_model_construct(mocker: MockerFixture):
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.skip.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[_student_doc(first_name="")])
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    assert await crud.get_all_students(teacher_id=TEACHER_ID) == []
+    students = await crud.get_all_students(teacher_id=TEACHER_ID, validate=False)
+
+    assert len(students) == 1 and students[0].first_name == ""
+    assert students[0].is_deleted is False
+
+
+# --- Streaming readers ---
+
+async def test_iter_all_students_yields_valid_docs(mocker: MockerFixture):
+    docs = [_student_doc(), _student_doc(first_name=""), _student_doc(first_name="Grace")]
+
+    class _Cursor:
+        def skip(self, _): return self
+        def limit(self, _): return self
+        def batch_size(self, _): return self
+        def __aiter__(self): return self
+        async def __anext__(self):
+            if not docs: raise StopAsyncIteration
+            return docs.pop(0)
+
+    collection = MagicMock()
+    collection.find.return_value = _Cursor()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    names = [s.first_name async for s in crud.iter_all_students(teacher_id=TEACHER_ID)]
+
+    assert names == ["Ada", "Grace"]
+    assert collection.find.call_args.args[0]["teacher_id"] == TEACHER_ID
+
+
+async def test_iter_all_students_propagates_mid_stream_errors(mocker: MockerFixture):
+    from pymongo.errors import CursorNotFound
+    docs = [_student_doc(first_name="Ada")]
+
+    class _Cursor:
+        def skip(self, _): return self
+        def limit(self, _): return self
+        def batch_size(self, _): return self
+        def __aiter__(self): return self
+        async def __anext__(self):
+            if docs: return docs.pop(0)
+            raise CursorNotFound("cursor id not found")
+
+    collection = MagicMock()
+    collection.find.return_value = _Cursor()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    streamed = []
+    with pytest.raises(CursorNotFound):
+        async for student in crud.iter_all_students(teacher_id=TEACHER_ID):
+            streamed.append(student.first_name)
+    assert streamed == ["Ada"] # Rows before the failure were yielded; the failure is not swallowed
+
+
+async def test_list_and_stream_batch_sizes_are_capped(mocker: MockerFixture):
+    collection = MagicMock()
+    cursor = MagicMock()
+    cursor.skip.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[])
+    cursor.__aiter__.return_value = iter([])
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    await crud.get_all_students(teacher_id=TEACHER_ID, limit=5000)
+    assert cursor.batch_size.call_args.args == (crud.LIST_BATCH_SIZE_CAP,)
+
+    [s async for s in crud.iter_all_students(teacher_id=TEACHER_ID, limit=0)]
+    assert cursor.batch_size.call_args.args == (crud.STREAM_BATCH_SIZE,)
+
+
+# --- Single-document writes do not open a transaction ---
+
+async def test_single_document_writes_skip_transaction(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.with_options.return_value = collection
+    collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1, modified_count=1))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    start_transaction = mocker.patch.object(crud, "transaction")
+
+    assert await crud.delete_student(uuid.uuid4(), teacher_id=TEACHER_ID) is True
+    assert await crud.add_student_to_class_group(uuid.uuid4(), uuid.uuid4()) is True
+    assert await crud.remove_student_from_class_group(uuid.uuid4(), uuid.uuid4()) is True
+    assert await crud.delete_school(uuid.uuid4()) is True
+    assert await crud.delete_teacher(TEACHER_ID) is True
+    assert await crud.delete_class_group(uuid.uuid4(), teacher_id=TEACHER_ID) is True
+
+    start_transaction.assert_not_called()
+    assert collection.update_one.await_args.kwargs["session"] is None
+
+
+async def test_nested_transactional_call_joins_ambient_session(mocker: MockerFixture):
+    session = MagicMock()
+    started = []
+
+    @crud.asynccontextmanager
+    async def fake_transaction():
+        started.append(session)
+        yield session
+
+    mocker.patch.object(crud, "transaction", fake_transaction)
+    seen = []
+
+    @crud.with_transaction
+    async def inner(session=None):
+        seen.append(session)
+
+    @crud.with_transaction
+    async def outer(session=None):
+        await inner() # no session= passed through
+
+    await outer()
+
+    assert started == [session] # only the outer call opened a transaction
+    assert seen == [session]
+    assert crud._current_session.get() is None
+
+
+async def test_transaction_skips_session_on_standalone_topology(mocker: MockerFixture):
+    from pymongo.topology_description import TOPOLOGY_TYPE
+    db = MagicMock()
+    db.client.topology_description.topology_type = TOPOLOGY_TYPE.Single
+    db.client.start_session = MagicMock()
+    mocker.patch.object(crud, "get_database", return_value=db)
+
+    async with crud.transaction() as session:
+        assert session is None
+    db.client.start_session.assert_not_called()
+
+
+async def test_transaction_uses_topology_resolved_at_startup(mocker: MockerFixture):
+    from pymongo.topology_description import TOPOLOGY_TYPE
+    db = MagicMock()
+    db.client.topology_description.topology_type = TOPOLOGY_TYPE.Single
+    db.client.start_session = MagicMock()
+    mocker.patch.object(crud, "get_database", return_value=db)
+    crud.init_collections(db)
+    # A later read can report Unknown (e.g. mid-rediscovery); the startup answer still holds
+    db.client.topology_description.topology_type = TOPOLOGY_TYPE.Unknown
+
+    async with crud.transaction() as session:
+        assert session is None
+    db.client.start_session.assert_not_called()
+
+    crud.reset_collection_cache()
+    assert crud._standalone_topology is None
+
+
+async def test_transaction_commits_on_async_client_session(mocker: MockerFixture):
+    from pymongo.topology_description import TOPOLOGY_TYPE
+    session = MagicMock(in_transaction=True, commit_transaction=AsyncMock(), abort_transaction=AsyncMock())
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    transaction_cm = MagicMock(__aenter__=AsyncMock(), __aexit__=AsyncMock(return_value=False))
+    session.start_transaction = AsyncMock(return_value=transaction_cm) # awaited for its context manager
+    db = MagicMock()
+    db.client.topology_description.topology_type = TOPOLOGY_TYPE.ReplicaSetWithPrimary
+    db.client.start_session = MagicMock(return_value=session) # not awaited on AsyncMongoClient
+    mocker.patch.object(crud, "get_database", return_value=db)
+
+    async with crud.transaction() as active:
+        assert active is session
+    session.start_transaction.assert_awaited_once()
+    session.commit_transaction.assert_awaited_once()
+
+
+# --- Dashboard stats use one $facet aggregation per collection ---
+
+async def test_get_dashboard_stats_single_facet_per_collection(mocker: MockerFixture):
+    from app.models.teacher import Teacher
+    mocker.patch.object(crud, "get_teacher_by_kinde_id", new_callable=AsyncMock,
+                        return_value=MagicMock(spec=Teacher, id=TEACHER_ID))
+    docs_collection, results_collection = MagicMock(), MagicMock()
+    docs_collection.aggregate = AsyncMock()
+    docs_collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        {"totalDocs": [{"count": 7}], "pending": [{"count": 2}]}
+    ]))
+    results_collection.aggregate = AsyncMock()
+    results_collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        {"avgScore": [{"_id": None, "avgScore": 0.42}], "flaggedRecent": []}
+    ]))
+    mocker.patch.object(crud, "_get_collection", side_effect=lambda name: {
+        crud.DOCUMENT_COLLECTION: docs_collection, crud.RESULT_COLLECTION: results_collection
+    }[name])
+    docs_collection.count_documents = AsyncMock()
+
+    stats = await crud.get_dashboard_stats({"sub": TEACHER_ID})
+
+    assert stats == {"totalDocs": 7, "avgScore": 0.42, "flaggedRecent": 0, "pending": 2}
+    docs_collection.aggregate.assert_called_once()
+    results_collection.aggregate.assert_called_once()
+    docs_collection.count_documents.assert_not_awaited()
+    docs_pipeline = docs_collection.aggregate.call_args.args[0]
+    assert docs_pipeline[0] == {"$match": {"teacher_id": TEACHER_ID}}
+    assert docs_pipeline[1] == {"$project": {"_id": 0, "status": 1}}
+    results_pipeline = results_collection.aggregate.call_args.args[0]
+    assert results_pipeline[0] == {"$match": {"teacher_id": TEACHER_ID, "status": ResultStatus.COMPLETED.value}}
+    assert set(results_pipeline[1]["$facet"]) == {"avgScore", "flaggedRecent"}
+
+
+async def test_get_dashboard_stats_caps_flagged_recent(mocker: MockerFixture):
+    mocker.patch.object(crud, "get_teacher_by_kinde_id", new_callable=AsyncMock, return_value=MagicMock(id=TEACHER_ID))
+    docs_collection, results_collection = MagicMock(), MagicMock()
+    docs_collection.aggregate = AsyncMock()
+    docs_collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[{}]))
+    results_collection.aggregate = AsyncMock()
+    results_collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        {"avgScore": [], "flaggedRecent": [{"count": crud.DASHBOARD_FLAGGED_CAP + 1}]}
+    ]))
+    mocker.patch.object(crud, "_get_collection", side_effect=lambda name: {
+        crud.DOCUMENT_COLLECTION: docs_collection, crud.RESULT_COLLECTION: results_collection
+    }[name])
+
+    stats = await crud.get_dashboard_stats({"sub": TEACHER_ID})
+
+    assert stats["flaggedRecent"] == crud.DASHBOARD_FLAGGED_CAP
+    assert stats["flaggedRecentCapped"] is True
+    flagged_pipeline = results_collection.aggregate.call_args.args[0][1]["$facet"]["flaggedRecent"]
+    assert {"$limit": crud.DASHBOARD_FLAGGED_CAP + 1} in flagged_pipeline
+
+
+async def test_get_score_distribution_single_group_fills_empty_ranges(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        {"_id": "21-40", "count": 3}, {"_id": "81-100", "count": 1}
+    ]))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    result = await crud.get_score_distribution({"sub": TEACHER_ID})
+
+    assert result == {"distribution": [
+        {"range": "0-20", "count": 0}, {"range": "21-40", "count": 3}, {"range": "41-60", "count": 0},
+        {"range": "61-80", "count": 0}, {"range": "81-100", "count": 1},
+    ]}
+    pipeline = collection.aggregate.call_args.args[0]
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$group"]
+    assert pipeline[0]["$match"]["teacher_id"] == TEACHER_ID
+    assert pipeline[1] is crud._SCORE_DISTRIBUTION_TAIL[0] # Prebuilt at import, not per request
+
+
+# --- Dashboard cache ---
+
+async def test_dashboard_stats_cached_until_invalidated(mocker: MockerFixture):
+    mocker.patch.object(crud, "get_teacher_by_kinde_id", new_callable=AsyncMock, return_value=MagicMock(id=TEACHER_ID))
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[{}]))
+    collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    first = await crud.get_dashboard_stats({"sub": TEACHER_ID})
+    first["totalDocs"] = 99 # Returned dicts are copies
+    second = await crud.get_dashboard_stats({"sub": TEACHER_ID})
+    assert second["totalDocs"] == 0
+    assert collection.aggregate.call_count == 2 # One results + one documents aggregation
+
+    await crud.update_document_status_fast(uuid.uuid4(), TEACHER_ID, DocumentStatus.PROCESSING)
+    await crud.get_dashboard_stats({"sub": TEACHER_ID})
+    assert collection.aggregate.call_count == 4
+
+
+async def test_dashboard_cache_expires(mocker: MockerFixture):
+    clock = mocker.patch.object(crud.time, "monotonic", return_value=1000.0)
+    crud._dashboard_cache_set(crud.SCORE_DISTRIBUTION_CACHE, TEACHER_ID, {"distribution": []})
+    assert crud._dashboard_cache_get(crud.SCORE_DISTRIBUTION_CACHE, TEACHER_ID) == {"distribution": []}
+    clock.return_value = 1000.0 + crud.DASHBOARD_CACHE_TTL_SECONDS
+    assert crud._dashboard_cache_get(crud.SCORE_DISTRIBUTION_CACHE, TEACHER_ID) is None
+
+
+# --- Concurrent dashboard reads are coalesced ---
+
+async def test_single_flight_coalesces_concurrent_calls():
+    release = asyncio.Event()
+    calls = []
+
+    @crud.single_flight(lambda teacher_id: teacher_id)
+    async def load(teacher_id):
+        calls.append(teacher_id)
+        await release.wait()
+        return {"teacher": teacher_id}
+
+    tasks = [asyncio.create_task(load(TEACHER_ID)) for _ in range(3)] + [asyncio.create_task(load("other"))]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert sorted(calls) == ["kinde_teacher_unit_test", "other"]
+    assert results[:3] == [{"teacher": TEACHER_ID}] * 3
+    assert results[0] is not results[1] # Followers get their own copy
+    assert crud._inflight == {}
+
+
+async def test_single_flight_propagates_errors_to_followers():
+    release = asyncio.Event()
+
+    @crud.single_flight(lambda key: key)
+    async def fail(key):
+        await release.wait()
+        raise RuntimeError("boom")
+
+    tasks = [asyncio.create_task(fail("k")) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+# --- build_filter_query sanitisation ---
+
+def test_build_filter_query_drops_disallowed_operators_without_mutating_input():
+    student_id = uuid.uuid4()
+    filters = {"student_id": student_id, "score": {"$gt": 0.5, "$where": "1"}, "$or": [{"a": 1}, {"b": {"$in": [1, 2]}}]}
+
+    query = crud.build_filter_query(filters)
+
+    assert query == {
+        "student_id": student_id, "score": {"$gt": 0.5},
+        "$or": [{"a": 1}, {"b": {"$in": [1, 2]}}], "is_deleted": False,
+    }
+    assert "$where" in filters["score"]
+    assert query["$or"][0] is not filters["$or"][0]
+    assert isinstance(crud.ALLOWED_MONGO_OPERATORS, frozenset)
+
+
+async def test_get_recent_documents_projects_and_sizes_batch(mocker: MockerFixture):
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.batch_size.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=[])
+    collection = MagicMock()
+    collection.find.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    assert await crud.get_recent_documents(TEACHER_ID, limit=5) == []
+
+    assert collection.find.call_args.kwargs["projection"] == crud.DOCUMENT_LIST_PROJECTION
+    cursor.batch_size.assert_called_once_with(5)
+
+
+# --- Bulk school writes ---
+
+async def test_bulk_update_schools_single_bulk_write_and_read_back(mocker: MockerFixture):
+    first, second = uuid.uuid4(), uuid.uuid4()
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock(return_value=MagicMock(matched_count=2))
+    collection.find.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        {"_id": second, "school_name": "B", "school_state_region": "R", "school_country": "UK"},
+        {"_id": first, "school_name": "A", "school_state_region": "R", "school_country": "UK"},
+    ]))
+    collection.find_one_and_update = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    schools = await crud.bulk_update_schools([
+        {"id": first, "data": {"school_name": "A"}},
+        {"id": second, "data": {"school_name": "B"}},
+        {"id": "not-a-uuid", "data": {}},
+    ], session=MagicMock())
+
+    assert [school.id for school in schools] == [first, second]
+    operations = collection.bulk_write.await_args.args[0]
+    assert [op._filter["_id"] for op in operations] == [first, second]
+    assert [set(op._doc["$set"]) for op in operations] == [{"school_name", "updated_at"}] * 2
+    collection.bulk_write.assert_awaited_once()
+    collection.find_one_and_update.assert_not_awaited()
+
+
+async def test_bulk_create_schools_hydrates_without_read_back(mocker: MockerFixture):
+    from app.models.school import SchoolCreate
+    collection = MagicMock()
+    collection.insert_many = AsyncMock(return_value=MagicMock(acknowledged=True))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    construct_spy = mocker.spy(crud.School, "model_construct")
+
+    schools = await crud.bulk_create_schools(
+        [SchoolCreate(school_name=name, school_state_region="R", school_country="UK") for name in ("A", "B")],
+        session=MagicMock()
+    )
+
+    inserted = collection.insert_many.await_args.args[0]
+    assert [school.id for school in schools] == [doc["_id"] for doc in inserted]
+    assert [school.school_name for school in schools] == ["A", "B"]
+    collection.find.assert_not_called()
+    assert construct_spy.call_count == 2
+
+
+# --- update_result without shipping the post-image ---
+
+async def test_update_result_without_return_document(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value={"_id": uuid.uuid4(), "teacher_id": TEACHER_ID})
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    invalidate = mocker.patch.object(crud, "invalidate_dashboard_cache")
+
+    updated = await crud.update_result(
+        uuid.uuid4(), {"status": ResultStatus.ERROR}, return_document=False, session=MagicMock()
+    )
+
+    assert updated is True
+    call = collection.find_one_and_update.await_args
+    assert call.kwargs["projection"] == {"teacher_id": 1}
+    assert call.args[1]["$set"]["status"] == ResultStatus.ERROR.value
+    invalidate.assert_called_once_with(TEACHER_ID)
+
+    collection.find_one_and_update.return_value = None
+    assert await crud.update_result(uuid.uuid4(), {"status": "x"}, return_document=False, session=MagicMock()) is False
+
+
+def test_sanitize_filter_handles_deep_nesting_iteratively():
+    import sys
+    filters: dict = {"leaf": 1, "$where": "x"}
+    for _ in range(sys.getrecursionlimit() + 100):
+        filters = {"$or": [filters, {"$where": "x"}]}
+
+    sanitized = crud._validate_and_sanitize_filter_part(filters)
+
+    depth = 0
+    while "$or" in sanitized:
+        assert sanitized["$or"][1] == {}
+        sanitized = sanitized["$or"][0]; depth += 1
+    assert depth == sys.getrecursionlimit() + 100
+    assert sanitized == {"leaf": 1}
+
+
+# --- Per-request teacher memo ---
+
+async def test_get_current_teacher_resolves_once_per_context(mocker: MockerFixture):
+    teacher = MagicMock(id=TEACHER_ID)
+    lookup = mocker.patch.object(crud, "get_teacher_by_kinde_id", new_callable=AsyncMock, return_value=teacher)
+
+    async def request():
+        assert await crud.get_current_teacher(TEACHER_ID) is teacher
+        assert await crud.get_current_teacher(TEACHER_ID) is teacher
+
+    await asyncio.create_task(request())
+    assert lookup.await_count == 1
+    await asyncio.create_task(request()) # A new request (task context) starts with an empty memo
+    assert lookup.await_count == 2
+
+
+async def test_forget_current_teacher_forces_reload(mocker: MockerFixture):
+    lookup = mocker.patch.object(crud, "get_teacher_by_kinde_id", new_callable=AsyncMock, return_value=MagicMock(id=TEACHER_ID))
+
+    async def request():
+        await crud.get_current_teacher(TEACHER_ID)
+        crud.forget_current_teacher(TEACHER_ID)
+        await crud.get_current_teacher(TEACHER_ID)
+
+    await asyncio.create_task(request())
+    assert lookup.await_count == 2
+
+
+async def test_update_result_does_not_format_payload_when_logging_disabled(mocker: MockerFixture):
+    class Exploding(dict):
+        def __format__(self, spec): raise AssertionError("formatted")
+        def __str__(self): raise AssertionError("formatted")
+        __repr__ = __str__
+
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value={"teacher_id": TEACHER_ID})
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    mocker.patch.object(crud.logger, "isEnabledFor", return_value=False)
+
+    assert await crud.update_result(uuid.uuid4(), Exploding(status="x"), return_document=False, session=MagicMock()) is True
+
+
+async def test_update_result_does_not_mutate_caller_dict(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value={"teacher_id": TEACHER_ID})
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    update_data = {"_id": "x", "id": "x", "created_at": "x", "document_id": "x", "status": ResultStatus.COMPLETED, "score": 0.5}
+    original = dict(update_data)
+
+    assert await crud.update_result(uuid.uuid4(), update_data, return_document=False, session=MagicMock()) is True
+
+    assert update_data == original
+    assert set(collection.find_one_and_update.await_args.args[1]["$set"]) == {"status", "score", "updated_at"}
+    assert collection.find_one_and_update.await_args.args[1]["$set"]["status"] == ResultStatus.COMPLETED.value
+
+
+async def test_validate_class_group_relationships_single_aggregate(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[{"ok": True}]))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    teacher_lookup = mocker.patch.object(crud, "get_teacher_by_kinde_id", new_callable=AsyncMock)
+    class_group_id, school_id = uuid.uuid4(), uuid.uuid4()
+
+    assert await crud.validate_class_group_relationships(class_group_id, TEACHER_ID, school_id) is True
+
+    collection.aggregate.assert_called_once()
+    teacher_lookup.assert_not_awaited()
+    pipeline = collection.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$match": {"_id": class_group_id, "teacher_id": TEACHER_ID, "is_deleted": False}}
+    assert pipeline[1]["$lookup"]["from"] == crud.TEACHER_COLLECTION
+
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[]))
+    assert await crud.validate_class_group_relationships(class_group_id, TEACHER_ID, school_id) is False
+
+
+# --- Batches ---
+
+async def test_get_batch_dashboard_single_facet_aggregate(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[{
+        "status": [{"_id": "QUEUED", "count": 2}, {"_id": "COMPLETED", "count": 1}],
+        "totals": [{"_id": None, "document_count": 3, "total_characters": 900, "total_words": 150}]
+    }]))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    batch_id = uuid.uuid4()
+
+    dashboard = await crud.get_batch_dashboard(batch_id=batch_id)
+
+    assert dashboard == {
+        "status_counts": {"QUEUED": 2, "COMPLETED": 1},
+        "document_count": 3, "total_characters": 900, "total_words": 150
+    }
+    pipeline = collection.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$match": {"batch_id": batch_id}}
+    assert set(pipeline[1]["$facet"]) == {"status", "totals"}
+    assert await crud.get_batch_status_summary(batch_id=batch_id) == {"QUEUED": 2, "COMPLETED": 1}
+    assert collection.aggregate.call_count == 2
+
+
+async def test_get_usage_stats_pipeline_is_match_then_group(mocker: MockerFixture):
+    from datetime import date
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        {"_id": None, "document_count": 2, "total_characters": 10, "total_words": 3}
+    ]))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    stats = await crud.get_usage_stats_for_period(TEACHER_ID, "daily", date(2024, 5, 1))
+
+    assert stats["document_count"] == 2
+    pipeline = collection.aggregate.call_args.args[0]
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$group"]
+    assert list(pipeline[0]["$match"]) == ["teacher_id", "upload_timestamp"]
+    # Plain field sums (no per-document $ifNull expression) keep the $group index-coverable
+    assert pipeline[1]["$group"]["total_characters"] == {"$sum": "$character_count"}
+    assert pipeline[1]["$group"]["total_words"] == {"$sum": "$word_count"}
+    assert pipeline[1] is crud._USAGE_GROUP_STAGE # Prebuilt at import, not per request
+
+
+async def test_get_documents_by_batch_id_drains_with_to_list(mocker: MockerFixture):
+    batch_id = uuid.uuid4()
+    now = crud._utcnow()
+    doc = {
+        **DocumentCreate(
+            original_filename="essay.pdf", storage_blob_path="blob/essay.pdf", file_type=FileType.PDF,
+            status=DocumentStatus.QUEUED, student_id=uuid.uuid4(), assignment_id=uuid.uuid4(),
+            teacher_id=TEACHER_ID, batch_id=batch_id,
+        ).model_dump(),
+        "_id": uuid.uuid4(), "created_at": now, "updated_at": now, "is_deleted": False
+    }
+    cursor = MagicMock(to_list=AsyncMock(return_value=[doc]))
+    collection = MagicMock(find=MagicMock(return_value=cursor))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    documents = await crud.get_documents_by_batch_id(batch_id=batch_id)
+
+    assert [d.id for d in documents] == [doc["_id"]]
+    cursor.to_list.assert_awaited_once_with(length=None)
+
+
+async def test_create_batch_hydrates_without_find_one(mocker: MockerFixture):
+    from app.models.batch import BatchCreate
+    collection = MagicMock()
+    collection.insert_one = AsyncMock(return_value=MagicMock(inserted_id=uuid.uuid4()))
+    collection.find_one = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    batch = await crud.create_batch(batch_in=BatchCreate(teacher_id=TEACHER_ID, total_files=3))
+
+    assert batch.id == collection.insert_one.await_args.args[0]["_id"]
+    assert batch.total_files == 3
+    collection.find_one.assert_not_awaited()
+
+
+async def test_update_batch_uses_find_one_and_update(mocker: MockerFixture):
+    from app.models.batch import BatchUpdate
+    from app.models.enums import BatchStatus
+    batch_id, now = uuid.uuid4(), crud._utcnow()
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value={
+        "_id": batch_id, "teacher_id": TEACHER_ID, "total_files": 3, "completed_files": 3,
+        "status": BatchStatus.COMPLETED.value, "created_at": now, "updated_at": now
+    })
+    collection.find_one = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    batch = await crud.update_batch(batch_id=batch_id, batch_in=BatchUpdate(completed_files=3))
+
+    assert batch.id == batch_id and batch.completed_files == 3
+    call = collection.find_one_and_update.await_args
+    assert call.args[0] == {"_id": batch_id}
+    assert call.args[1]["$set"]["completed_files"] == 3
+    assert call.kwargs["return_document"] == crud.ReturnDocument.AFTER
+    collection.find_one.assert_not_awaited()
+
+    collection.find_one_and_update.return_value = None
+    assert await crud.update_batch(batch_id=batch_id, batch_in=BatchUpdate(completed_files=3)) is None
+
+
+async def test_delete_batch_runs_both_writes_in_session(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.delete_many = AsyncMock(return_value=MagicMock(deleted_count=1))
+    collection.update_many = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    session, batch_id = MagicMock(), uuid.uuid4()
+
+    assert await crud.delete_batch(batch_id=batch_id, session=session) is True
+    assert collection.delete_many.await_args.kwargs["session"] is session
+    assert collection.update_many.await_args.kwargs["session"] is session
+
+    collection.update_many.side_effect = RuntimeError("boom")
+    with pytest.raises(RuntimeError): # Propagates so the enclosing transaction aborts
+        await crud.delete_batch(batch_id=batch_id, session=session)
+
+    collection.update_many.reset_mock(side_effect=True)
+    collection.delete_many.return_value = MagicMock(deleted_count=0)
+    assert await crud.delete_batch(batch_id=batch_id, session=session) is False
+    collection.update_many.assert_not_awaited()
+
+
+async def test_delete_batches_two_round_trips_for_many_ids(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.delete_many = AsyncMock(return_value=MagicMock(deleted_count=3))
+    collection.update_many = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    batch_ids = [uuid.uuid4() for _ in range(3)]
+
+    assert await crud.delete_batches(batch_ids=batch_ids, session=MagicMock()) == 3
+
+    expected_in = {"$in": [Binary.from_uuid(b, UuidRepresentation.STANDARD) for b in batch_ids]}
+    assert collection.delete_many.await_args.args[0] == {"_id": expected_in}
+    assert collection.update_many.await_args.args[0] == {"batch_id": expected_in}
+    assert collection.delete_many.await_count == 1 and collection.update_many.await_count == 1
+    collection.count_documents.assert_not_called() # No orphan probe: update_many alone is one round-trip
+    assert await crud.delete_batches(batch_ids=[], session=MagicMock()) == 0
+
+
+def test_period_bounds_memoized_and_exclusive_end():
+    from datetime import date
+    crud._period_bounds.cache_clear()
+
+    start, end, first, last = crud._period_bounds("monthly", date(2024, 2, 14))
+    assert (first, last) == (date(2024, 2, 1), date(2024, 2, 29))
+    assert (start.isoformat(), end.isoformat()) == ("2024-02-01T00:00:00+00:00", "2024-03-01T00:00:00+00:00")
+    assert crud._period_bounds("weekly", date(2024, 5, 1))[2:] == (date(2024, 4, 29), date(2024, 5, 5))
+
+    crud._period_bounds("monthly", date(2024, 2, 14))
+    assert crud._period_bounds.cache_info().hits == 1
+    with pytest.raises(ValueError):
+        crud._period_bounds("yearly", date(2024, 2, 14))
+
+
+async def test_usage_stats_cached_per_period_until_invalidated(mocker: MockerFixture):
+    from datetime import date
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        {"_id": None, "document_count": 2, "total_characters": 10, "total_words": 3}
+    ]))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    first = await crud.get_usage_stats_for_period(TEACHER_ID, "monthly", date(2024, 2, 14))
+    first["document_count"] = 99 # Callers own their copy
+    second = await crud.get_usage_stats_for_period(TEACHER_ID, "monthly", date(2024, 2, 14))
+    assert second["document_count"] == 2
+    assert collection.aggregate.call_count == 1
+
+    await crud.get_usage_stats_for_period(TEACHER_ID, "daily", date(2024, 2, 14)) # Different period -> own entry
+    assert collection.aggregate.call_count == 2
+
+    crud.invalidate_dashboard_cache(TEACHER_ID)
+    await crud.get_usage_stats_for_period(TEACHER_ID, "monthly", date(2024, 2, 14))
+    assert collection.aggregate.call_count == 3
+
+
+async def test_get_batch_by_id_without_validation(mocker: MockerFixture):
+    batch_id, now = uuid.uuid4(), crud._utcnow()
+    collection = MagicMock()
+    collection.find_one = AsyncMock(side_effect=lambda *a, **k: {
+        "_id": batch_id, "teacher_id": TEACHER_ID, "total_files": 3, "status": "NOT_A_STATUS",
+        "created_at": now, "updated_at": now
+    })
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    batch = await crud.get_batch_by_id(batch_id=batch_id, validate=False)
+
+    assert batch.id == batch_id and batch.total_files == 3
+    assert batch.status == "NOT_A_STATUS" # Stored value passed through without field validation
+    assert await crud.get_batch_by_id(batch_id=batch_id) is None # Validating path rejects it (logged)
+
+
+async def test_iter_documents_by_batch_id_pages_with_short_queries(mocker: MockerFixture):
+    batch_id, now = uuid.uuid4(), crud._utcnow()
+
+    def doc(position):
+        return {
+            **DocumentCreate(
+                original_filename=f"{position}.pdf", storage_blob_path="blob", file_type=FileType.PDF,
+                status=DocumentStatus.QUEUED, student_id=uuid.uuid4(), assignment_id=uuid.uuid4(),
+                teacher_id=TEACHER_ID, batch_id=batch_id, queue_position=position,
+            ).model_dump(),
+            "_id": uuid.uuid4(), "created_at": now, "updated_at": now, "is_deleted": False
+        }
+
+    positioned, unpositioned = [doc(1), doc(2), doc(3)], [doc(None)]
+    pages = [positioned[:2], positioned[2:], unpositioned]
+    cursors = []
+
+    def find(query):
+        cursor = MagicMock(to_list=AsyncMock(return_value=pages.pop(0)))
+        cursor.sort.return_value = cursor; cursor.limit.return_value = cursor
+        cursors.append((query, cursor))
+        return cursor
+
+    collection = MagicMock(find=MagicMock(side_effect=find))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    streamed = [d.queue_position async for d in crud.iter_documents_by_batch_id(batch_id=batch_id, batch_size=2)]
+
+    assert streamed == [1, 2, 3, None] # Unpositioned documents last
+    (first, first_cursor), (second, _), (third, _) = cursors
+    assert first == {"batch_id": batch_id, "queue_position": {"$type": "number"}}
+    first_cursor.sort.assert_called_once_with([("queue_position", 1), ("_id", 1)])
+    first_cursor.limit.assert_called_once_with(2)
+    assert second["$or"] == [
+        {"queue_position": {"$gt": 2}},
+        {"queue_position": 2, "_id": {"$gt": positioned[1]["_id"]}}
+    ]
+    assert third == {"batch_id": batch_id, "queue_position": None}
+
+
+async def test_iter_documents_by_batch_id_propagates_errors(mocker: MockerFixture):
+    from pymongo.errors import CursorNotFound
+    cursor = MagicMock(to_list=AsyncMock(side_effect=CursorNotFound("cursor id not found")))
+    cursor.sort.return_value = cursor; cursor.limit.return_value = cursor
+    mocker.patch.object(crud, "_get_collection", return_value=MagicMock(find=MagicMock(return_value=cursor)))
+
+    with pytest.raises(CursorNotFound):
+        [d async for d in crud.iter_documents_by_batch_id(batch_id=uuid.uuid4())]
+
+
+async def test_usage_stats_empty_period_single_round_trip(mocker: MockerFixture):
+    from datetime import date
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[]))
+    collection.find_one = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    stats = await crud.get_usage_stats_for_period(TEACHER_ID, "daily", date(2024, 5, 1))
+
+    assert (stats["document_count"], stats["total_characters"], stats["total_words"]) == (0, 0, 0)
+    assert stats["start_date"] == stats["end_date"] == date(2024, 5, 1)
+    collection.aggregate.assert_called_once()
+    collection.find_one.assert_not_awaited()
+
+
+async def test_usage_stats_does_not_format_aggregation_result_when_debug_disabled(mocker: MockerFixture):
+    from datetime import date
+
+    class Exploding(dict):
+        def __str__(self): raise AssertionError("formatted")
+        __repr__ = __str__
+
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=AsyncMock(return_value=[
+        Exploding(document_count=1, total_characters=5, total_words=1)
+    ]))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    mocker.patch.object(crud.logger, "isEnabledFor", side_effect=lambda level: level > crud.logging.DEBUG)
+
+    stats = await crud.get_usage_stats_for_period(TEACHER_ID, "daily", date(2024, 5, 1))
+
+    assert stats["document_count"] == 1
+
+
+async def test_concurrent_usage_stats_calls_share_one_aggregation(mocker: MockerFixture):
+    from datetime import date
+    release = asyncio.Event()
+
+    async def to_list(length=None):
+        await release.wait()
+        return [{"_id": None, "document_count": 4, "total_characters": 40, "total_words": 8}]
+
+    collection = MagicMock()
+    collection.aggregate = AsyncMock()
+    collection.aggregate.return_value = MagicMock(to_list=to_list)
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    calls = [
+        asyncio.create_task(crud.get_usage_stats_for_period(teacher_id=TEACHER_ID, period="weekly", target_date=date(2024, 5, 1)))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*calls)
+
+    assert [r["document_count"] for r in results] == [4, 4, 4]
+    assert collection.aggregate.call_count == 1
+
+
+def test_soft_delete_filter_returns_independent_copies():
+    live = crud.soft_delete_filter()
+    live["teacher_id"] = TEACHER_ID
+    assert crud.soft_delete_filter() == {"is_deleted": False}
+    assert crud.soft_delete_filter(include_deleted=True) == {}
+    with pytest.raises(TypeError):
+        crud._SOFT_DELETE_FILTERS[False]["is_deleted"] = True
+
+
+async def test_get_result_by_id_query_includes_live_filter(mocker: MockerFixture):
+    collection = MagicMock(find_one=AsyncMock(return_value=None))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    result_id = uuid.uuid4()
+
+    await crud.get_result_by_id(result_id, teacher_id=TEACHER_ID)
+    assert collection.find_one.await_args.args[0] == {"_id": result_id, "is_deleted": False, "teacher_id": TEACHER_ID}
+
+    await crud.get_result_by_id(result_id, include_deleted=True)
+    assert collection.find_one.await_args.args[0] == {"_id": result_id}
+
+
+def test_utcnow_is_timezone_aware_utc():
+    now = crud._utcnow()
+    assert now.tzinfo is crud._UTC
+    assert now.utcoffset().total_seconds() == 0
+
+
+async def test_db_operation_logs_and_returns_fresh_default(mocker: MockerFixture):
+    collection = MagicMock(find=MagicMock(side_effect=RuntimeError("boom")))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    log_error = mocker.spy(crud.logger, "error")
+
+    first = await crud.get_documents_by_batch_id(batch_id=uuid.uuid4())
+    first.append("mutated")
+
+    assert await crud.get_documents_by_batch_id(batch_id=uuid.uuid4()) == []
+    assert log_error.call_args.args[1] == "get_documents_by_batch_id"
+    assert log_error.call_args.kwargs["exc_info"] is True
+
+
+async def test_db_operation_skips_traceback_for_driver_errors(mocker: MockerFixture):
+    from pymongo.errors import ServerSelectionTimeoutError
+    collection = MagicMock(find=MagicMock(side_effect=ServerSelectionTimeoutError("no primary")))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    log_error = mocker.spy(crud.logger, "error")
+
+    assert await crud.get_documents_by_batch_id(batch_id=uuid.uuid4()) == []
+    assert log_error.call_args.args[0].startswith("Database error in")
+    assert log_error.call_args.kwargs["exc_info"] is False
+
+
+async def test_update_batch_returns_batch_when_nothing_changed(mocker: MockerFixture):
+    from app.models.batch import BatchUpdate
+    batch_id, now = uuid.uuid4(), crud._utcnow()
+    stored = {"_id": batch_id, "teacher_id": TEACHER_ID, "total_files": 1, "status": "QUEUED", "created_at": now, "updated_at": now}
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=stored) # Matched, but the values were already set
+    collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1, modified_count=0))
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    batch = await crud.update_batch(batch_id=batch_id, batch_in=BatchUpdate(status="QUEUED"))
+
+    assert batch is not None and batch.id == batch_id
+    collection.update_one.assert_not_called()
+
+
+async def test_update_batch_with_no_fields_set_skips_dump_and_write(mocker: MockerFixture):
+    from app.models.batch import BatchUpdate
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+    get_batch = mocker.patch.object(crud, "get_batch_by_id", new_callable=AsyncMock, return_value=None)
+    dump = mocker.spy(BatchUpdate, "model_dump")
+    batch_id = uuid.uuid4()
+
+    await crud.update_batch(batch_id=batch_id, batch_in=BatchUpdate())
+
+    get_batch.assert_awaited_once_with(batch_id=batch_id)
+    dump.assert_not_called()
+    collection.find_one_and_update.assert_not_awaited()
+
+
+# --- Create paths hydrate from the inserted document ---
+
+async def test_create_school_and_class_group_hydrate_without_find_one(mocker: MockerFixture):
+    from app.models.school import SchoolCreate
+    from app.models.class_group import ClassGroupCreate
+    collection = _mock_collection(mocker)
+
+    school = await crud.create_school(SchoolCreate(school_name="Hill", school_country="UK"), session=MagicMock())
+    assert school.id == collection.insert_one.await_args.args[0]["_id"]
+    assert school.school_name == "Hill"
+
+    class_group = await crud.create_class_group(
+        ClassGroupCreate(class_name="7B", academic_year="2024-2025", teacher_id=TEACHER_ID), teacher_id=TEACHER_ID, session=MagicMock()
+    )
+    assert class_group.id == collection.insert_one.await_args.args[0]["_id"]
+    assert class_group.teacher_id == TEACHER_ID
+    collection.find_one.assert_not_awaited()
+
+
+async def test_create_teacher_hydrates_without_find_one(mocker: MockerFixture):
+    from app.models.teacher import TeacherCreate
+    collection = _mock_collection(mocker)
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    teacher_in = TeacherCreate(
+        first_name="Ada", last_name="Lovelace", email="ada@example.com",
+        school_name="Hill", country="UK", state_county="Kent"
+    )
+
+    teacher = await crud.create_teacher(teacher_in, kinde_id=TEACHER_ID, session=MagicMock())
+
+    assert teacher.id == TEACHER_ID
+    assert teacher.email == "ada@example.com"
+    upsert = collection.find_one_and_update.await_args
+    assert upsert.args[0] == {"_id": TEACHER_ID}
+    assert "_id" not in upsert.args[1]["$setOnInsert"]
+    assert upsert.kwargs["upsert"] is True
+    collection.find_one.assert_not_awaited()
+
+
+async def test_create_teacher_existing_kinde_id_returns_none_in_one_round_trip(mocker: MockerFixture):
+    from app.models.teacher import TeacherCreate
+    collection = _mock_collection(mocker)
+    collection.find_one_and_update = AsyncMock(return_value={"_id": TEACHER_ID})
+    collection.count_documents = AsyncMock()
+    teacher_in = TeacherCreate(
+        first_name="Ada", last_name="Lovelace", email="ada@example.com",
+        school_name="Hill", country="UK", state_county="Kent"
+    )
+
+    assert await crud.create_teacher(teacher_in, kinde_id=TEACHER_ID, session=MagicMock()) is None
+    collection.count_documents.assert_not_awaited()
+    collection.insert_one.assert_not_awaited()
+
+
+def test_hydrate_without_validation_maps_id():
+    from app.models.school import School
+    school_id = uuid.uuid4()
+    school = crud._hydrate(School, {"_id": school_id, "school_name": "Hill", "school_country": "UK"}, validate=False)
+    assert school.id == school_id and school.school_name == "Hill"
+
+
+# --- Update allow-lists ---
+
+def test_update_allow_lists_name_real_update_fields():
+    from app.models.school import SchoolUpdate
+    from app.models.teacher import TeacherUpdate
+    from app.models.class_group import ClassGroupUpdate
+    from app.models.student import StudentUpdate
+    assert crud._SCHOOL_UPDATE_FIELDS <= set(SchoolUpdate.model_fields)
+    assert crud._TEACHER_UPDATE_FIELDS <= set(TeacherUpdate.model_fields)
+    assert crud._CLASSGROUP_UPDATE_FIELDS <= set(ClassGroupUpdate.model_fields)
+    assert crud._STUDENT_UPDATE_FIELDS <= set(StudentUpdate.model_fields)
+
+
+async def test_update_teacher_sets_only_explicit_allowlisted_fields(mocker: MockerFixture):
+    from app.models.teacher import TeacherUpdate, TeacherRole
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    await crud.update_teacher(TEACHER_ID, TeacherUpdate(first_name="Ada", role=TeacherRole.TEACHER), session=MagicMock())
+
+    update_set = collection.find_one_and_update.await_args.args[1]["$set"]
+    assert set(update_set) == {"first_name", "role", "updated_at"}
+    assert update_set["role"] == TeacherRole.TEACHER.value
+
+
+async def test_filtered_school_and_teacher_lists_project_model_fields(mocker: MockerFixture):
+    class _Cursor:
+        def sort(self, _): return self
+        def skip(self, _): return self
+        def limit(self, _): return self
+        def batch_size(self, _): return self
+        def __aiter__(self): return self
+        async def __anext__(self): raise StopAsyncIteration
+
+    collection = MagicMock()
+    collection.find.return_value = _Cursor()
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    await crud.get_schools_with_filters({"school_country": "UK"}, sort_by="school_name")
+    assert collection.find.call_args.kwargs["projection"] == crud.SCHOOL_LIST_PROJECTION
+    await crud.get_teachers_by_school(uuid.uuid4())
+    assert collection.find.call_args.kwargs["projection"] == crud.TEACHER_LIST_PROJECTION
+
+
+async def test_update_document_status_and_result_project_post_image(mocker: MockerFixture):
+    collection = MagicMock()
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    mocker.patch.object(crud, "_get_collection", return_value=collection)
+
+    await crud.update_document_status(uuid.uuid4(), teacher_id=TEACHER_ID, status=DocumentStatus.COMPLETED)
+    assert collection.find_one_and_update.await_args.kwargs["projection"] == crud.DOCUMENT_LIST_PROJECTION
+    await crud.update_result(uuid.uuid4(), {"status": ResultStatus.COMPLETED}, teacher_id=TEACHER_ID)
+    assert collection.find_one_and_update.await_args.kwargs["projection"] == crud.RESULT_PROJECTION
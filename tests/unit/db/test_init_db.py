@@ -0,0 +1,92 @@
+# tests/unit/db/test_init_db.py
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import OperationFailure
+from pytest_mock import MockerFixture
+
+from app.db import init_db
+
+
+@pytest.mark.asyncio
+async def test_init_db_indexes_no_database(mocker: MockerFixture):
+    mocker.patch.object(init_db, "get_database", return_value=None)
+    assert await init_db.init_db_indexes() is False
+
+
+@pytest.mark.asyncio
+async def test_init_db_indexes_continues_past_cosmos_restriction(mocker: MockerFixture):
+    collections = {name: MagicMock(create_indexes=AsyncMock()) for name in init_db.COLLECTION_INDEXES}
+    restricted = init_db.STUDENT_INDEXES[1]
+
+    async def create_indexes(indexes):
+        if indexes == [restricted]:
+            raise OperationFailure("not empty", code=67)
+
+    collections["students"].create_indexes.side_effect = create_indexes
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: collections[name]
+    mocker.patch.object(init_db, "get_database", return_value=db)
+
+    assert await init_db.init_db_indexes() is False
+    for name, collection in collections.items():
+        created = [call.args[0] for call in collection.create_indexes.await_args_list]
+        assert created == [[index] for index in init_db.COLLECTION_INDEXES[name]]
+
+
+def test_result_live_index_is_partial_unique():
+    index = next(i.document for i in init_db.RESULT_INDEXES if i.document["name"] == "result_document_teacher_live_unique")
+    assert list(index["key"].keys()) == ["document_id", "teacher_id", "is_deleted"]
+    assert index["unique"] is True
+    assert index["partialFilterExpression"] == {"is_deleted": False}
+
+
+def test_student_external_id_index_is_partial_unique_per_teacher():
+    index = next(i.document for i in init_db.STUDENT_INDEXES if i.document["name"] == "student_teacher_external_id_unique")
+    assert list(index["key"].keys()) == ["teacher_id", "external_student_id"]
+    assert index["unique"] is True
+    assert index["partialFilterExpression"] == {"external_student_id": {"$type": "string"}}
+
+
+def test_dashboard_indexes_declared():
+    keys = {
+        name: [list(i.document["key"].items()) for i in indexes]
+        for name, indexes in init_db.COLLECTION_INDEXES.items()
+    }
+    assert [("teacher_id", 1), ("status", 1), ("score", 1)] in keys["results"]
+    assert [("teacher_id", 1), ("upload_timestamp", 1), ("character_count", 1), ("word_count", 1)] in keys["documents"]
+    assert not any(key[:2] == [("teacher_id", 1), ("upload_timestamp", -1)] for key in keys["documents"])
+    assert [("teacher_id", 1), ("status", 1)] in keys["documents"]
+
+
+def test_live_row_partial_indexes_for_soft_deleted_collections():
+    for name in ("schools", "teachers", "classgroups", "students", "documents", "results"):
+        partial = [i.document.get("partialFilterExpression") for i in init_db.COLLECTION_INDEXES[name]]
+        assert init_db.LIVE_ROWS_ONLY in partial, name
+
+
+def test_result_score_index_declared_once():
+    keys = [list(i.document["key"].keys()) for i in init_db.RESULT_INDEXES]
+    assert keys.count(["teacher_id", "status", "score"]) == 1
+
+
+def test_usage_and_batch_summary_indexes_declared():
+    keys = [list(i.document["key"].keys()) for i in init_db.DOCUMENT_INDEXES]
+    assert ["teacher_id", "upload_timestamp", "character_count", "word_count"] in keys
+    assert ["batch_id", "status"] in keys
+    assert ["batch_id"] not in keys # Served by the batch_id-prefixed compound indexes
+
+
+def test_student_name_indexes_share_crud_collation():
+    from app.db.crud import NAME_COLLATION
+    names = {"student_teacher_name_ci_index", "student_teacher_first_name_ci_index"}
+    indexes = [i.document for i in init_db.STUDENT_INDEXES if i.document["name"] in names]
+    assert len(indexes) == 2
+    for index in indexes:
+        assert index["collation"] == NAME_COLLATION.document
+        assert index["partialFilterExpression"] == init_db.LIVE_ROWS_ONLY
+
+
+def test_status_filtered_document_list_index_is_live_partial():
+    index = next(i.document for i in init_db.DOCUMENT_INDEXES if i.document["name"] == "document_teacher_status_time_live_index")
+    assert list(index["key"].items()) == [("teacher_id", 1), ("status", 1), ("upload_timestamp", -1)]
+    assert index["partialFilterExpression"] == init_db.LIVE_ROWS_ONLY
@@ -0,0 +1 @@
+# Makes 'backend/tests/unit/migrations' a package
@@ -0,0 +1,76 @@
+# tests/unit/migrations/test_convert_string_uuids.py
+import uuid
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.migrations import convert_string_uuids as migration
+
+
+class UniqueStudentCollection:
+    """In-memory stand-in enforcing _id and student_teacher_external_id_unique."""
+
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+
+    def _check_unique(self, doc):
+        if doc["_id"] in self.docs: raise DuplicateKeyError("_id")
+        if isinstance(doc.get("external_student_id"), str):
+            for other in self.docs.values():
+                if (other.get("teacher_id"), other.get("external_student_id")) == (doc["teacher_id"], doc["external_student_id"]):
+                    raise DuplicateKeyError("student_teacher_external_id_unique")
+
+    def insert_one(self, doc):
+        self._check_unique(doc); self.docs[doc["_id"]] = dict(doc)
+
+    def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+    def update_one(self, query, update):
+        doc = dict(self.docs.pop(query["_id"]))
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}): doc.pop(field, None)
+        self._check_unique(doc); self.docs[doc["_id"]] = doc
+
+
+def _student(external_id="EXT-1"):
+    new_id = uuid.uuid4()
+    return new_id, {"_id": str(new_id), "teacher_id": "kinde_1", "first_name": "Ada", "external_student_id": external_id}
+
+
+def test_rewrite_student_with_external_id_keeps_unique_field():
+    new_id, doc = _student()
+    collection = UniqueStudentCollection([doc])
+
+    migration._rewrite_string_id(collection, "students", dict(doc), new_id)
+
+    assert list(collection.docs) == [new_id]
+    assert collection.docs[new_id]["external_student_id"] == "EXT-1"
+    assert migration.STASH_FIELD not in collection.docs[new_id]
+
+
+def test_rewrite_finishes_after_crash_between_insert_and_delete():
+    new_id, doc = _student()
+    collection = UniqueStudentCollection([doc])
+    # State left by a run that crashed right after inserting the new copy
+    collection.docs[new_id] = {"_id": new_id, "teacher_id": "kinde_1", "first_name": "Ada",
+                               migration.STASH_FIELD: {"external_student_id": "EXT-1"}}
+
+    migration._rewrite_string_id(collection, "students", dict(doc), new_id)
+
+    assert list(collection.docs) == [new_id]
+    assert collection.docs[new_id]["external_student_id"] == "EXT-1"
+
+
+def test_rewrite_reraises_unrelated_unique_conflict():
+    class ConflictingCollection(UniqueStudentCollection):
+        def insert_one(self, doc): raise DuplicateKeyError("some_other_unique_index")
+
+    new_id, doc = _student()
+    collection = ConflictingCollection([doc])
+
+    with pytest.raises(DuplicateKeyError):
+        migration._rewrite_string_id(collection, "students", dict(doc), new_id)
+    assert list(collection.docs) == [doc["_id"]] # Old copy untouched